@@ -0,0 +1,103 @@
+import base64
+import io
+import click
+from datetime import datetime
+from mongoengine import Q
+from pymongo import UpdateOne
+from app.models.document import DocumentModel
+from app.models.shipment import Shipment
+from app.models.tracking_event import TrackingEvent
+
+
+def register_commands(app):
+    app.cli.add_command(migrate_invoice_images)
+    app.cli.add_command(backfill_latest_events)
+
+
+@click.command('migrate-invoice-images')
+@click.option('--batch-size', default=100, show_default=True, help='Documents loaded per query.')
+@click.option('--dry-run', is_flag=True, help='Report what would move without writing.')
+def migrate_invoice_images(batch_size, dry_run):
+    """Move base64 invoice images out of documents/shipments into GridFS."""
+    moved_documents = 0
+    queryset = DocumentModel.objects(metadata__base64_image__exists=True).only(
+        'id', 'file_name', 'mime_type', 'metadata', 'file_blob'
+    ).batch_size(batch_size)
+
+    for document in queryset.no_cache():
+        metadata = dict(document.metadata or {})
+        image_base64 = metadata.pop('base64_image', None)
+        mime_type = metadata.pop('base64_mime_type', None) or document.mime_type
+        if not image_base64:
+            continue
+
+        if not dry_run:
+            if not document.file_blob:
+                document.file_blob.put(io.BytesIO(base64.b64decode(image_base64)),
+                                       content_type=mime_type, filename=document.file_name)
+            DocumentModel._get_collection().update_one(
+                {'_id': document.id},
+                {'$set': {'file_blob': document.file_blob.grid_id, 'updated_at': datetime.utcnow()},
+                 '$unset': {'metadata.base64_image': '', 'metadata.base64_mime_type': ''}}
+            )
+        moved_documents += 1
+
+    linked_shipments = 0
+    skipped_shipments = 0
+    queryset = Shipment.objects(metadata__invoice_image_base64__exists=True).only('id').batch_size(batch_size)
+
+    for shipment in queryset.no_cache():
+        invoice_document = DocumentModel.objects(
+            Q(file_blob__exists=True) | Q(metadata__base64_image__exists=True),
+            shipment_id=shipment.id, type='invoice'
+        ).only('id').order_by('-created_at').first()
+        if not invoice_document:
+            # Never drop the only copy of an image
+            skipped_shipments += 1
+            continue
+
+        if not dry_run:
+            Shipment.objects(id=shipment.id).update_one(
+                set__metadata__invoice_document_id=str(invoice_document.id),
+                unset__metadata__invoice_image_base64=True,
+                set__updated_at=datetime.utcnow()
+            )
+        linked_shipments += 1
+
+    prefix = "[dry run] " if dry_run else ""
+    click.echo(f"{prefix}Moved {moved_documents} document images to GridFS")
+    click.echo(f"{prefix}Linked {linked_shipments} shipments to their invoice document, skipped {skipped_shipments} without one")
+
+
+@click.command('backfill-latest-events')
+@click.option('--batch-size', default=500, show_default=True, help='Shipment updates sent per bulk write.')
+@click.option('--dry-run', is_flag=True, help='Report what would change without writing.')
+def backfill_latest_events(batch_size, dry_run):
+    """Populate Shipment.latest_event from each shipment's newest tracking event."""
+    # Walks the (shipment_id, -timestamp) index and keeps the first event per shipment
+    pipeline = [
+        {'$sort': {'shipment_id': 1, 'timestamp': -1}},
+        {'$group': {'_id': '$shipment_id', 'event': {'$first': '$$ROOT'}}}
+    ]
+    updates = []
+    updated = 0
+    for row in TrackingEvent._get_collection().aggregate(pipeline, allowDiskUse=True):
+        event = TrackingEvent._from_son(row['event'])
+        # Status is left alone: quote and booking flows may have moved it since
+        updates.append(UpdateOne({'_id': row['_id']}, {'$set': {
+            'latest_event': event.to_snapshot().to_mongo().to_dict(),
+            'updated_at': datetime.utcnow()
+        }}))
+        if len(updates) >= batch_size:
+            if not dry_run:
+                Shipment._get_collection().bulk_write(updates, ordered=False)
+            updated += len(updates)
+            updates = []
+
+    if updates:
+        if not dry_run:
+            Shipment._get_collection().bulk_write(updates, ordered=False)
+        updated += len(updates)
+
+    prefix = "[dry run] " if dry_run else ""
+    click.echo(f"{prefix}Backfilled latest_event on {updated} shipments")
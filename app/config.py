@@ -10,6 +10,16 @@ class Config:
     API_V1_STR = os.getenv('API_V1_STR', '/api')
     DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+    LOG_ACCESS_ENABLED = os.getenv('LOG_ACCESS_ENABLED', 'True').lower() == 'true'
+    # Fraction of requests that get verbose DEBUG request logs, with per-endpoint
+    # overrides such as "shipment.create_shipment=0.1,auth.login=0"
+    LOG_REQUEST_SAMPLE_RATE = float(os.getenv('LOG_REQUEST_SAMPLE_RATE', 0.01))
+    LOG_REQUEST_SAMPLE_RATES = {
+        endpoint.strip(): float(rate)
+        for endpoint, rate in (item.split('=', 1) for item in os.getenv('LOG_REQUEST_SAMPLE_RATES', '').split(',') if '=' in item)
+    }
     
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', SECRET_KEY)
@@ -24,9 +34,89 @@ class Config:
     SUPABASE_SERVICE_ROLE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
     STORAGE_BUCKET = os.getenv('STORAGE_BUCKET')
     STORAGE_REGION = os.getenv('STORAGE_REGION')
+    STORAGE_POOL_CONNECTIONS = int(os.getenv('STORAGE_POOL_CONNECTIONS', 4))
+    STORAGE_POOL_MAXSIZE = int(os.getenv('STORAGE_POOL_MAXSIZE', 16))
+    STORAGE_CONNECT_TIMEOUT_SECONDS = float(os.getenv('STORAGE_CONNECT_TIMEOUT_SECONDS', 5))
+    STORAGE_READ_TIMEOUT_SECONDS = float(os.getenv('STORAGE_READ_TIMEOUT_SECONDS', 60))
+    STORAGE_MAX_RETRIES = int(os.getenv('STORAGE_MAX_RETRIES', 3))
+    STORAGE_BACKOFF_SECONDS = float(os.getenv('STORAGE_BACKOFF_SECONDS', 0.5))
+    # Supabase's resumable (TUS) endpoint requires 6 MB chunks
+    STORAGE_RESUMABLE_THRESHOLD_BYTES = int(os.getenv('STORAGE_RESUMABLE_THRESHOLD_BYTES', 6 * 1024 * 1024))
+    STORAGE_CHUNK_SIZE_BYTES = int(os.getenv('STORAGE_CHUNK_SIZE_BYTES', 6 * 1024 * 1024))
+    
+    IO_EXECUTOR_MAX_WORKERS = int(os.getenv('IO_EXECUTOR_MAX_WORKERS', 16))
+    
+    TRACKING_BULK_MAX_EVENTS = int(os.getenv('TRACKING_BULK_MAX_EVENTS', 5000))
+    TRACKING_STREAM_MAX_CONNECTIONS = int(os.getenv('TRACKING_STREAM_MAX_CONNECTIONS', 500))
+    TRACKING_STREAM_QUEUE_SIZE = int(os.getenv('TRACKING_STREAM_QUEUE_SIZE', 100))
+    TRACKING_STREAM_HEARTBEAT_SECONDS = float(os.getenv('TRACKING_STREAM_HEARTBEAT_SECONDS', 15))
+    TRACKING_STREAM_REPLAY_LIMIT = int(os.getenv('TRACKING_STREAM_REPLAY_LIMIT', 500))
+    TRACKING_CHANGE_STREAM_ENABLED = os.getenv('TRACKING_CHANGE_STREAM_ENABLED', 'False').lower() == 'true'
+    
+    QUERY_PROFILER_ENABLED = os.getenv('QUERY_PROFILER_ENABLED', 'True').lower() == 'true'
+    # X-DB-Queries / Server-Timing headers; on wherever DEBUG is unless set explicitly
+    QUERY_PROFILER_HEADERS = os.getenv('QUERY_PROFILER_HEADERS', str(DEBUG)).lower() == 'true'
+    QUERY_PROFILER_MAX_QUERIES = int(os.getenv('QUERY_PROFILER_MAX_QUERIES', 25))
+    QUERY_PROFILER_REPEAT_THRESHOLD = int(os.getenv('QUERY_PROFILER_REPEAT_THRESHOLD', 5))
+    
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    # When set, /metrics requires "Authorization: Bearer <token>"
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    # Levels well below the maximum: most of the ratio for a fraction of the CPU
+    COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+    COMPRESSION_MIMETYPES = os.getenv(
+        'COMPRESSION_MIMETYPES', 'application/json,text/event-stream,text/plain,text/html,text/csv'
+    ).split(',')
     
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
     ENABLE_AI_EXTRACTION = os.getenv('ENABLE_AI_EXTRACTION', 'True').lower() == 'true'
+    # Deadlines per Gemini call; extraction sends whole files, so it gets longer
+    AI_TIMEOUT_SECONDS = float(os.getenv('AI_TIMEOUT_SECONDS', 20))
+    AI_EXTRACTION_TIMEOUT_SECONDS = float(os.getenv('AI_EXTRACTION_TIMEOUT_SECONDS', 90))
+    AI_MAX_CONCURRENCY = int(os.getenv('AI_MAX_CONCURRENCY', 16))
+    # The breaker opens when AI_BREAKER_FAILURE_RATIO of at least AI_BREAKER_MIN_CALLS
+    # calls in the window fail, then rejects calls for the cooldown before probing again
+    AI_BREAKER_WINDOW_SECONDS = float(os.getenv('AI_BREAKER_WINDOW_SECONDS', 60))
+    AI_BREAKER_MIN_CALLS = int(os.getenv('AI_BREAKER_MIN_CALLS', 10))
+    AI_BREAKER_FAILURE_RATIO = float(os.getenv('AI_BREAKER_FAILURE_RATIO', 0.5))
+    AI_BREAKER_COOLDOWN_SECONDS = float(os.getenv('AI_BREAKER_COOLDOWN_SECONDS', 30))
+    AI_WARMUP_ENABLED = os.getenv('AI_WARMUP_ENABLED', 'False').lower() == 'true'
+    # Rate and customs predictions are cached per normalized question; rates and
+    # duties are bucketed so near-identical amounts share an answer
+    AI_PREDICTION_CACHE_MAX_SIZE = int(os.getenv('AI_PREDICTION_CACHE_MAX_SIZE', 2048))
+    AI_RATE_CACHE_TTL_SECONDS = float(os.getenv('AI_RATE_CACHE_TTL_SECONDS', 900))
+    AI_CUSTOMS_CACHE_TTL_SECONDS = float(os.getenv('AI_CUSTOMS_CACHE_TTL_SECONDS', 3600))
+    AI_RATE_BUCKET_USD = float(os.getenv('AI_RATE_BUCKET_USD', 50))
+    AI_DUTY_BUCKET_USD = float(os.getenv('AI_DUTY_BUCKET_USD', 1000))
+    # Local rate model fitted on our own quotes; Gemini only answers lanes it has
+    # fewer than RATE_ENGINE_MIN_SAMPLES recent observations for
+    RATE_ENGINE_ENABLED = os.getenv('RATE_ENGINE_ENABLED', 'True').lower() == 'true'
+    RATE_ENGINE_MIN_SAMPLES = int(os.getenv('RATE_ENGINE_MIN_SAMPLES', 5))
+    RATE_ENGINE_WINDOW_DAYS = float(os.getenv('RATE_ENGINE_WINDOW_DAYS', 180))
+    RATE_ENGINE_HALF_LIFE_DAYS = float(os.getenv('RATE_ENGINE_HALF_LIFE_DAYS', 30))
+    RATE_ENGINE_HORIZON_DAYS = int(os.getenv('RATE_ENGINE_HORIZON_DAYS', 14))
+    RATE_ENGINE_TREND_THRESHOLD = float(os.getenv('RATE_ENGINE_TREND_THRESHOLD', 0.02))
+    RATE_ENGINE_RETRAIN_SECONDS = float(os.getenv('RATE_ENGINE_RETRAIN_SECONDS', 3600))
+    # Local customs-delay model built from tracking history; ports with fewer clearances
+    # than CUSTOMS_ENGINE_MIN_SAMPLES still go to Gemini for single predictions
+    CUSTOMS_ENGINE_ENABLED = os.getenv('CUSTOMS_ENGINE_ENABLED', 'True').lower() == 'true'
+    CUSTOMS_ENGINE_MIN_SAMPLES = int(os.getenv('CUSTOMS_ENGINE_MIN_SAMPLES', 10))
+    CUSTOMS_ENGINE_PRIOR_WEIGHT = float(os.getenv('CUSTOMS_ENGINE_PRIOR_WEIGHT', 10))
+    CUSTOMS_ENGINE_RETRAIN_SECONDS = float(os.getenv('CUSTOMS_ENGINE_RETRAIN_SECONDS', 3600))
+    CUSTOMS_HIGH_RISK_DAYS = float(os.getenv('CUSTOMS_HIGH_RISK_DAYS', 5))
+    CUSTOMS_LOW_RISK_DAYS = float(os.getenv('CUSTOMS_LOW_RISK_DAYS', 2))
+    CUSTOMS_BATCH_MAX_ITEMS = int(os.getenv('CUSTOMS_BATCH_MAX_ITEMS', 1000))
+    # Local document-type classifier over the PDF text layer; documents it is unsure
+    # about (and scans/images) still go to Gemini
+    DOC_CLASSIFIER_ENABLED = os.getenv('DOC_CLASSIFIER_ENABLED', 'True').lower() == 'true'
+    DOC_CLASSIFIER_MIN_SCORE = float(os.getenv('DOC_CLASSIFIER_MIN_SCORE', 0.35))
+    DOC_CLASSIFIER_MIN_MARGIN = float(os.getenv('DOC_CLASSIFIER_MIN_MARGIN', 0.1))
+    DOC_CLASSIFIER_MIN_TEXT_CHARS = int(os.getenv('DOC_CLASSIFIER_MIN_TEXT_CHARS', 80))
+    DOC_CLASSIFIER_MAX_TEXT_CHARS = int(os.getenv('DOC_CLASSIFIER_MAX_TEXT_CHARS', 20000))
     
     REDIS_URL = os.getenv('REDIS_URL')
     
@@ -43,4 +133,16 @@ class Config:
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:3000,http://localhost:5173,http://127.0.0.1:5173')
     
     RATE_LIMIT_PER_MINUTE = int(os.getenv('RATE_LIMIT_PER_MINUTE', 100))
-
+    
+    IDENTITY_CACHE_MAX_SIZE = int(os.getenv('IDENTITY_CACHE_MAX_SIZE', 1024))
+    IDENTITY_CACHE_TTL_SECONDS = float(os.getenv('IDENTITY_CACHE_TTL_SECONDS', 60))
+    
+    EXTRACTION_WORKER_CONCURRENCY = int(os.getenv('EXTRACTION_WORKER_CONCURRENCY', 2))
+    EXTRACTION_WORKER_IN_PROCESS = os.getenv('EXTRACTION_WORKER_IN_PROCESS', 'True').lower() == 'true'
+    EXTRACTION_WORKER_POLL_SECONDS = float(os.getenv('EXTRACTION_WORKER_POLL_SECONDS', 2))
+    EXTRACTION_JOB_MAX_ATTEMPTS = int(os.getenv('EXTRACTION_JOB_MAX_ATTEMPTS', 3))
+    EXTRACTION_JOB_BACKOFF_SECONDS = float(os.getenv('EXTRACTION_JOB_BACKOFF_SECONDS', 30))
+    EXTRACTION_JOB_LEASE_SECONDS = int(os.getenv('EXTRACTION_JOB_LEASE_SECONDS', 600))
+    
+    EXTRACTION_CACHE_ENABLED = os.getenv('EXTRACTION_CACHE_ENABLED', 'True').lower() == 'true'
+    EXTRACTION_CACHE_TTL_SECONDS = int(os.getenv('EXTRACTION_CACHE_TTL_SECONDS', 30 * 24 * 3600))
@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required
 from app.models.user import User
 from app.utils.auth import hash_password, verify_password, create_token, get_current_user
 from app.utils.validators import validate_email_format, validate_phone, validate_request_json
+from app.utils.structured_logging import verbose_request_logging
 from app.views.response_formatter import success_response, error_response, validation_error_response
 import re
 
@@ -99,14 +100,10 @@ def login():
     if request.method == 'OPTIONS':
         return '', 200
     
-    # Log request details for debugging
+    # Sampled, and never the raw body: it carries the password
     from flask import current_app
-    if current_app:
-        current_app.logger.debug(f"Login request - Content-Type: {request.content_type}")
-        current_app.logger.debug(f"Login request - Headers: {dict(request.headers)}")
-        current_app.logger.debug(f"Login request - Data: {request.data}")
-        current_app.logger.debug(f"Login request - is_json: {request.is_json}")
-        current_app.logger.debug(f"Login request - form: {request.form}")
+    if verbose_request_logging():
+        current_app.logger.debug(f"Login request - Content-Type: {request.content_type}, is_json: {request.is_json}")
     
     # Accept both JSON and form data for Flutter compatibility
     if request.is_json:
@@ -136,20 +133,12 @@ def login():
     try:
         user = User.objects(email=email).first()
         
-        if current_app:
-            current_app.logger.debug(f"Login attempt - Email: {email}")
-            current_app.logger.debug(f"Login attempt - User found: {user is not None}")
-            if user:
-                current_app.logger.debug(f"Login attempt - User ID: {user.id}, Role: {user.role}")
-        
         if not user:
             if current_app:
                 current_app.logger.warning(f"Login failed - User not found: {email}")
             return error_response("Unauthorized", "Incorrect email or password", "auth", True, status_code=401)
         
         password_valid = verify_password(password, user.hashed_password)
-        if current_app:
-            current_app.logger.debug(f"Login attempt - Password valid: {password_valid}")
         
         if not password_valid:
             if current_app:
@@ -1,5 +1,6 @@
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required
+from app.config import Config
 from app.utils.validators import validate_request_json
 from app.views.response_formatter import success_response, error_response, validation_error_response
 import uuid
@@ -121,3 +122,58 @@ def predict_delay():
     
     return success_response(prediction)
 
+
+
+@customs_bp.route('/ai/prediction/batch', methods=['POST'])
+@jwt_required()
+def predict_delay_batch():
+    data, error_response_obj, status = validate_request_json()
+    if error_response_obj:
+        return error_response_obj, status
+    
+    shipments = data.get('shipments')
+    if not isinstance(shipments, list) or not shipments:
+        return validation_error_response([{"loc": ["shipments"], "msg": "Shipments must be a non-empty list", "type": "value_error"}])
+    if len(shipments) > Config.CUSTOMS_BATCH_MAX_ITEMS:
+        return validation_error_response([{"loc": ["shipments"], "msg": f"At most {Config.CUSTOMS_BATCH_MAX_ITEMS} shipments per request", "type": "value_error"}])
+    
+    errors = []
+    items = []
+    for i, shipment in enumerate(shipments):
+        if not isinstance(shipment, dict):
+            errors.append({"loc": ["shipments", i], "msg": "Shipment must be an object", "type": "value_error"})
+            continue
+        port = shipment.get('port')
+        rms_examination = shipment.get('rmsExamination')
+        duty_amount = shipment.get('dutyAmount')
+        documents_complete = shipment.get('documentsComplete')
+        
+        if not port:
+            errors.append({"loc": ["shipments", i, "port"], "msg": "Port is required", "type": "value_error"})
+        if rms_examination is None:
+            errors.append({"loc": ["shipments", i, "rmsExamination"], "msg": "RMS examination status is required", "type": "value_error"})
+        if duty_amount is None or not isinstance(duty_amount, (int, float)):
+            errors.append({"loc": ["shipments", i, "dutyAmount"], "msg": "Duty amount is required and must be a number", "type": "value_error"})
+        if documents_complete is None:
+            errors.append({"loc": ["shipments", i, "documentsComplete"], "msg": "Documents complete status is required", "type": "value_error"})
+        items.append({
+            "port": port,
+            "rms_examination": rms_examination,
+            "duty_amount": duty_amount,
+            "documents_complete": documents_complete
+        })
+    
+    if errors:
+        return validation_error_response(errors)
+    
+    from app.services.ai_service import AIService
+    ai_service = AIService()
+    try:
+        predictions = ai_service.predict_customs_delay_batch(items)
+    except Exception as e:
+        return error_response("Service Unavailable", str(e), "customs", True, status_code=503)
+    
+    for shipment, prediction in zip(shipments, predictions):
+        if shipment.get('shipmentId'):
+            prediction["shipmentId"] = shipment['shipmentId']
+    return success_response({"predictions": predictions, "count": len(predictions)})
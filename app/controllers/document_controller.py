@@ -1,18 +1,30 @@
-from flask import Blueprint, request, current_app
+from flask import Blueprint, request, current_app, Response, redirect
 from flask_jwt_extended import jwt_required
+from werkzeug.http import dump_options_header
 from werkzeug.utils import secure_filename
 from bson import ObjectId
+from app.config import Config
 from app.models.document import DocumentModel, ExtractionJob
 from app.models.shipment import Shipment
 from app.utils.auth import get_current_user
 from app.services.storage_service import StorageService
 from app.services.ai_service import AIService
-from app.views.response_formatter import success_response, error_response
+from app.services.document_classifier import document_classifier
+from app.services.extraction_worker import enqueue_extraction
+from app.utils.executor import get_io_executor, timed
+from app.utils.structured_logging import verbose_request_logging
+from app.views.response_formatter import (
+    success_response, error_response, make_etag, cache_headers, is_not_modified, not_modified_response
+)
 import os
 import uuid
 import requests
 import base64
 import re
+import time
+import threading
+import unicodedata
+from urllib.parse import quote
 from datetime import datetime
 
 document_bp = Blueprint('document', __name__)
@@ -90,10 +102,40 @@ def clean_numeric_value(value):
         return None
 
     
+def remove_when_done(temp_path, futures):
+    """Delete ``temp_path`` once no background stage can still be reading it.
+
+    Stages that have not started are cancelled; running ones delete the file
+    from their done-callback when they finish.
+    """
+    if not temp_path:
+        return
+    running = [future for future in futures if not future.cancel() and not future.done()]
+    if not running:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return
+
+    remaining = [len(running)]
+    lock = threading.Lock()
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    for future in running:
+        future.add_done_callback(on_done)
+
+
 @document_bp.route('/uploadInvoice', methods=['POST'])
 @jwt_required()
 def upload_invoice():
     temp_path = None
+    stage_futures = []
     try:
         shipment_id = request.form.get("shipment_id")
         if not shipment_id:
@@ -127,21 +169,26 @@ def upload_invoice():
         file.save(temp_path)
 
         mime_type = file.content_type or 'application/octet-stream'
-        
-        with open(temp_path, 'rb') as image_file:
-            image_base64 = base64.b64encode(image_file.read()).decode('utf-8')
 
         storage_service = StorageService()
         storage_path = storage_service.generate_document_path(shipment_id, filename)
-        file_url = storage_service.upload_file(temp_path, storage_path)
+        ai_service = AIService()
+
+        # Storage upload and AI extraction are independent network calls, so
+        # the request waits for the slower of the two instead of their sum
+        stages_start = time.time()
+        executor = get_io_executor()
+        upload_future = executor.submit(timed, storage_service.upload_file, temp_path, storage_path, mime_type)
+        extraction_future = executor.submit(timed, ai_service.extract_document_data, temp_path, "invoice")
+        stage_futures = [upload_future, extraction_future]
 
+        file_url, upload_time_ms = upload_future.result()
         if not file_url:
-            if temp_path and os.path.exists(temp_path):
-                os.remove(temp_path)
             return error_response("Internal Server Error", "Failed to upload file to storage", "documents", False, 500)
 
-        ai_service = AIService()
-        extracted_data, confidence, method = ai_service.extract_document_data(temp_path, "invoice")
+        (extracted_data, confidence, method), extraction_time_ms = extraction_future.result()
+        stages_time_ms = int((time.time() - stages_start) * 1000)
+        current_app.logger.info(f"Invoice stages - Upload: {upload_time_ms}ms, Extraction: {extraction_time_ms}ms, Wall: {stages_time_ms}ms")
         
         if not extracted_data:
             current_app.logger.warning("No data extracted from invoice")
@@ -255,20 +302,8 @@ def upload_invoice():
         # Log extracted invoice details for debugging
         current_app.logger.info(f"Invoice extracted - Number: {invoice_number}, Seller: {seller_name}, Buyer: {buyer_name}, Total: {total_amount}, Items: {len(items) if items else 0}")
 
-        if not shipment.metadata:
-            shipment.metadata = {}
-        shipment.metadata['invoice_details'] = invoice_details
-        shipment.metadata['invoice_image_base64'] = image_base64
-        shipment.metadata['invoice_image_mime_type'] = mime_type
-        shipment.save()
-
         file_size = os.path.getsize(temp_path)
 
-        document_metadata = {
-            'base64_image': image_base64,
-            'base64_mime_type': mime_type
-        }
-
         document = DocumentModel(
             shipment_id=shipment,
             uploaded_by=user,
@@ -280,24 +315,34 @@ def upload_invoice():
             extracted_data=invoice_data,
             confidence_score=confidence,
             extraction_method=method,
-            needs_review=confidence < 0.8,
-            metadata=document_metadata
+            needs_review=confidence < 0.8
         )
+        with open(temp_path, 'rb') as image_file:
+            document.file_blob.put(image_file, content_type=mime_type, filename=filename)
         document.save()
 
+        if not shipment.metadata:
+            shipment.metadata = {}
+        shipment.metadata['invoice_details'] = invoice_details
+        shipment.metadata['invoice_document_id'] = str(document.id)
+        shipment.metadata['invoice_image_mime_type'] = mime_type
+        shipment.save()
+
         extraction_job = ExtractionJob(
             document_id=document,
-            status='completed' if extracted_data else 'failed'
+            status='completed' if extracted_data else 'failed',
+            model_used=method,
+            # As in the worker: a cache hit records the extraction time it saved
+            processing_time_ms=ai_service.cache_saved_ms if ai_service.cache_saved_ms is not None else extraction_time_ms
         )
         extraction_job.save()
 
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
+        if verbose_request_logging():
+            current_app.logger.debug("Invoice parsed", extra={'data': {
+                'invoice_data': invoice_data, 'invoice_details': invoice_details
+            }})
 
-        print(invoice_data)
-        print(invoice_details)
-
-        return success_response(
+        response, status_code = success_response(
             "Invoice uploaded and processed",
             {
                 "file_url": file_url,
@@ -308,10 +353,12 @@ def upload_invoice():
                 "shipment_id": str(shipment.id)
             }
         )
+        response.headers['Server-Timing'] = f"storage;dur={upload_time_ms}, extraction;dur={extraction_time_ms}, parallel;dur={stages_time_ms}"
+        return response, status_code
     except Exception as e:
-        if temp_path and os.path.exists(temp_path):
-            os.remove(temp_path)
         return error_response("Internal Server Error", str(e), "documents", False, 500)
+    finally:
+        remove_when_done(temp_path, stage_futures)
 
 @document_bp.route('/shipments/<shipment_id>/upload', methods=['POST'])
 @jwt_required()
@@ -339,10 +386,10 @@ def upload_document(shipment_id):
         if not allowed_file(file.filename):
             return error_response("Invalid input", "Invalid file type. Allowed: PDF, JPEG, PNG", "documents", True, status_code=400)
         
-        document_type = request.form.get('document_type', 'invoice')
+        document_type = request.form.get('document_type')
         valid_types = ['invoice', 'packing_list', 'commercial_invoice', 'certificate_of_origin', 
                       'bill_of_lading', 'house_bl', 'master_bl', 'telex_release', 'other']
-        if document_type not in valid_types:
+        if document_type and document_type not in valid_types:
             document_type = 'invoice'
         
         filename = secure_filename(file.filename)
@@ -351,16 +398,22 @@ def upload_document(shipment_id):
         temp_path = os.path.join(upload_folder, f"{uuid.uuid4()}_{filename}")
         file.save(temp_path)
         
+        mime_type = file.content_type or 'application/octet-stream'
+        
+        # Untyped uploads are typed from their text layer when it is unambiguous; no Gemini call
+        if not document_type:
+            detected = document_classifier.classify_file(temp_path, mime_type) if Config.DOC_CLASSIFIER_ENABLED else None
+            document_type = detected[0] if detected else 'invoice'
+        
         storage_service = StorageService()
         storage_path = storage_service.generate_document_path(shipment_id, filename)
-        file_url = storage_service.upload_file(temp_path, storage_path)
+        file_url = storage_service.upload_file(temp_path, storage_path, mime_type)
         
         if not file_url:
             if temp_path and os.path.exists(temp_path):
                 os.remove(temp_path)
             return error_response("Internal Server Error", "Failed to upload file to storage", "documents", False, status_code=500)
         
-        mime_type = file.content_type or 'application/octet-stream'
         file_size = os.path.getsize(temp_path)
         
         document = DocumentModel(
@@ -372,17 +425,12 @@ def upload_document(shipment_id):
             file_size=file_size,
             mime_type=mime_type
         )
+        with open(temp_path, 'rb') as document_file:
+            document.file_blob.put(document_file, content_type=mime_type, filename=filename)
         document.save()
         
-        extraction_job = ExtractionJob(
-            document_id=document,
-            status='pending'
-        )
-        extraction_job.save()
-        
-        from threading import Thread
-        thread = Thread(target=process_document_extraction, args=(str(document.id), temp_path))
-        thread.start()
+        # Workers read the file back from GridFS, so the temp copy can go now
+        enqueue_extraction(document)
         
         if temp_path and os.path.exists(temp_path):
             os.remove(temp_path)
@@ -394,46 +442,6 @@ def upload_document(shipment_id):
         return error_response("Internal Server Error", str(e), "documents", False, status_code=500)
 
 
-def process_document_extraction(document_id: str, file_path: str):
-    from app import create_app
-    app = create_app()
-    with app.app_context():
-        try:
-            document = DocumentModel.objects(id=document_id).first()
-            if not document:
-                if file_path and os.path.exists(file_path):
-                    os.remove(file_path)
-                return
-            
-            ai_service = AIService()
-            extracted_data, confidence, method = ai_service.extract_document_data(file_path, document.type)
-            
-            document.extracted_data = extracted_data
-            document.confidence_score = confidence
-            document.extraction_method = method
-            document.needs_review = confidence < 0.8
-            document.save()
-            
-            extraction_job = ExtractionJob.objects(document_id=document).first()
-            if extraction_job:
-                extraction_job.status = 'completed' if extracted_data else 'failed'
-                extraction_job.save()
-        except Exception as e:
-            try:
-                document = DocumentModel.objects(id=document_id).first()
-                if document:
-                    extraction_job = ExtractionJob.objects(document_id=document).first()
-                    if extraction_job:
-                        extraction_job.status = 'failed'
-                        extraction_job.error_message = str(e)
-                        extraction_job.save()
-            except:
-                pass
-        finally:
-            if file_path and os.path.exists(file_path):
-                os.remove(file_path)
-
-
 @document_bp.route('/shipments/<shipment_id>/list', methods=['GET'])
 @jwt_required()
 def get_shipment_documents(shipment_id):
@@ -445,16 +453,13 @@ def get_shipment_documents(shipment_id):
         if not shipment:
             return error_response("Not Found", "Shipment not found", "documents", True, status_code=404)
         
-        documents = DocumentModel.objects(shipment_id=shipment).all()
-        documents_list = []
-        for doc in documents:
-            doc_dict = doc.to_dict()
-            # Include base64 image if available
-            if doc.metadata and 'base64_image' in doc.metadata:
-                doc_dict['metadata'] = doc.metadata
-            documents_list.append(doc_dict)
+        documents = list(DocumentModel.objects(shipment_id=shipment).no_dereference())
+        etag = make_etag(*((document.id, document.updated_at or document.created_at) for document in documents))
+        if is_not_modified(etag):
+            return not_modified_response(etag)
         
-        return success_response(documents_list, status_code=200)
+        return success_response(DocumentModel.to_dict_list(documents, include_uploader_info=True),
+                                status_code=200, etag=etag)
     except Exception as e:
         return error_response("Service Unavailable", f"Database error: {str(e)}", "database", True, status_code=503)
 
@@ -479,24 +484,14 @@ def get_shipment_invoice(shipment_id):
         
         # Get invoice details from shipment metadata
         invoice_details = None
-        invoice_image_base64 = None
-        invoice_image_mime_type = None
-        
         if shipment.metadata:
             invoice_details = shipment.metadata.get('invoice_details')
-            invoice_image_base64 = shipment.metadata.get('invoice_image_base64')
-            invoice_image_mime_type = shipment.metadata.get('invoice_image_mime_type')
-        
-        # Also check document metadata for base64 image
-        if not invoice_image_base64 and invoice_document.metadata:
-            invoice_image_base64 = invoice_document.metadata.get('base64_image')
-            invoice_image_mime_type = invoice_document.metadata.get('base64_mime_type')
         
         response_data = {
             'document': invoice_data,
             'invoice_details': invoice_details,
-            'invoice_image_base64': invoice_image_base64,
-            'invoice_image_mime_type': invoice_image_mime_type,
+            'invoice_image_url': invoice_data['content_url'],
+            'invoice_image_mime_type': invoice_document.mime_type,
             'file_url': invoice_document.file_url,
             'extracted_data': invoice_document.extracted_data,
             'confidence_score': invoice_document.confidence_score,
@@ -511,11 +506,74 @@ def get_shipment_invoice(shipment_id):
 @jwt_required()
 def get_document(document_id):
     try:
-        document = DocumentModel.objects(id=document_id).first()
+        document = DocumentModel.objects(id=document_id).only('id', 'created_at', 'updated_at').first()
         if not document:
             return error_response("Not Found", "Document not found", "documents", True, status_code=404)
         
-        return success_response(document.to_dict(), status_code=200)
+        last_modified = document.updated_at or document.created_at
+        etag = make_etag(document.id, last_modified)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        
+        document = DocumentModel.objects(id=document.id).exclude('file_blob').first()
+        return success_response(document.to_dict(), status_code=200, etag=etag, last_modified=last_modified)
+    except Exception as e:
+        return error_response("Service Unavailable", f"Database error: {str(e)}", "database", True, status_code=503)
+
+
+def inline_disposition(file_name):
+    """``inline`` Content-Disposition for a stored name, encoded the way ``send_file`` does.
+
+    The name is quoted and escaped; non-ASCII names get an ASCII fallback plus
+    an RFC 5987 ``filename*``. Line breaks are dropped so they cannot end the header.
+    """
+    file_name = re.sub(r'[\r\n]', '', file_name or '') or 'document'
+    try:
+        file_name.encode('ascii')
+        options = {'filename': file_name}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', file_name).encode('ascii', 'ignore').decode('ascii')
+        options = {'filename': simple or 'document', 'filename*': f"UTF-8''{quote(file_name, safe='!#$&+^`|~')}"}
+    return dump_options_header('inline', options)
+
+
+@document_bp.route('/<document_id>/content', methods=['GET'])
+@jwt_required()
+def get_document_content(document_id):
+    try:
+        try:
+            document = DocumentModel.objects(id=document_id).exclude('extracted_data').first()
+        except:
+            document = None
+        if not document:
+            return error_response("Not Found", "Document not found", "documents", True, status_code=404)
+        
+        if document.file_blob:
+            # Stored bytes never change for a given GridFS file
+            etag = make_etag(document.file_blob.grid_id)
+            if is_not_modified(etag):
+                return not_modified_response(etag)
+        
+        blob = document.file_blob.get() if document.file_blob else None
+        if blob is not None:
+            def generate():
+                for chunk in blob:
+                    yield chunk
+            
+            return Response(generate(), mimetype=blob.content_type or document.mime_type, headers={
+                'Content-Length': str(blob.length),
+                'Content-Disposition': inline_disposition(document.file_name),
+                **cache_headers(etag)
+            })
+        
+        # Fall back for documents not yet moved by migrate-invoice-images
+        if document.metadata and document.metadata.get('base64_image'):
+            return Response(base64.b64decode(document.metadata['base64_image']),
+                            mimetype=document.metadata.get('base64_mime_type') or document.mime_type)
+        if document.file_url:
+            return redirect(document.file_url)
+        
+        return error_response("Not Found", "Document has no stored content", "documents", True, status_code=404)
     except Exception as e:
         return error_response("Service Unavailable", f"Database error: {str(e)}", "database", True, status_code=503)
 
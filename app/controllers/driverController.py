@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required, create_access_token, get_jwt_identi
 from app.models.driver import Driver
 from app.models.shipment import Shipment
 from app.utils.auth import hash_password, verify_password
+from app.utils.identity_cache import resolve_identity
 from app.utils.validators import validate_email_format, validate_request_json
 from app.views.response_formatter import success_response, error_response, validation_error_response
 import logging
@@ -19,10 +20,10 @@ def get_current_driver():
     driver_id = claims.get('driver_id')
     
     if driver_id:
-        return Driver.objects(id=driver_id).first()
+        return resolve_identity(Driver, 'Driver', id=driver_id)
     else:
         # Fallback to email lookup
-        return Driver.objects(email=email).first()
+        return resolve_identity(Driver, 'Driver', email=email)
 
 
 def create_driver_token(driver: Driver) -> dict:
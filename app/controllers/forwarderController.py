@@ -4,6 +4,7 @@ from app.models.shipment import Shipment
 from app.models.user import User
 from app.models.driver import Driver
 from app.utils.auth import get_current_user
+from app.utils.pagination import parse_limit, keyset_before, encode_cursor, InvalidCursor
 from app.views.response_formatter import success_response, error_response
 from mongoengine import Q
 import logging
@@ -24,8 +25,7 @@ def show_shipments():
         if not user:
             return error_response("Unauthorized", "User not found", "auth", True, status_code=401)
         
-        checkForwarder = User.objects(id=user.id, role='forwarder').first()
-        if not checkForwarder:
+        if user.role != 'forwarder':
             return error_response("Unauthorized", "User is not a forwarder", "auth", True, status_code=401)
         
         # Get all shipments without forwarder_id (available for bidding)
@@ -48,11 +48,10 @@ def my_profile():
         if not user:
             return error_response("Unauthorized", "User not found", "auth", True, status_code=401)
         
-        checkForwarder = User.objects(id=user.id, role='forwarder').first()
-        if not checkForwarder:
+        if user.role != 'forwarder':
             return error_response("Unauthorized", "User is not a forwarder", "auth", True, status_code=401)
         
-        return success_response(checkForwarder.to_dict(), status_code=200)
+        return success_response(user.to_dict(), status_code=200)
     except Exception as e:
         logger.error(f"Error in my_profile: {str(e)}", exc_info=True)
         return error_response("Service Unavailable", str(e), "database", True, status_code=503)
@@ -69,8 +68,7 @@ def request_accept(shipment_id):
         if not user:
             return error_response("Unauthorized", "User not found", "auth", True, status_code=401)
         
-        checkForwarder = User.objects(id=user.id, role='forwarder').first()
-        if not checkForwarder:
+        if user.role != 'forwarder':
             return error_response("Unauthorized", "User is not a forwarder", "auth", True, status_code=401)
         
         # Parse request data
@@ -132,8 +130,7 @@ def all_quotes():
         if not user:
             return error_response("Unauthorized", "User not found", "auth", True, status_code=401)
         
-        checkForwarder = User.objects(id=user.id, role='forwarder').first()
-        if not checkForwarder:
+        if user.role != 'forwarder':
             return error_response("Unauthorized", "User is not a forwarder", "auth", True, status_code=401)
         
         # Get all shipments where this forwarder has submitted quotes
@@ -155,37 +152,65 @@ def accepted_quotes():
         if not user:
             return error_response("Unauthorized", "User not found", "auth", True, status_code=401)
         
-        checkForwarder = User.objects(id=user.id, role='forwarder').first()
-        if not checkForwarder:
+        if user.role != 'forwarder':
             return error_response("Unauthorized", "User is not a forwarder", "auth", True, status_code=401)
         
-        # Get shipments where supplier accepted this forwarder's quote
-        # status='booked' means supplier accepted, forwarder_id or quote_forwarder_id matches this forwarder
-        # Query by both forwarder_id and quote_forwarder_id to catch all accepted quotes
-        accepted_quotes = Shipment.objects(
-            Q(status='booked') &
-            Q(quote_status='accepted') &
-            (Q(forwarder_id=user.id) | Q(quote_forwarder_id=user.id))
-        ).all()
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            query = (
+                Q(status='booked') &
+                Q(quote_status='accepted') &
+                (Q(forwarder_id=user.id) | Q(quote_forwarder_id=user.id))
+            )
+            after = request.args.get('after')
+            if after:
+                query = query & keyset_before('created_at', after)
+        except (ValueError, InvalidCursor) as e:
+            return error_response("Invalid input", str(e), "shipments", True, status_code=400)
+        
+        # One round trip: the queryset contributes $match, $sort and $limit, and
+        # suppliers are joined only for the rows on this page
+        rows = list(
+            Shipment.objects(query)
+            .order_by('-created_at', '-id')
+            .limit(limit + 1)
+            .aggregate([
+                {'$lookup': {
+                    'from': User._get_collection_name(),
+                    'let': {'supplier_id': '$supplier_id'},
+                    'pipeline': [
+                        {'$match': {'$expr': {'$eq': ['$_id', '$$supplier_id']}}},
+                        {'$project': {'_id': 0, 'name': 1, 'email': 1, 'phone': 1, 'company_name': 1}}
+                    ],
+                    'as': 'supplier_details'
+                }}
+            ])
+        )
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['_id'])
         
-        # Include supplier details for each quote
         result = []
-        for quote in accepted_quotes:
-            quote_dict = quote.to_dict()
-            if quote.supplier_id:
-                supplier = User.objects(id=quote.supplier_id.id).first()
-                if supplier:
-                    quote_dict['supplier_details'] = {
-                        'name': supplier.name,
-                        'email': supplier.email,
-                        'phone': supplier.phone,
-                        'company_name': supplier.company_name,
-                    }
+        for row in rows:
+            suppliers = row.pop('supplier_details', [])
+            quote_dict = Shipment.raw_to_dict(row)
+            if suppliers:
+                quote_dict['supplier_details'] = {
+                    'name': suppliers[0].get('name'),
+                    'email': suppliers[0].get('email'),
+                    'phone': suppliers[0].get('phone'),
+                    'company_name': suppliers[0].get('company_name'),
+                }
             result.append(quote_dict)
         
-        logger.info(f"Found {len(accepted_quotes)} accepted quotes for forwarder {user.id} (user_id: {str(user.id)})")
+        logger.info(f"Found {len(result)} accepted quotes for forwarder {user.id} (user_id: {str(user.id)})")
         
-        return success_response(result, status_code=200)
+        return success_response({
+            'data': result,
+            'next_cursor': next_cursor
+        }, status_code=200)
     except Exception as e:
         logger.error(f"Error in accepted_quotes: {str(e)}", exc_info=True)
         return error_response("Service Unavailable", str(e), "database", True, status_code=503)
@@ -201,8 +226,7 @@ def showDrivers():
         if not user:
             return error_response("Unauthorized", "User not found", "auth", True, status_code=401)
         
-        checkForwarder = User.objects(id=user.id, role='forwarder').first()
-        if not checkForwarder:
+        if user.role != 'forwarder':
             return error_response("Unauthorized", "User is not a forwarder", "auth", True, status_code=401)
         
         # Fetch all active drivers
@@ -223,8 +247,7 @@ def assignDriver(shipment_id, driver_id):
         if not user:
             return error_response("Unauthorized", "User not found", "auth", True, status_code=401)
         
-        checkForwarder = User.objects(id=user.id, role='forwarder').first()
-        if not checkForwarder:
+        if user.role != 'forwarder':
             return error_response("Unauthorized", "User is not a forwarder", "auth", True, status_code=401)
         
         # Find shipment
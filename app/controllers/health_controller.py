@@ -1,7 +1,19 @@
-from flask import Blueprint
+import hmac
+from flask import Blueprint, Response, request
 from mongoengine import get_db
 from app.config import Config
-from app.views.response_formatter import success_response
+from app.services.ai_client import ai_client
+from app.services.customs_engine import customs_engine
+from app.services.document_classifier import document_classifier
+from app.services.extraction_cache import extraction_cache
+from app.services.prediction_cache import customs_prediction_cache, rate_prediction_cache
+from app.services.rate_engine import rate_engine
+from app.services.storage_service import storage_stats
+from app.services.tracking_stream import tracking_bus
+from app.utils.compression import compression_stats
+from app.utils.identity_cache import identity_cache
+from app.utils.metrics import registry
+from app.views.response_formatter import success_response, error_response
 
 health_bp = Blueprint('health', __name__)
 
@@ -33,6 +45,29 @@ def health_check():
         "status": status,
         "version": Config.VERSION,
         "database": db_status,
-        "message": message
+        "message": message,
+        "identity_cache": identity_cache.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "storage": storage_stats.stats(),
+        "tracking_stream": tracking_bus.stats(),
+        "compression": compression_stats.stats(),
+        "ai": ai_client.stats(),
+        "prediction_cache": {
+            "rate": rate_prediction_cache.stats(),
+            "customs": customs_prediction_cache.stats()
+        },
+        "rate_engine": rate_engine.stats(),
+        "customs_engine": customs_engine.stats(),
+        "document_classifier": document_classifier.stats()
     })
 
+
+@health_bp.route('/metrics', methods=['GET'])
+def metrics():
+    if not Config.METRICS_ENABLED:
+        return error_response("Not Found", "Metrics are disabled", "metrics", True, status_code=404)
+    if Config.METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied, Config.METRICS_TOKEN):
+            return error_response("Unauthorized", "Invalid metrics token", "metrics", True, status_code=401)
+    return Response(registry.expose(), mimetype='text/plain; version=0.0.4')
@@ -3,6 +3,7 @@ from flask_jwt_extended import jwt_required
 from app.models.quote import Quote
 from app.models.shipment import Shipment
 from app.utils.auth import get_current_user, require_role
+from app.utils.references import reference_id
 from app.utils.validators import validate_request_json
 from app.views.response_formatter import success_response, error_response, validation_error_response
 from datetime import datetime
@@ -21,8 +22,8 @@ def get_shipment_quotes(shipment_id):
         if not shipment:
             return error_response("Not Found", "Shipment not found", "quotes", True, status_code=404)
         
-        quotes = Quote.objects(shipment_id=shipment).all()
-        return success_response([quote.to_dict(include_forwarder_info=True) for quote in quotes], status_code=200)
+        quotes = Quote.objects(shipment_id=shipment).no_dereference()
+        return success_response(Quote.to_dict_list(quotes, include_forwarder_info=True), status_code=200)
     except Exception as e:
         return error_response("Service Unavailable", f"Database error: {str(e)}", "database", True, status_code=503)
 
@@ -42,7 +43,7 @@ def accept_quote(shipment_id):
         if not shipment:
             return error_response("Not Found", "Shipment not found", "quotes", True, status_code=404)
         
-        if str(shipment.supplier_id.id) != str(user.id):
+        if str(reference_id(shipment, 'supplier_id')) != str(user.id):
             return error_response("Forbidden", "Not authorized for this shipment", "quotes", True, status_code=403)
         
         quote_id = request.args.get('quote_id')
@@ -67,7 +68,7 @@ def accept_quote(shipment_id):
         quote.status = 'accepted'
         quote.save()
         shipment.status = 'booked'
-        shipment.forwarder_id = quote.forwarder_id
+        shipment.forwarder_id = reference_id(quote, 'forwarder_id')
         shipment.save()
         
         return success_response(quote.to_dict(include_forwarder_info=True), status_code=200)
@@ -90,7 +91,7 @@ def update_quote(quote_id):
         if not quote:
             return error_response("Not Found", "Quote not found", "quotes", True, status_code=404)
         
-        if str(quote.forwarder_id.id) != str(user.id):
+        if str(reference_id(quote, 'forwarder_id')) != str(user.id):
             return error_response("Forbidden", "Not authorized for this quote", "quotes", True, status_code=403)
         
         data, error_response_obj, status = validate_request_json()
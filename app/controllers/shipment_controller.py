@@ -3,7 +3,13 @@ from flask_jwt_extended import jwt_required
 from app.models.shipment import Shipment
 from app.models.user import User
 from app.utils.auth import get_current_user
-from app.views.response_formatter import success_response, error_response, validation_error_response
+from app.utils.pagination import parse_limit, keyset_page, InvalidCursor
+from app.utils.references import reference_id
+from app.utils.structured_logging import verbose_request_logging, redact_fields
+from app.views.response_formatter import (
+    success_response, error_response, validation_error_response,
+    make_etag, is_not_modified, not_modified_response
+)
 from datetime import datetime
 import uuid
 import logging
@@ -21,24 +27,13 @@ def create_shipment():
     if request.method == 'OPTIONS':
         return '', 200
     
-    # Log request details
-    logger.info("=" * 60)
-    logger.info("CREATE SHIPMENT REQUEST")
-    logger.info("=" * 60)
-    logger.info(f"Method: {request.method}")
-    logger.info(f"Content-Type: {request.content_type}")
-    logger.info(f"Headers: {dict(request.headers)}")
-    logger.info(f"Is JSON: {request.is_json}")
-    logger.info(f"Has Form: {bool(request.form)}")
-    logger.info(f"Has Data: {bool(request.data)}")
+    verbose = verbose_request_logging()
     
     user = get_current_user()
     if not user:
-        logger.error("Unauthorized: User not found")
+        logger.warning("Create shipment: user not found")
         return error_response("Unauthorized", "User not found", "auth", True, status_code=401)
     
-    logger.info(f"User: {user.email} (Role: {user.role})")
-    
     # Parse request data
     data = None
     data_source = None
@@ -46,29 +41,30 @@ def create_shipment():
     if request.is_json:
         data = request.get_json()
         data_source = "JSON"
-        logger.info("Parsing request as JSON")
     elif request.form:
         data = request.form.to_dict()
         data_source = "FORM_DATA"
-        logger.info("Parsing request as Form Data")
     elif request.data:
         try:
             import json
             data = json.loads(request.data)
             data_source = "RAW_JSON"
-            logger.info("Parsing request as Raw JSON")
         except Exception as e:
-            logger.error(f"Failed to parse raw data as JSON: {e}")
+            logger.warning(f"Create shipment: failed to parse raw data as JSON: {e}")
             data = None
     else:
-        logger.warning("No data found in request")
         data = None
     
-    logger.info(f"Data Source: {data_source}")
-    logger.info(f"Received Data: {data}")
+    if verbose:
+        logger.debug("Create shipment request", extra={'data': {
+            'user_id': str(user.id),
+            'role': user.role,
+            'content_type': request.content_type,
+            'data_source': data_source,
+            'body': redact_fields(data)
+        }})
     
     if not data:
-        logger.error("Invalid input: Request body is required")
         return error_response("Invalid input", "Request body is required", "shipments", True, status_code=400)
     
     errors = []
@@ -82,14 +78,6 @@ def create_shipment():
     weight = data.get('weight') or data.get('gross_weight_kg')
     volume = data.get('volume') or data.get('volume_cbm')
     
-    logger.info("Extracted fields:")
-    logger.info(f"  origin_port: {origin_port}")
-    logger.info(f"  destination_port: {destination_port}")
-    logger.info(f"  origin_latitude: {origin_latitude}, origin_longitude: {origin_longitude}")
-    logger.info(f"  destination_latitude: {destination_latitude}, destination_longitude: {destination_longitude}")
-    logger.info(f"  weight: {weight}")
-    logger.info(f"  volume: {volume}")
-    
     if not origin_port:
         errors.append({"loc": ["origin_port"], "msg": "Origin port is required", "type": "value_error"})
     if not destination_port:
@@ -100,12 +88,12 @@ def create_shipment():
         errors.append({"loc": ["volume"], "msg": "Volume is required", "type": "value_error"})
     
     if errors:
-        logger.warning(f"Validation errors: {errors}")
+        if verbose:
+            logger.debug("Create shipment validation failed", extra={'data': {'errors': errors}})
         return validation_error_response(errors)
     
     try:
         shipment_number = f"SH{uuid.uuid4().hex[:8].upper()}"
-        logger.info(f"Creating shipment with number: {shipment_number}")
         
         shipment = Shipment(
             shipment_number=shipment_number,
@@ -121,13 +109,11 @@ def create_shipment():
         )
         shipment.save()
         
-        logger.info(f"Shipment created successfully: {shipment_number} (ID: {shipment.id})")
-        logger.info("=" * 60)
+        logger.info(f"Shipment created: {shipment_number} (ID: {shipment.id})")
         
         return success_response(shipment.to_dict(), status_code=201)
     except Exception as e:
         logger.error(f"Error creating shipment: {str(e)}", exc_info=True)
-        logger.info("=" * 60)
         return error_response("Service Unavailable", str(e), "database", True, status_code=503)
 
 
@@ -135,8 +121,12 @@ def create_shipment():
 @jwt_required()
 def get_shipment(shipment_id):
     try:
+        # Only what the access check and validators need; the full document
+        # is loaded after a conditional request has had its chance to 304
         try:
-            shipment = Shipment.objects(id=shipment_id).first()
+            shipment = Shipment.objects(id=shipment_id).only(
+                'id', 'supplier_id', 'buyer_id', 'forwarder_id', 'created_at', 'updated_at'
+            ).first()
         except:
             shipment = None
         
@@ -147,11 +137,20 @@ def get_shipment(shipment_id):
         if not user:
             return error_response("Unauthorized", "User not found", "auth", True, status_code=401)
         
-        if str(shipment.supplier_id.id) != str(user.id) and str(shipment.buyer_id.id) != str(user.id) if shipment.buyer_id else True:
-            if user.role != 'forwarder' or (shipment.forwarder_id and str(shipment.forwarder_id.id) != str(user.id)):
+        supplier_id = reference_id(shipment, 'supplier_id')
+        buyer_id = reference_id(shipment, 'buyer_id')
+        forwarder_id = reference_id(shipment, 'forwarder_id')
+        if str(supplier_id) != str(user.id) and str(buyer_id) != str(user.id) if buyer_id else True:
+            if user.role != 'forwarder' or (forwarder_id and str(forwarder_id) != str(user.id)):
                 return error_response("Forbidden", "Not authorized to view this shipment", "shipments", True, status_code=403)
         
-        return success_response(shipment.to_dict(), status_code=200)
+        last_modified = shipment.updated_at or shipment.created_at
+        etag = make_etag(shipment.id, last_modified)
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
+        
+        row = Shipment.objects(id=shipment.id).as_pymongo().first()
+        return success_response(Shipment.raw_to_dict(row), status_code=200, etag=etag, last_modified=last_modified)
     except Exception as e:
         return error_response("Service Unavailable", str(e), "database", True, status_code=503)
 
@@ -181,9 +180,28 @@ def list_shipments():
         if status_filter:
             query = query & Q(status=status_filter)
         
-        shipments = Shipment.objects(query).order_by('-created_at').all()
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            shipments, next_cursor = keyset_page(
+                Shipment.objects(query).exclude('metadata').as_pymongo(),
+                'created_at',
+                limit,
+                after=request.args.get('after')
+            )
+        except (ValueError, InvalidCursor) as e:
+            return error_response("Invalid input", str(e), "shipments", True, status_code=400)
+        
+        # The ETag covers every row's (id, updated_at), so an unchanged page is
+        # answered before anything is serialized. No Last-Modified: rows can
+        # leave a page without any timestamp moving.
+        etag = make_etag(next_cursor, *((shipment['_id'], shipment.get('updated_at')) for shipment in shipments))
+        if is_not_modified(etag):
+            return not_modified_response(etag)
         
-        return success_response([shipment.to_dict() for shipment in shipments], status_code=200)
+        return success_response({
+            'data': [Shipment.raw_to_dict(shipment, include_metadata=False) for shipment in shipments],
+            'next_cursor': next_cursor
+        }, status_code=200, etag=etag)
     except Exception as e:
         return error_response("Service Unavailable", str(e), "database", True, status_code=503)
 
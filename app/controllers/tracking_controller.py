@@ -1,41 +1,182 @@
-from flask import Blueprint, request
+from flask import Blueprint, request, Response
 from flask_jwt_extended import jwt_required
 from app.models.tracking_event import TrackingEvent
 from app.models.shipment import Shipment
 from app.utils.auth import get_current_user, require_role
 from app.utils.validators import validate_request_json
-from app.views.response_formatter import success_response, error_response, validation_error_response
+from app.utils.pagination import parse_limit, keyset_page, InvalidCursor
+from app.views.response_formatter import (
+    success_response, error_response, validation_error_response,
+    make_etag, is_not_modified, not_modified_response
+)
+from app.config import Config
+from app.services.tracking_stream import (
+    tracking_bus, TooManySubscribers, format_sse, publish_tracking_event, publish_status_change
+)
+from bson import ObjectId
+from bson.errors import InvalidId
+from mongoengine import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from datetime import datetime
+import json
+import queue
 
 tracking_bp = Blueprint('tracking', __name__)
 
 
+VALID_EVENT_STATUSES = ['booked', 'gate_in', 'vessel_departed', 'in_transit', 'port_arrival', 
+                        'gate_out', 'customs_clearance', 'delivered', 'held', 'delayed']
+
+
+def validate_tracking_event_data(data):
+    errors = []
+    status_value = data.get('status')
+    location = data.get('location')
+    description = data.get('description')
+    
+    if not status_value:
+        errors.append({"loc": ["status"], "msg": "Status is required", "type": "value_error"})
+    elif not isinstance(status_value, str) or status_value not in VALID_EVENT_STATUSES:
+        errors.append({"loc": ["status"], "msg": f"Status must be one of: {', '.join(VALID_EVENT_STATUSES)}", "type": "value_error"})
+    
+    if not location:
+        errors.append({"loc": ["location"], "msg": "Location is required", "type": "value_error"})
+    elif not isinstance(location, str):
+        errors.append({"loc": ["location"], "msg": "Location must be a string", "type": "value_error"})
+    elif len(location) < 2:
+        errors.append({"loc": ["location"], "msg": "Location must be at least 2 characters", "type": "value_error"})
+    
+    if not description:
+        errors.append({"loc": ["description"], "msg": "Description is required", "type": "value_error"})
+    elif not isinstance(description, str):
+        errors.append({"loc": ["description"], "msg": "Description must be a string", "type": "value_error"})
+    elif len(description) < 5:
+        errors.append({"loc": ["description"], "msg": "Description must be at least 5 characters", "type": "value_error"})
+    
+    return errors
+
+
+def parse_event_datetime(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except:
+        return None
+
+
+def build_tracking_event(data, shipment, user):
+    return TrackingEvent(
+        shipment_id=shipment,
+        created_by=user,
+        status=data.get('status'),
+        location=data.get('location'),
+        vessel_name=data.get('vessel_name'),
+        voyage_number=data.get('voyage_number'),
+        container_number=data.get('container_number'),
+        description=data.get('description'),
+        remarks=data.get('remarks'),
+        estimated_datetime=parse_event_datetime(data.get('estimated_datetime')),
+        actual_datetime=parse_event_datetime(data.get('actual_datetime')),
+        documents=data.get('documents', []),
+        is_milestone=data.get('is_milestone', False)
+    )
+
+
+EVENT_FIELDS = {'shipment_id', 'created_by', 'status', 'location', 'vessel_name', 'voyage_number',
+                'container_number', 'description', 'remarks', 'estimated_datetime', 'actual_datetime',
+                'documents', 'is_milestone', 'verified', 'timestamp'}
+
+
+def parse_query_flag(value, default=False):
+    if value in (None, ''):
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def parse_query_datetime(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 datetime")
+
+
 @tracking_bp.route('/shipments/<shipment_id>', methods=['GET'])
 @jwt_required()
 def get_shipment_tracking(shipment_id):
     try:
         try:
-            shipment = Shipment.objects(id=shipment_id).first()
+            shipment = Shipment.objects(id=shipment_id).only(
+                'id', 'shipment_number', 'status', 'origin_port', 'destination_port',
+                'preferred_eta', 'actual_eta', 'latest_event', 'updated_at'
+            ).first()
         except:
             shipment = None
         if not shipment:
             return error_response("Not Found", "Shipment not found", "tracking", True, status_code=404)
         
-        events = TrackingEvent.objects(shipment_id=shipment).order_by('-timestamp').all()
-        
-        latest_event = events[0] if events else None
-        current_status = latest_event.status if latest_event else shipment.status
+        try:
+            include_events = parse_query_flag(request.args.get('include_events'), default=True)
+            limit = parse_limit(request.args.get('limit'))
+            since = parse_query_datetime('since')
+            until = parse_query_datetime('until')
+            fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+            unknown = set(fields) - EVENT_FIELDS
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        except ValueError as e:
+            return error_response("Invalid input", str(e), "tracking", True, status_code=400)
         
-        return success_response({
+        data = {
             "shipment_id": str(shipment.id),
             "shipment_number": shipment.shipment_number,
-            "current_status": current_status,
+            "current_status": shipment.latest_event.status if shipment.latest_event else shipment.status,
             "origin_port": shipment.origin_port,
             "destination_port": shipment.destination_port,
             "estimated_arrival": shipment.preferred_eta.isoformat() if shipment.preferred_eta else None,
-            "actual_arrival": shipment.actual_eta.isoformat() if shipment.actual_eta else None,
-            "events": [event.to_dict() for event in events]
-        }, status_code=200)
+            "actual_arrival": shipment.actual_eta.isoformat() if shipment.actual_eta else None
+        }
+        if not include_events:
+            etag = make_etag(shipment.id, shipment.updated_at)
+            if is_not_modified(etag, shipment.updated_at):
+                return not_modified_response(etag, shipment.updated_at)
+            return success_response(data, status_code=200, etag=etag, last_modified=shipment.updated_at)
+        
+        # Filters, projection and the keyset cursor all run inside Mongo on
+        # the (shipment_id, -timestamp, -_id) index
+        query = TrackingEvent.objects(shipment_id=shipment.id)
+        if since:
+            query = query.filter(timestamp__gte=since)
+        if until:
+            query = query.filter(timestamp__lt=until)
+        if parse_query_flag(request.args.get('milestones_only')):
+            query = query.filter(is_milestone=True)
+        if fields:
+            query = query.only('id', 'timestamp', 'updated_at', *fields)
+        
+        try:
+            events, next_cursor = keyset_page(query.as_pymongo(), 'timestamp', limit, after=request.args.get('before'))
+        except InvalidCursor as e:
+            return error_response("Invalid input", str(e), "tracking", True, status_code=400)
+        
+        # Checked before creator lookups and serialization
+        etag = make_etag(shipment.id, shipment.updated_at, next_cursor,
+                         *((event['_id'], event.get('updated_at')) for event in events))
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+        
+        event_dicts = TrackingEvent.to_dict_list(events, include_creator_info=not fields or 'created_by' in fields)
+        if fields:
+            keep = {'id', 'created_by_name', 'created_by_company', *fields}
+            event_dicts = [{key: value for key, value in event.items() if key in keep} for event in event_dicts]
+        
+        data["events"] = event_dicts
+        data["next_cursor"] = next_cursor
+        return success_response(data, status_code=200, etag=etag)
     except Exception as e:
         return error_response("Service Unavailable", f"Database error: {str(e)}", "database", True, status_code=503)
 
@@ -59,87 +200,255 @@ def create_tracking_event(shipment_id):
         if error_response_obj:
             return error_response_obj, status
         
-        errors = []
-        status_value = data.get('status')
-        location = data.get('location')
-        description = data.get('description')
+        errors = validate_tracking_event_data(data)
+        if errors:
+            return validation_error_response(errors)
         
-        valid_statuses = ['booked', 'gate_in', 'vessel_departed', 'in_transit', 'port_arrival', 
-                         'gate_out', 'customs_clearance', 'delivered', 'held', 'delayed']
+        event = build_tracking_event(data, shipment, user)
+        status_value = event.status
         
-        if not status_value:
-            errors.append({"loc": ["status"], "msg": "Status is required", "type": "value_error"})
-        elif status_value not in valid_statuses:
-            errors.append({"loc": ["status"], "msg": f"Status must be one of: {', '.join(valid_statuses)}", "type": "value_error"})
+        event.save()
+        # One atomic $set keeps status and the latest-event snapshot in step
+        Shipment.objects(id=shipment.id).update_one(
+            set__status=status_value,
+            set__latest_event=event.to_snapshot(),
+            set__updated_at=datetime.utcnow()
+        )
         
-        if not location:
-            errors.append({"loc": ["location"], "msg": "Location is required", "type": "value_error"})
-        elif len(location) < 2:
-            errors.append({"loc": ["location"], "msg": "Location must be at least 2 characters", "type": "value_error"})
+        event_dict = event.to_dict()
+        publish_tracking_event(event_dict)
+        publish_status_change(str(shipment.id), status_value)
         
-        if not description:
-            errors.append({"loc": ["description"], "msg": "Description is required", "type": "value_error"})
-        elif len(description) < 5:
-            errors.append({"loc": ["description"], "msg": "Description must be at least 5 characters", "type": "value_error"})
+        return success_response(event_dict, status_code=200)
+    except Exception as e:
+        return error_response("Internal Server Error", str(e), "tracking", False, status_code=500)
+
+
+def parse_bulk_events_body():
+    """Return the list of event payloads from a JSON array, ``{"events": [...]}`` or NDJSON body."""
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+        items = []
+        for line_number, line in enumerate(request.get_data(as_text=True).splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                raise ValueError(f"Line {line_number} is not valid JSON")
+        return items
+    
+    if not request.is_json:
+        raise ValueError("Request must be JSON or NDJSON")
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('events')
+    if not isinstance(data, list):
+        raise ValueError("Body must be an array of events")
+    return data
+
+
+@tracking_bp.route('/events/bulk', methods=['POST'])
+@jwt_required()
+def bulk_create_tracking_events():
+    try:
+        user = get_current_user()
+        if not user or user.role != 'forwarder':
+            return error_response("Forbidden", "Only forwarders can create tracking events", "tracking", True, status_code=403)
         
-        if errors:
-            return validation_error_response(errors)
+        try:
+            items = parse_bulk_events_body()
+        except ValueError as e:
+            return error_response("Invalid input", str(e), "validation", True, status_code=400)
         
-        estimated_datetime = None
-        if data.get('estimated_datetime'):
+        if not items:
+            return error_response("Invalid input", "No events provided", "validation", True, status_code=400)
+        if len(items) > Config.TRACKING_BULK_MAX_EVENTS:
+            return error_response("Invalid input", f"At most {Config.TRACKING_BULK_MAX_EVENTS} events per request", "validation", True, status_code=413)
+        
+        results = [None] * len(items)
+        shipment_ids = {}
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = {"index": index, "status": "error", "errors": [{"loc": [], "msg": "Event must be an object", "type": "type_error"}]}
+                continue
+            errors = validate_tracking_event_data(item)
             try:
-                estimated_datetime = datetime.fromisoformat(data['estimated_datetime'].replace('Z', '+00:00'))
-            except:
-                pass
+                shipment_ids[index] = ObjectId(item.get('shipment_id'))
+            except (InvalidId, TypeError):
+                errors.append({"loc": ["shipment_id"], "msg": "A valid shipment_id is required", "type": "value_error"})
+            if errors:
+                results[index] = {"index": index, "status": "error", "errors": errors}
+        
+        # One $in query resolves every shipment referenced by the batch, with its latest event time
+        known_shipments = {shipment['_id']: (shipment.get('latest_event') or {}).get('timestamp')
+                           for shipment in Shipment._get_collection().find(
+                               {'_id': {'$in': list(set(shipment_ids.values()))}}, {'_id': 1, 'latest_event.timestamp': 1}
+                           )}
         
-        actual_datetime = None
-        if data.get('actual_datetime'):
+        indexes = []
+        documents = []
+        for index, item in enumerate(items):
+            if results[index] is not None:
+                continue
+            shipment_id = shipment_ids[index]
+            if shipment_id not in known_shipments:
+                results[index] = {"index": index, "status": "error", "errors": [{"loc": ["shipment_id"], "msg": "Shipment not found", "type": "value_error"}]}
+                continue
+            event = build_tracking_event(item, shipment_id, user)
             try:
-                actual_datetime = datetime.fromisoformat(data['actual_datetime'].replace('Z', '+00:00'))
-            except:
-                pass
-        
-        event = TrackingEvent(
-            shipment_id=shipment,
-            created_by=user,
-            status=status_value,
-            location=location,
-            vessel_name=data.get('vessel_name'),
-            voyage_number=data.get('voyage_number'),
-            container_number=data.get('container_number'),
-            description=description,
-            remarks=data.get('remarks'),
-            estimated_datetime=estimated_datetime,
-            actual_datetime=actual_datetime,
-            documents=data.get('documents', []),
-            is_milestone=data.get('is_milestone', False)
-        )
+                event.validate()
+            except ValidationError as e:
+                results[index] = {"index": index, "status": "error", "errors": [
+                    {"loc": [field], "msg": str(message), "type": "value_error"} for field, message in (e.to_dict() or {}).items()
+                ]}
+                continue
+            indexes.append(index)
+            documents.append(event.to_mongo().to_dict())
         
-        event.save()
-        shipment.status = status_value
-        shipment.save()
+        inserted = set(range(len(documents)))
+        if documents:
+            try:
+                TrackingEvent._get_collection().insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details.get('writeErrors', []):
+                    position = write_error['index']
+                    inserted.discard(position)
+                    results[indexes[position]] = {"index": indexes[position], "status": "error", "errors": [
+                        {"loc": [], "msg": write_error.get('errmsg', 'Write failed'), "type": "write_error"}
+                    ]}
         
-        return success_response(event.to_dict(), status_code=200)
+        # Each shipment's status is written once, from its newest event in the batch. Like the
+        # single-event path and the history index, "newest" means recorded last, not actual_datetime
+        newest = {}
+        for position in sorted(inserted):
+            document = documents[position]
+            results[indexes[position]] = {"index": indexes[position], "status": "created", "id": str(document['_id'])}
+            event = TrackingEvent._from_son(document)
+            publish_tracking_event(event.to_dict())
+            newest[document['shipment_id']] = event
+        
+        # A shipment whose latest event is already newer (a concurrent request) keeps it; the
+        # filter repeats the check so a write landing in between is not overwritten either
+        newest = {shipment_id: event for shipment_id, event in newest.items()
+                  if known_shipments[shipment_id] is None or known_shipments[shipment_id] <= event.timestamp}
+        if newest:
+            now = datetime.utcnow()
+            Shipment._get_collection().bulk_write([
+                UpdateOne({'_id': shipment_id, '$or': [
+                    {'latest_event.timestamp': {'$exists': False}},
+                    {'latest_event.timestamp': {'$lte': event.timestamp}}
+                ]}, {'$set': {
+                    'status': event.status,
+                    'latest_event': event.to_snapshot().to_mongo().to_dict(),
+                    'updated_at': now
+                }})
+                for shipment_id, event in newest.items()
+            ], ordered=False)
+            for shipment_id, event in newest.items():
+                publish_status_change(str(shipment_id), event.status)
+        
+        return success_response({
+            "created": len(inserted),
+            "failed": len(items) - len(inserted),
+            "shipments_updated": len(newest),
+            "results": results
+        }, status_code=200)
     except Exception as e:
         return error_response("Internal Server Error", str(e), "tracking", False, status_code=500)
 
 
+@tracking_bp.route('/shipments/<shipment_id>/stream', methods=['GET'])
+@jwt_required()
+def stream_shipment_tracking(shipment_id):
+    try:
+        try:
+            shipment = Shipment.objects(id=shipment_id).only('id', 'status').first()
+        except:
+            shipment = None
+        if not shipment:
+            return error_response("Not Found", "Shipment not found", "tracking", True, status_code=404)
+        
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        if last_event_id:
+            try:
+                last_event_id = ObjectId(last_event_id)
+            except InvalidId:
+                return error_response("Invalid input", "Invalid Last-Event-ID", "tracking", True, status_code=400)
+        
+        try:
+            subscription = tracking_bus.subscribe(str(shipment.id))
+        except TooManySubscribers as e:
+            return error_response("Service Unavailable", str(e), "tracking", True, status_code=503)
+    except Exception as e:
+        return error_response("Service Unavailable", f"Database error: {str(e)}", "database", True, status_code=503)
+    
+    heartbeat_seconds = Config.TRACKING_STREAM_HEARTBEAT_SECONDS
+    
+    def generate():
+        try:
+            yield f"retry: {int(heartbeat_seconds * 1000)}\n\n"
+            yield format_sse('status', {'shipment_id': str(shipment.id), 'status': shipment.status})
+            
+            # Subscribed before replaying, so nothing published in between is lost
+            replayed = set()
+            if last_event_id:
+                missed = TrackingEvent.objects(shipment_id=shipment.id, id__gt=last_event_id).order_by('id') \
+                    .limit(Config.TRACKING_STREAM_REPLAY_LIMIT).no_dereference()
+                for event in missed:
+                    event_dict = event.to_dict()
+                    replayed.add(event_dict['id'])
+                    yield format_sse('tracking_event', event_dict, event_dict['id'])
+            
+            while True:
+                try:
+                    message = subscription.get(timeout=heartbeat_seconds)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                if message['id'] and message['id'] in replayed:
+                    continue
+                yield format_sse(message['event'], message['data'], message['id'])
+        finally:
+            tracking_bus.unsubscribe(subscription)
+    
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Also covers clients that disconnect before the generator ever starts
+    response.call_on_close(lambda: tracking_bus.unsubscribe(subscription))
+    return response
+
+
 @tracking_bp.route('/shipments/<shipment_id>/events/latest', methods=['GET'])
 @jwt_required()
 def get_latest_tracking_event(shipment_id):
     try:
         try:
-            shipment = Shipment.objects(id=shipment_id).first()
+            shipment = Shipment.objects(id=shipment_id).only('id', 'latest_event', 'updated_at').first()
         except:
             shipment = None
         if not shipment:
             return error_response("Not Found", "Shipment not found", "tracking", True, status_code=404)
         
+        if shipment.latest_event and shipment.latest_event.is_full_copy:
+            # Every write to latest_event also bumps the shipment's updated_at, and the
+            # snapshot carries every field to_dict emits, so neither answer reads events
+            etag = make_etag(shipment.id, shipment.updated_at)
+            if is_not_modified(etag, shipment.updated_at):
+                return not_modified_response(etag, shipment.updated_at)
+            return success_response(TrackingEvent.snapshot_to_dict(shipment.latest_event, shipment.id),
+                                    status_code=200, etag=etag, last_modified=shipment.updated_at)
+        
+        # Shipments not yet covered by (or backfilled before) backfill-latest-events
         event = TrackingEvent.objects(shipment_id=shipment).order_by('-timestamp').first()
         
         if not event:
             return error_response("Not Found", "No tracking events found", "tracking", True, status_code=404)
         
-        return success_response(event.to_dict(), status_code=200)
+        etag = make_etag(event.id, event.updated_at)
+        if is_not_modified(etag, event.updated_at):
+            return not_modified_response(etag, event.updated_at)
+        return success_response(event.to_dict(), status_code=200, etag=etag, last_modified=event.updated_at)
     except Exception as e:
         return error_response("Service Unavailable", f"Database error: {str(e)}", "database", True, status_code=503)
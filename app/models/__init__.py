@@ -1,8 +1,8 @@
 from app.models.user import User
 from app.models.shipment import Shipment
-from app.models.document import DocumentModel, ExtractionJob
+from app.models.document import DocumentModel, ExtractionJob, ExtractionCacheEntry
 from app.models.quote import Quote
 from app.models.tracking_event import TrackingEvent
 
-__all__ = ['User', 'Shipment', 'DocumentModel', 'ExtractionJob', 'Quote', 'TrackingEvent']
+__all__ = ['User', 'Shipment', 'DocumentModel', 'ExtractionJob', 'ExtractionCacheEntry', 'Quote', 'TrackingEvent']
 
@@ -1,7 +1,9 @@
-from mongoengine import Document, StringField, IntField, FloatField, BooleanField, DateTimeField, ReferenceField, DictField
+from mongoengine import Document, StringField, IntField, FloatField, BooleanField, DateTimeField, ReferenceField, DictField, FileField
 from datetime import datetime
 from app.models.shipment import Shipment
 from app.models.user import User
+from app.config import Config
+from app.utils.references import reference_id, prefetch_references
 
 
 class DocumentModel(Document):
@@ -18,19 +20,30 @@ class DocumentModel(Document):
     confidence_score = FloatField(default=0.0)
     extraction_method = StringField()
     needs_review = BooleanField(default=True)
+    # Original file bytes live in GridFS; only the file id is stored here
+    file_blob = FileField(collection_name='document_files')
     metadata = DictField(default=dict)
     created_at = DateTimeField(default=datetime.utcnow)
+    # No default: rows written before save() stamped it must not load as modified now.
+    # Validators fall back to created_at for them
+    updated_at = DateTimeField()
     
     meta = {
         'collection': 'documents',
         'indexes': ['shipment_id', 'uploaded_by', 'type']
     }
     
-    def to_dict(self):
-        return {
+    def save(self, *args, **kwargs):
+        self.updated_at = datetime.utcnow()
+        return super().save(*args, **kwargs)
+    
+    def to_dict(self, uploaders=None):
+        shipment_id = reference_id(self, 'shipment_id')
+        uploaded_by = reference_id(self, 'uploaded_by')
+        data = {
             'id': str(self.id),
-            'shipment_id': str(self.shipment_id.id) if self.shipment_id else None,
-            'uploaded_by': str(self.uploaded_by.id) if self.uploaded_by else None,
+            'shipment_id': str(shipment_id) if shipment_id else None,
+            'uploaded_by': str(uploaded_by) if uploaded_by else None,
             'type': self.type,
             'file_name': self.file_name,
             'file_url': self.file_url,
@@ -41,8 +54,23 @@ class DocumentModel(Document):
             'extraction_method': self.extraction_method,
             'needs_review': self.needs_review,
             'metadata': self.metadata if hasattr(self, 'metadata') else {},
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'content_url': f"/api/documents/{self.id}/content",
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        
+        if uploaders is not None and uploaded_by in uploaders:
+            data['uploaded_by_name'] = uploaders[uploaded_by].name
+            data['uploaded_by_company'] = uploaders[uploaded_by].company_name
+        
+        return data
+    
+    @classmethod
+    def to_dict_list(cls, documents, include_uploader_info=False):
+        """Serialize many documents with a single query for all their uploaders."""
+        documents = list(documents)
+        uploaders = prefetch_references(documents, 'uploaded_by', User) if include_uploader_info else None
+        return [document.to_dict(uploaders) for document in documents]
 
 
 class ExtractionJob(Document):
@@ -52,12 +80,20 @@ class ExtractionJob(Document):
     processing_time_ms = IntField()
     error_message = StringField()
     attempts = IntField(default=0)
+    # Worker lease: a job is only claimable once available_at has passed
+    available_at = DateTimeField(default=datetime.utcnow)
+    started_at = DateTimeField()
+    worker_id = StringField()
     created_at = DateTimeField(default=datetime.utcnow)
     updated_at = DateTimeField(default=datetime.utcnow)
     
     meta = {
         'collection': 'extraction_jobs',
-        'indexes': ['document_id', 'status']
+        'indexes': [
+            'document_id', 'status',
+            ('status', 'available_at'),
+            ('status', 'started_at')
+        ]
     }
     
     def save(self, *args, **kwargs):
@@ -67,12 +103,36 @@ class ExtractionJob(Document):
     def to_dict(self):
         return {
             'id': str(self.id),
-            'document_id': str(self.document_id.id) if self.document_id else None,
+            'document_id': str(reference_id(self, 'document_id')) if reference_id(self, 'document_id') else None,
             'status': self.status,
             'model_used': self.model_used,
             'processing_time_ms': self.processing_time_ms,
             'error_message': self.error_message,
             'attempts': self.attempts,
+            'available_at': self.available_at.isoformat() if self.available_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+
+class ExtractionCacheEntry(Document):
+    # sha256(file bytes) + document type + prompt/version fingerprint
+    key = StringField(required=True, unique=True)
+    content_hash = StringField(required=True)
+    document_type = StringField()
+    fingerprint = StringField()
+    extracted_data = DictField()
+    confidence_score = FloatField(default=0.0)
+    model_name = StringField()
+    processing_time_ms = IntField()
+    hits = IntField(default=0)
+    created_at = DateTimeField(default=datetime.utcnow)
+    
+    meta = {
+        'collection': 'extraction_cache',
+        'indexes': [
+            'key',
+            {'fields': ['created_at'], 'expireAfterSeconds': Config.EXTRACTION_CACHE_TTL_SECONDS}
+        ]
+    }
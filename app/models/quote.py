@@ -2,6 +2,7 @@ from mongoengine import Document, StringField, IntField, FloatField, DateTimeFie
 from datetime import datetime
 from app.models.shipment import Shipment
 from app.models.user import User
+from app.utils.references import reference_id, prefetch_references
 
 
 class Quote(Document):
@@ -37,11 +38,13 @@ class Quote(Document):
         self.updated_at = datetime.utcnow()
         return super().save(*args, **kwargs)
     
-    def to_dict(self, include_forwarder_info=False):
+    def to_dict(self, include_forwarder_info=False, forwarders=None):
+        shipment_id = reference_id(self, 'shipment_id')
+        forwarder_id = reference_id(self, 'forwarder_id')
         data = {
             'id': str(self.id),
-            'shipment_id': str(self.shipment_id.id) if self.shipment_id else None,
-            'forwarder_id': str(self.forwarder_id.id) if self.forwarder_id else None,
+            'shipment_id': str(shipment_id) if shipment_id else None,
+            'forwarder_id': str(forwarder_id) if forwarder_id else None,
             'freight_amount_usd': self.freight_amount_usd,
             'fuel_surcharge': self.fuel_surcharge,
             'thc_charges': self.thc_charges,
@@ -64,10 +67,20 @@ class Quote(Document):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
         
-        if include_forwarder_info and self.forwarder_id:
-            forwarder = User.objects(id=self.forwarder_id.id).first()
+        if include_forwarder_info and forwarder_id:
+            if forwarders is not None:
+                forwarder = forwarders.get(forwarder_id)
+            else:
+                forwarder = User.objects(id=forwarder_id).only('name', 'company_name').first()
             if forwarder:
                 data['forwarder_name'] = forwarder.name
                 data['forwarder_company'] = forwarder.company_name
         
         return data
+    
+    @classmethod
+    def to_dict_list(cls, quotes, include_forwarder_info=False):
+        """Serialize many quotes with a single query for all their forwarders."""
+        quotes = list(quotes)
+        forwarders = prefetch_references(quotes, 'forwarder_id', User) if include_forwarder_info else None
+        return [quote.to_dict(include_forwarder_info, forwarders) for quote in quotes]
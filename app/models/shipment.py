@@ -1,7 +1,47 @@
-from mongoengine import Document, StringField, IntField, FloatField, BooleanField, DateTimeField, ReferenceField, DictField
+from mongoengine import Document, EmbeddedDocument, StringField, IntField, FloatField, BooleanField, DateTimeField, ReferenceField, DictField, EmbeddedDocumentField, ObjectIdField, ListField
 from datetime import datetime
 from app.models.user import User
 from app.models.driver import Driver
+from app.utils.references import reference_id
+from app.utils.serialization import raw_value, raw_iso, raw_ref
+
+
+class LatestTrackingEvent(EmbeddedDocument):
+    # Copy of the newest TrackingEvent, kept so status reads never query events
+    event_id = ObjectIdField()
+    created_by = ObjectIdField()
+    status = StringField()
+    location = StringField()
+    description = StringField()
+    remarks = StringField()
+    vessel_name = StringField()
+    voyage_number = StringField()
+    container_number = StringField()
+    documents = ListField(StringField())
+    is_milestone = BooleanField(default=False)
+    # No default: snapshots written before the full copy have None here
+    verified = BooleanField()
+    estimated_datetime = DateTimeField()
+    actual_datetime = DateTimeField()
+    timestamp = DateTimeField()
+    
+    @property
+    def is_full_copy(self):
+        return self.event_id is not None and self.verified is not None
+    
+    def to_dict(self):
+        return {
+            'id': str(self.event_id) if self.event_id else None,
+            'status': self.status,
+            'location': self.location,
+            'description': self.description,
+            'vessel_name': self.vessel_name,
+            'voyage_number': self.voyage_number,
+            'container_number': self.container_number,
+            'is_milestone': self.is_milestone,
+            'actual_datetime': self.actual_datetime.isoformat() if self.actual_datetime else None,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None
+        }
 
 
 class Shipment(Document):
@@ -44,59 +84,86 @@ class Shipment(Document):
     insurance_required = BooleanField(default=False)
     special_instructions = StringField()
     status = StringField(default='draft', choices=['draft', 'pending_quote', 'pending', 'quoted', 'booked', 'in_transit', 'arrived', 'delivered', 'cancelled'])
+    latest_event = EmbeddedDocumentField(LatestTrackingEvent)
     metadata = DictField(default={})
     created_at = DateTimeField(default=datetime.utcnow)
     updated_at = DateTimeField()
     
     meta = {
         'collection': 'shipments',
-        'indexes': ['shipment_number', 'supplier_id', 'buyer_id', 'forwarder_id', 'status']
+        'indexes': [
+            'shipment_number', 'supplier_id', 'buyer_id', 'forwarder_id', 'status',
+            # Keyset pagination on the list endpoints: one index per query shape
+            ('supplier_id', '-created_at', '-id'),
+            ('buyer_id', '-created_at', '-id'),
+            ('forwarder_id', 'status', '-created_at', '-id'),
+            # Second $or branch of the forwarder accepted-quotes aggregation
+            ('quote_forwarder_id', 'status', 'quote_status', '-created_at', '-id')
+        ]
     }
     
     def save(self, *args, **kwargs):
         self.updated_at = datetime.utcnow()
         return super().save(*args, **kwargs)
     
-    def to_dict(self):
-        return {
-            'id': str(self.id),
-            'shipment_number': self.shipment_number,
-            'supplier_id': str(self.supplier_id.id) if self.supplier_id else None,
-            'buyer_id': str(self.buyer_id.id) if self.buyer_id else None,
-            'forwarder_id': str(self.forwarder_id.id) if self.forwarder_id else None,
-            'origin_port': self.origin_port,
-            'destination_port': self.destination_port,
-            'origin_latitude': self.origin_latitude,
-            'origin_longitude': self.origin_longitude,
-            'destination_latitude': self.destination_latitude,
-            'destination_longitude': self.destination_longitude,
-            'incoterm': self.incoterm,
-            'cargo_type': self.cargo_type,
-            'container_type': self.container_type,
-            'container_qty': self.container_qty,
-            'goods_description': self.goods_description,
-            'hs_code': self.hs_code,
-            'gross_weight_kg': self.gross_weight_kg,
-            'net_weight_kg': self.net_weight_kg,
-            'volume_cbm': self.volume_cbm,
-            'total_packages': self.total_packages,
-            'package_type': self.package_type,
-            'preferred_etd': self.preferred_etd.isoformat() if self.preferred_etd else None,
-            'preferred_eta': self.preferred_eta.isoformat() if self.preferred_eta else None,
-            'actual_etd': self.actual_etd.isoformat() if self.actual_etd else None,
-            'actual_eta': self.actual_eta.isoformat() if self.actual_eta else None,
-            'declared_value_usd': self.declared_value_usd,
-            'insurance_required': self.insurance_required,
-            'special_instructions': self.special_instructions,
-            'status': self.status,
-            'quote_forwarder_booked':[str(self.quote_forwarder_id.id)] if self.quote_forwarder_id else [],
-            'quote_amount': self.quote_amount,
-            'quote_time': self.quote_time.isoformat() if self.quote_time else None,
-            'quote_extra': self.quote_extra,
-            'quote_status': self.quote_status,
-            'booked_forwarder_id': str(self.quote_forwarder_id.id) if self.quote_forwarder_id else None,
-            'assigned_driver_id': str(self.assigned_driver_id.id) if self.assigned_driver_id else None,
-            'metadata': self.metadata if self.metadata else {},
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+    def to_dict(self, include_metadata=True):
+        # One field list for documents and raw rows; references stay undereferenced ids
+        return self.raw_to_dict(self.to_mongo(), include_metadata)
+    
+    @classmethod
+    def raw_to_dict(cls, son, include_metadata=True):
+        """``to_dict`` for a raw ``as_pymongo()`` document, without building a Shipment."""
+        def value(name):
+            return raw_value(cls, son, name)
+        
+        quote_forwarder_id = raw_ref(son.get('quote_forwarder_id'))
+        latest_event = son.get('latest_event')
+        metadata = value('metadata')
+        data = {
+            'id': str(son['_id']),
+            'shipment_number': value('shipment_number'),
+            'supplier_id': raw_ref(son.get('supplier_id')),
+            'buyer_id': raw_ref(son.get('buyer_id')),
+            'forwarder_id': raw_ref(son.get('forwarder_id')),
+            'origin_port': value('origin_port'),
+            'destination_port': value('destination_port'),
+            'origin_latitude': value('origin_latitude'),
+            'origin_longitude': value('origin_longitude'),
+            'destination_latitude': value('destination_latitude'),
+            'destination_longitude': value('destination_longitude'),
+            'incoterm': value('incoterm'),
+            'cargo_type': value('cargo_type'),
+            'container_type': value('container_type'),
+            'container_qty': value('container_qty'),
+            'goods_description': value('goods_description'),
+            'hs_code': value('hs_code'),
+            'gross_weight_kg': value('gross_weight_kg'),
+            'net_weight_kg': value('net_weight_kg'),
+            'volume_cbm': value('volume_cbm'),
+            'total_packages': value('total_packages'),
+            'package_type': value('package_type'),
+            'preferred_etd': raw_iso(son.get('preferred_etd')),
+            'preferred_eta': raw_iso(son.get('preferred_eta')),
+            'actual_etd': raw_iso(son.get('actual_etd')),
+            'actual_eta': raw_iso(son.get('actual_eta')),
+            'declared_value_usd': value('declared_value_usd'),
+            'insurance_required': value('insurance_required'),
+            'special_instructions': value('special_instructions'),
+            'status': value('status'),
+            'quote_forwarder_booked':[quote_forwarder_id] if quote_forwarder_id else [],
+            'quote_amount': value('quote_amount'),
+            'quote_time': raw_iso(son.get('quote_time')),
+            'quote_extra': value('quote_extra'),
+            'quote_status': value('quote_status'),
+            'booked_forwarder_id': quote_forwarder_id,
+            'assigned_driver_id': raw_ref(son.get('assigned_driver_id')),
+            'latest_event': LatestTrackingEvent._from_son(latest_event).to_dict() if latest_event else None,
+            'metadata': metadata if metadata else {},
+            'created_at': raw_iso(son.get('created_at')),
+            'updated_at': raw_iso(son.get('updated_at'))
         }
+        
+        if not include_metadata:
+            data.pop('metadata')
+        
+        return data
@@ -1,7 +1,9 @@
 from mongoengine import Document, StringField, BooleanField, DateTimeField, ReferenceField, ListField
 from datetime import datetime
-from app.models.shipment import Shipment
+from app.models.shipment import Shipment, LatestTrackingEvent
 from app.models.user import User
+from app.utils.references import reference_id, prefetch_references
+from app.utils.serialization import raw_value, raw_iso, raw_ref
 
 
 class TrackingEvent(Document):
@@ -26,29 +28,83 @@ class TrackingEvent(Document):
     
     meta = {
         'collection': 'tracking_events',
-        'indexes': ['shipment_id', 'created_by', 'status', 'timestamp']
+        'indexes': ['shipment_id', 'created_by', 'status', 'timestamp', ('shipment_id', '-timestamp', '-id')]
     }
     
     def save(self, *args, **kwargs):
         self.updated_at = datetime.utcnow()
         return super().save(*args, **kwargs)
     
-    def to_dict(self):
-        return {
-            'id': str(self.id),
-            'shipment_id': str(self.shipment_id.id) if self.shipment_id else None,
-            'created_by': str(self.created_by.id) if self.created_by else None,
-            'status': self.status,
-            'location': self.location,
-            'vessel_name': self.vessel_name,
-            'voyage_number': self.voyage_number,
-            'container_number': self.container_number,
-            'description': self.description,
-            'remarks': self.remarks,
-            'estimated_datetime': self.estimated_datetime.isoformat() if self.estimated_datetime else None,
-            'actual_datetime': self.actual_datetime.isoformat() if self.actual_datetime else None,
-            'documents': self.documents if self.documents else [],
-            'is_milestone': self.is_milestone,
-            'verified': self.verified,
-            'timestamp': self.timestamp.isoformat() if self.timestamp else None
+    def to_snapshot(self):
+        return LatestTrackingEvent(
+            event_id=self.id,
+            created_by=reference_id(self, 'created_by'),
+            status=self.status,
+            location=self.location,
+            description=self.description,
+            remarks=self.remarks,
+            vessel_name=self.vessel_name,
+            voyage_number=self.voyage_number,
+            container_number=self.container_number,
+            documents=self.documents,
+            is_milestone=self.is_milestone,
+            verified=self.verified,
+            estimated_datetime=self.estimated_datetime,
+            actual_datetime=self.actual_datetime,
+            timestamp=self.timestamp
+        )
+    
+    def to_dict(self, creators=None):
+        return self.raw_to_dict(self.to_mongo(), creators)
+    
+    @classmethod
+    def raw_to_dict(cls, son, creators=None):
+        """``to_dict`` for a raw ``as_pymongo()`` document, without building a TrackingEvent."""
+        def value(name):
+            return raw_value(cls, son, name)
+        
+        created_by = reference_id(son, 'created_by')
+        documents = value('documents')
+        data = {
+            'id': str(son['_id']),
+            'shipment_id': raw_ref(son.get('shipment_id')),
+            'created_by': str(created_by) if created_by else None,
+            'status': value('status'),
+            'location': value('location'),
+            'vessel_name': value('vessel_name'),
+            'voyage_number': value('voyage_number'),
+            'container_number': value('container_number'),
+            'description': value('description'),
+            'remarks': value('remarks'),
+            'estimated_datetime': raw_iso(son.get('estimated_datetime')),
+            'actual_datetime': raw_iso(son.get('actual_datetime')),
+            'documents': documents if documents else [],
+            'is_milestone': value('is_milestone'),
+            'verified': value('verified'),
+            'timestamp': raw_iso(son.get('timestamp'))
         }
+        
+        if creators is not None and created_by in creators:
+            data['created_by_name'] = creators[created_by].name
+            data['created_by_company'] = creators[created_by].company_name
+        
+        return data
+    
+    @classmethod
+    def snapshot_to_dict(cls, snapshot, shipment_id):
+        """``to_dict`` for a full ``Shipment.latest_event`` copy, without reading the event."""
+        son = snapshot.to_mongo().to_dict()
+        son['_id'] = son.pop('event_id')
+        son['shipment_id'] = shipment_id
+        return cls.raw_to_dict(son)
+    
+    @classmethod
+    def to_dict_list(cls, events, include_creator_info=False):
+        """Serialize many events with a single query for all their creators.
+        
+        Accepts documents or raw ``as_pymongo()`` rows.
+        """
+        events = list(events)
+        creators = prefetch_references(events, 'created_by', User) if include_creator_info else None
+        return [cls.raw_to_dict(event, creators) if isinstance(event, dict) else event.to_dict(creators)
+                for event in events]
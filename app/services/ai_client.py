@@ -0,0 +1,225 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Optional, Tuple
+
+import google.generativeai as genai
+
+from app.config import Config
+from app.utils.metrics import record_ai_call
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = 'gemini-1.5-flash'
+FALLBACK_MODELS = ['gemini-1.5-flash', 'gemini-pro', 'gemini-1.5-pro']
+
+
+class AITimeoutError(TimeoutError):
+    """The model did not answer within the call's deadline."""
+
+
+class CircuitOpenError(Exception):
+    """The breaker is open; the call was rejected without reaching Gemini."""
+
+
+class CircuitBreaker:
+    """Failure-ratio breaker over a sliding time window.
+
+    Closed: calls pass and outcomes are recorded. Once at least ``min_calls``
+    outcomes in the window fail at ``failure_ratio`` or worse, it opens and
+    rejects every call for ``cooldown_seconds``. It then lets a single probe
+    through (half-open); the probe's outcome closes or re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, window_seconds: float, min_calls: int, failure_ratio: float, cooldown_seconds: float):
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._outcomes: deque = deque()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.trips = 0
+        self.rejected = 0
+
+    def _trim(self, now: float):
+        while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+            self._outcomes.popleft()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                self._state = self.HALF_OPEN
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok: bool):
+        now = time.monotonic()
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+                if ok:
+                    self._state = self.CLOSED
+                    self._outcomes.clear()
+                    logger.info("AI circuit closed after a successful probe")
+                else:
+                    self._open(now)
+                return
+            self._outcomes.append((now, ok))
+            self._trim(now)
+            failures = sum(1 for _, outcome in self._outcomes if not outcome)
+            if self._state == self.CLOSED and len(self._outcomes) >= self.min_calls \
+                    and failures / len(self._outcomes) >= self.failure_ratio:
+                self._open(now)
+
+    def _open(self, now: float):
+        self._state = self.OPEN
+        self._opened_at = now
+        self.trips += 1
+        logger.warning("AI circuit opened; failing fast for %ss", self.cooldown_seconds)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            self._trim(time.monotonic())
+            failures = sum(1 for _, outcome in self._outcomes if not outcome)
+            return {
+                'state': state,
+                'window_calls': len(self._outcomes),
+                'window_failures': failures,
+                'trips': self.trips,
+                'rejected': self.rejected
+            }
+
+
+class AIClient:
+    """Process-wide Gemini access: configured once, models cached per name.
+
+    Calls run on a dedicated bounded pool and the caller waits at most the
+    call's deadline. google-generativeai 0.3 has no per-request timeout, so a
+    stalled call keeps its pool thread until Gemini gives up, but the request
+    thread is released on time; when stalls pile up the pool queue makes
+    further calls time out too, and the breaker then rejects them outright.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._configured = False
+        self._models: Dict[str, Any] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.breaker = CircuitBreaker(
+            window_seconds=Config.AI_BREAKER_WINDOW_SECONDS,
+            min_calls=Config.AI_BREAKER_MIN_CALLS,
+            failure_ratio=Config.AI_BREAKER_FAILURE_RATIO,
+            cooldown_seconds=Config.AI_BREAKER_COOLDOWN_SECONDS
+        )
+        self.timeouts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(Config.GEMINI_API_KEY) and Config.ENABLE_AI_EXTRACTION
+
+    def _configure(self):
+        if not self._configured:
+            with self._lock:
+                if not self._configured:
+                    genai.configure(api_key=Config.GEMINI_API_KEY)
+                    self._configured = True
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Separate from the io pool: upload_invoice already runs extraction on that pool,
+        # and a nested submit into a saturated pool would deadlock
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=Config.AI_MAX_CONCURRENCY,
+                                                        thread_name_prefix='ai')
+        return self._executor
+
+    def get_model(self, preferred_model: str = DEFAULT_MODEL) -> Tuple[Any, str]:
+        """Cached model for ``preferred_model``, falling back through FALLBACK_MODELS."""
+        self._configure()
+        for model_name in [preferred_model] + FALLBACK_MODELS:
+            model = self._models.get(model_name)
+            if model is not None:
+                return model, model_name
+            try:
+                model = genai.GenerativeModel(model_name)
+            except Exception:
+                continue
+            with self._lock:
+                model = self._models.setdefault(model_name, model)
+            return model, model_name
+        raise Exception("No available Gemini model found")
+
+    def generate(self, method: str, model, contents, timeout: Optional[float] = None):
+        """``generate_content`` under the breaker and a deadline, with metrics recorded under ``method``."""
+        if not self.breaker.allow():
+            record_ai_call(method, 0.0, CircuitOpenError())
+            raise CircuitOpenError("AI circuit is open")
+
+        timeout = timeout or Config.AI_TIMEOUT_SECONDS
+        start_time = time.perf_counter()
+        future = self._get_executor().submit(model.generate_content, contents)
+        try:
+            response = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            error = AITimeoutError(f"Gemini call timed out after {timeout}s")
+            record_ai_call(method, time.perf_counter() - start_time, error)
+            self.breaker.record(False)
+            raise error
+        except Exception as e:
+            record_ai_call(method, time.perf_counter() - start_time, e)
+            self.breaker.record(False)
+            raise
+        record_ai_call(method, time.perf_counter() - start_time)
+        self.breaker.record(True)
+        return response
+
+    def warm_up(self):
+        """Configure the SDK and build the default model, then open the connection with a tiny call."""
+        if not self.enabled:
+            return
+        try:
+            model, _ = self.get_model(DEFAULT_MODEL)
+            self.generate('warm_up', model, "Reply with OK.", timeout=Config.AI_TIMEOUT_SECONDS)
+            logger.info("AI client warmed up")
+        except Exception as e:
+            logger.warning("AI warm-up failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = sorted(self._models)
+            timeouts = self.timeouts
+        return {
+            'enabled': self.enabled,
+            'models': models,
+            'timeouts': timeouts,
+            'circuit': self.breaker.stats()
+        }
+
+
+ai_client = AIClient()
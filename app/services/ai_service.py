@@ -1,28 +1,35 @@
-import google.generativeai as genai
 from app.config import Config
-from typing import Optional, Dict, Any
+from app.services.ai_client import ai_client
+from app.services.extraction_cache import extraction_cache
+from app.services.prediction_cache import (
+    customs_cache_key, customs_prediction_cache, rate_cache_key, rate_prediction_cache
+)
+from app.services.customs_engine import customs_engine
+from app.services.document_classifier import document_classifier
+from app.services.rate_engine import rate_engine
+from typing import Optional, Dict, Any, List
 import time
 import base64
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 
 class AIService:
     def __init__(self):
-        if Config.GEMINI_API_KEY:
-            genai.configure(api_key=Config.GEMINI_API_KEY)
-            self.enabled = Config.ENABLE_AI_EXTRACTION
-        else:
-            self.enabled = False
+        # Cheap per request: SDK configuration and models live on the shared ai_client
+        self.enabled = ai_client.enabled
+        # Model time the last extraction saved by coming from the cache, else None
+        self.cache_saved_ms: Optional[int] = None
+    
+    def _generate(self, method: str, model, contents, timeout: Optional[float] = None):
+        """``generate_content`` under the shared deadline and circuit breaker."""
+        return ai_client.generate(method, model, contents, timeout=timeout)
     
     def _get_model(self, preferred_model='gemini-1.5-flash'):
-        """Get a Gemini model with fallback options"""
-        models_to_try = [preferred_model, 'gemini-1.5-flash', 'gemini-pro', 'gemini-1.5-pro']
-        for model_name in models_to_try:
-            try:
-                return genai.GenerativeModel(model_name), model_name
-            except Exception:
-                continue
-        raise Exception("No available Gemini model found")
+        """Get a cached Gemini model with fallback options"""
+        return ai_client.get_model(preferred_model)
     
     def extract_document_data(self, file_path: str, document_type: str) -> tuple[Optional[Dict[str, Any]], float, str]:
         if not self.enabled:
@@ -31,32 +38,44 @@ class AIService:
         try:
             start_time = time.time()
             
-            model, model_name = self._get_model('gemini-1.5-flash')
-            
             with open(file_path, 'rb') as f:
                 file_data = f.read()
             
-            mime_type = self._get_mime_type(file_path)
-            
             prompt = self._get_extraction_prompt(document_type)
+            # Resolved before the cache lookup so entries are keyed on the model that answers
+            model, model_name = self._get_model('gemini-1.5-flash')
+            
+            # Identical files re-uploaded to other shipments skip the model call
+            fingerprint = extraction_cache.fingerprint(prompt, model_name)
+            cache_key, content_hash = extraction_cache.make_key(file_data, document_type, fingerprint)
+            cached = extraction_cache.get(cache_key)
+            if cached is not None:
+                extracted_data, confidence, method, self.cache_saved_ms = cached
+                return extracted_data, confidence, method
+            
+            mime_type = self._get_mime_type(file_path)
             
             file_part = {
                 "mime_type": mime_type,
                 "data": file_data
             }
             
-            response = model.generate_content([prompt, file_part])
+            response = self._generate('extract_document_data', model, [prompt, file_part],
+                                      timeout=Config.AI_EXTRACTION_TIMEOUT_SECONDS)
             
             processing_time = int((time.time() - start_time) * 1000)
             
             response_text = response.text if hasattr(response, 'text') else str(response)
-            print(f"AI Response (first 500 chars): {response_text[:500]}")
+            logger.debug("AI response (first 500 chars): %s", response_text[:500])
             
             extracted_data = self._parse_response(response_text)
-            print(f"Parsed extracted_data keys: {list(extracted_data.keys()) if extracted_data else 'None'}")
+            logger.debug("Parsed extracted_data keys: %s", list(extracted_data.keys()) if extracted_data else None)
             
             confidence = self._calculate_confidence(extracted_data)
             
+            extraction_cache.set(cache_key, content_hash, document_type, fingerprint,
+                                 extracted_data, confidence, model_name, processing_time)
+            
             return extracted_data, confidence, model_name
         except Exception as e:
             print(f"AI extraction error: {str(e)}")
@@ -65,17 +84,25 @@ class AIService:
             return None, 0.0, "error"
     
     def detect_document_type(self, file_path: str) -> tuple[str, float]:
+        try:
+            with open(file_path, 'rb') as f:
+                file_data = f.read()
+        except OSError:
+            return "other", 0.0
+        mime_type = self._get_mime_type(file_path)
+        
+        # Text-layer PDFs that clearly match one type never leave the process
+        if Config.DOC_CLASSIFIER_ENABLED:
+            detected = document_classifier.classify(file_data, mime_type)
+            if detected is not None:
+                return detected
+        
         if not self.enabled:
             return "other", 0.0
         
         try:
             model, _ = self._get_model('gemini-1.5-flash')
             
-            with open(file_path, 'rb') as f:
-                file_data = f.read()
-            
-            mime_type = self._get_mime_type(file_path)
-            
             prompt = """Analyze this document and determine its type. 
             Return only one of: invoice, packing_list, commercial_invoice, certificate_of_origin, 
             bill_of_lading, house_bl, master_bl, telex_release, or other.
@@ -86,7 +113,8 @@ class AIService:
                 "data": file_data
             }
             
-            response = model.generate_content([prompt, file_part])
+            response = self._generate('detect_document_type', model, [prompt, file_part],
+                                      timeout=Config.AI_EXTRACTION_TIMEOUT_SECONDS)
             result = response.text.strip().split('|')
             
             if len(result) == 2:
@@ -100,47 +128,78 @@ class AIService:
     
     def predict_customs_delay(self, port: str, rms_examination: bool, duty_amount: float, 
                              documents_complete: bool) -> Dict[str, Any]:
+        if Config.CUSTOMS_ENGINE_ENABLED:
+            try:
+                prediction = customs_engine.predict(port, rms_examination, duty_amount, documents_complete)
+                if prediction is not None:
+                    return prediction
+            except Exception as e:
+                logger.warning("Local customs prediction failed: %s", e)
+        
         if not self.enabled:
-            return {
-                "delayRisk": "MEDIUM",
-                "predictedDelayDays": 3,
-                "confidenceScore": 0.5,
-                "reasons": ["AI service not available"],
-                "recommendation": "Please ensure all documents are complete"
-            }
+            return self._customs_fallback("AI service not available")
         
         try:
-            model, _ = self._get_model('gemini-1.5-flash')
-            
-            prompt = f"""Analyze customs clearance delay risk for:
-            Port: {port}
-            RMS Examination: {rms_examination}
-            Duty Amount: ${duty_amount}
-            Documents Complete: {documents_complete}
-            
-            Return JSON format:
-            {{
-                "delayRisk": "LOW|MEDIUM|HIGH",
-                "predictedDelayDays": <integer>,
-                "confidenceScore": <float 0.0-1.0>,
-                "reasons": ["reason1", "reason2"],
-                "recommendation": "string"
-            }}"""
-            
-            response = model.generate_content(prompt)
-            import json
-            return json.loads(response.text)
+            # Identical questions within the TTL, or already in flight, share one model call
+            return customs_prediction_cache.get_or_compute(
+                customs_cache_key(port, rms_examination, duty_amount, documents_complete),
+                lambda: self._request_customs_delay(port, rms_examination, duty_amount, documents_complete)
+            )
         except Exception:
-            return {
-                "delayRisk": "MEDIUM",
-                "predictedDelayDays": 3,
-                "confidenceScore": 0.5,
-                "reasons": ["Analysis unavailable"],
-                "recommendation": "Please ensure all documents are complete"
-            }
+            return self._customs_fallback("Analysis unavailable")
+    
+    def predict_customs_delay_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Score many shipments locally in one pass; Gemini is never called per item.
+        
+        With CUSTOMS_ENGINE_ENABLED off, every item gets the single-prediction fallback.
+        """
+        if not Config.CUSTOMS_ENGINE_ENABLED:
+            return [self._customs_fallback("Local customs engine disabled") for _ in items]
+        return customs_engine.predict_batch(items)
+    
+    @staticmethod
+    def _customs_fallback(reason: str) -> Dict[str, Any]:
+        return {
+            "delayRisk": "MEDIUM",
+            "predictedDelayDays": 3,
+            "confidenceScore": 0.5,
+            "reasons": [reason],
+            "recommendation": "Please ensure all documents are complete"
+        }
+    
+    def _request_customs_delay(self, port: str, rms_examination: bool, duty_amount: float,
+                               documents_complete: bool) -> Dict[str, Any]:
+        model, _ = self._get_model('gemini-1.5-flash')
+        
+        prompt = f"""Analyze customs clearance delay risk for:
+        Port: {port}
+        RMS Examination: {rms_examination}
+        Duty Amount: ${duty_amount}
+        Documents Complete: {documents_complete}
+        
+        Return JSON format:
+        {{
+            "delayRisk": "LOW|MEDIUM|HIGH",
+            "predictedDelayDays": <integer>,
+            "confidenceScore": <float 0.0-1.0>,
+            "reasons": ["reason1", "reason2"],
+            "recommendation": "string"
+        }}"""
+        
+        response = self._generate('predict_customs_delay', model, prompt)
+        import json
+        return json.loads(response.text)
     
     def predict_rate(self, origin: str, destination: str, carrier: str, 
                      container_type: str, current_rate: float) -> Dict[str, Any]:
+        if Config.RATE_ENGINE_ENABLED:
+            try:
+                prediction = rate_engine.predict(origin, destination, container_type, current_rate)
+                if prediction is not None:
+                    return prediction
+            except Exception as e:
+                logger.warning("Local rate prediction failed: %s", e)
+        
         if not self.enabled:
             return {
                 "predictedRateUSD": current_rate,
@@ -150,26 +209,10 @@ class AIService:
             }
         
         try:
-            model, _ = self._get_model('gemini-1.5-flash')
-            
-            prompt = f"""Predict freight rate trend for:
-            Origin: {origin}
-            Destination: {destination}
-            Carrier: {carrier}
-            Container Type: {container_type}
-            Current Rate: ${current_rate}
-            
-            Return JSON format:
-            {{
-                "predictedRateUSD": <float>,
-                "trend": "UP|DOWN|STABLE",
-                "confidenceScore": <float 0.0-1.0>,
-                "recommendation": "string"
-            }}"""
-            
-            response = model.generate_content(prompt)
-            import json
-            return json.loads(response.text)
+            return rate_prediction_cache.get_or_compute(
+                rate_cache_key(origin, destination, carrier, container_type, current_rate),
+                lambda: self._request_rate(origin, destination, carrier, container_type, current_rate)
+            )
         except Exception:
             return {
                 "predictedRateUSD": current_rate,
@@ -178,6 +221,29 @@ class AIService:
                 "recommendation": "Analysis unavailable"
             }
     
+    def _request_rate(self, origin: str, destination: str, carrier: str,
+                      container_type: str, current_rate: float) -> Dict[str, Any]:
+        model, _ = self._get_model('gemini-1.5-flash')
+        
+        prompt = f"""Predict freight rate trend for:
+        Origin: {origin}
+        Destination: {destination}
+        Carrier: {carrier}
+        Container Type: {container_type}
+        Current Rate: ${current_rate}
+        
+        Return JSON format:
+        {{
+            "predictedRateUSD": <float>,
+            "trend": "UP|DOWN|STABLE",
+            "confidenceScore": <float 0.0-1.0>,
+            "recommendation": "string"
+        }}"""
+        
+        response = self._generate('predict_rate', model, prompt)
+        import json
+        return json.loads(response.text)
+    
     def _get_mime_type(self, file_path: str) -> str:
         ext = os.path.splitext(file_path)[1].lower()
         mime_types = {
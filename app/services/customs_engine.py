@@ -0,0 +1,296 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import Config
+from app.models.shipment import Shipment
+from app.models.tracking_event import TrackingEvent
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400.0
+CUSTOMS_STATUSES = ['port_arrival', 'customs_clearance', 'held']
+
+# Tracking history records neither RMS examinations, document completeness nor
+# duty, so their effect on the hold probability is a fixed prior, applied on
+# top of the port's observed hold rate
+RMS_HOLD_PROBABILITY = 0.5
+INCOMPLETE_DOCS_HOLD_PROBABILITY = 0.4
+MAX_DUTY_HOLD_PROBABILITY = 0.2
+
+# Used until the network has enough history of its own
+DEFAULT_CLEARANCE_DAYS = 3.0
+DEFAULT_HOLD_RATE = 0.1
+DEFAULT_HOLD_EXTRA_DAYS = 4.0
+
+
+def _norm(value: Any) -> str:
+    return ''.join(str(value or '').split()).upper()
+
+
+def _shrink(value: float, count: int, prior: float) -> float:
+    """Pull a per-port estimate towards ``prior`` in proportion to how little data backs it."""
+    weight = Config.CUSTOMS_ENGINE_PRIOR_WEIGHT
+    if count <= 0 or np.isnan(value):
+        return prior
+    return (count * value + weight * prior) / (count + weight)
+
+
+class PortProfile(NamedTuple):
+    clearance_days: float    # median port_arrival -> customs_clearance, shrunk
+    hold_rate: float         # share of arrivals with a held event, shrunk
+    hold_extra_days: float   # extra clearance days when held, shrunk
+    arrivals: int
+    cleared: int
+
+
+DEFAULT_PROFILE = PortProfile(DEFAULT_CLEARANCE_DAYS, DEFAULT_HOLD_RATE, DEFAULT_HOLD_EXTRA_DAYS, 0, 0)
+
+
+def _columns(profiles: List[PortProfile]) -> Dict[str, np.ndarray]:
+    return {field: np.array([getattr(profile, field) for profile in profiles], dtype=float)
+            for field in PortProfile._fields}
+
+
+class CustomsEngine:
+    """Local customs-delay risk scoring from our own tracking history.
+
+    Each shipment with a ``port_arrival`` event contributes its time to the
+    first ``customs_clearance`` after it, and whether it was ``held`` in
+    between, to its destination port (and the arrival event's location).
+    Per-port medians, hold rates and hold penalties are shrunk towards the
+    network-wide figures, and stored as NumPy columns so any number of
+    shipments is scored in one vectorized pass.
+
+    Trained from Mongo in the background, starting on first use, and rebuilt
+    every ``CUSTOMS_ENGINE_RETRAIN_SECONDS``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: Dict[str, int] = {}
+        # One row per port, plus the network-wide row last for unknown ports. Until the first
+        # training finishes that is the default row alone, so concurrent callers still get an answer
+        self._columns: Dict[str, np.ndarray] = _columns([DEFAULT_PROFILE])
+        self._trained_at: Optional[float] = None
+        self._training = False
+        self.train_ms = 0
+        self.shipments = 0
+        self.local = 0
+        self.no_data = 0
+        self.batch_calls = 0
+        self.batch_rows = 0
+
+    def _observations(self) -> Tuple[Dict[str, list], list]:
+        """(clearance days or nan, held) per arrived shipment: by port key, and once each for the network."""
+        timelines: Dict[Any, Dict[str, Any]] = defaultdict(dict)
+        for row in TrackingEvent._get_collection().find(
+                {'status': {'$in': CUSTOMS_STATUSES}},
+                {'shipment_id': 1, 'status': 1, 'location': 1, 'actual_datetime': 1, 'timestamp': 1}):
+            moment = row.get('actual_datetime') or row.get('timestamp')
+            if moment is None:
+                continue
+            timeline = timelines[row['shipment_id']]
+            timeline.setdefault(row['status'], []).append((moment, row.get('location')))
+
+        arrived = [shipment_id for shipment_id, timeline in timelines.items() if 'port_arrival' in timeline]
+        destinations = {}
+        for row in Shipment._get_collection().find({'_id': {'$in': arrived}}, {'destination_port': 1}):
+            destinations[row['_id']] = row.get('destination_port')
+
+        observations: Dict[str, list] = defaultdict(list)
+        network = []
+        for shipment_id in arrived:
+            timeline = timelines[shipment_id]
+            arrived_at, location = min(timeline['port_arrival'], key=lambda event: event[0])
+            cleared = [moment for moment, _ in timeline.get('customs_clearance', []) if moment >= arrived_at]
+            held = any(moment >= arrived_at for moment, _ in timeline.get('held', []))
+            days = (min(cleared) - arrived_at).total_seconds() / SECONDS_PER_DAY if cleared else float('nan')
+            for key in {_norm(destinations.get(shipment_id)), _norm(location)} - {''}:
+                observations[key].append((days, held))
+            network.append((days, held))
+        self.shipments = len(arrived)
+        return observations, network
+
+    @staticmethod
+    def _profile(days: np.ndarray, held: np.ndarray, prior: PortProfile) -> PortProfile:
+        cleared = ~np.isnan(days)
+        held_cleared = days[cleared & held]
+        free_cleared = days[cleared & ~held]
+        hold_extra = float(held_cleared.mean() - free_cleared.mean()) \
+            if held_cleared.size and free_cleared.size else float('nan')
+        return PortProfile(
+            clearance_days=_shrink(float(np.median(days[cleared])) if cleared.any() else float('nan'),
+                                   int(cleared.sum()), prior.clearance_days),
+            hold_rate=_shrink(float(held.mean()) if held.size else float('nan'), int(held.size), prior.hold_rate),
+            hold_extra_days=max(0.0, _shrink(hold_extra, min(held_cleared.size, free_cleared.size),
+                                             prior.hold_extra_days)),
+            arrivals=int(held.size),
+            cleared=int(cleared.sum())
+        )
+
+    def train(self):
+        """Rebuild every port profile from Mongo and swap them in at once."""
+        start_time = time.time()
+        observations, everything = self._observations()
+        network = self._profile(
+            np.array([days for days, _ in everything], dtype=float),
+            np.array([held for _, held in everything], dtype=bool),
+            DEFAULT_PROFILE
+        ) if everything else DEFAULT_PROFILE
+
+        index = {}
+        profiles = []
+        for key, rows in observations.items():
+            index[key] = len(profiles)
+            profiles.append(self._profile(np.array([days for days, _ in rows], dtype=float),
+                                          np.array([held for _, held in rows], dtype=bool), network))
+        profiles.append(network)
+        columns = _columns(profiles)
+
+        with self._lock:
+            self._index = index
+            self._columns = columns
+            self._trained_at = time.time()
+            self.train_ms = int((time.time() - start_time) * 1000)
+        logger.info("Customs engine trained on %s shipments across %s ports in %sms",
+                    self.shipments, len(index), self.train_ms)
+
+    def _train_in_background(self):
+        try:
+            self.train()
+        except Exception as e:
+            logger.warning("Customs engine training failed: %s", e)
+        finally:
+            self._training = False
+
+    def _stale(self) -> bool:
+        return self._trained_at is None or time.time() - self._trained_at >= Config.CUSTOMS_ENGINE_RETRAIN_SECONDS
+
+    def _ensure_trained(self):
+        """Start a (re)training in the background when the model is missing or stale.
+
+        Never trains on the calling request: until the first training lands, every
+        port is scored with the network defaults.
+        """
+        if not self._stale():
+            return
+        with self._lock:
+            if self._training or not self._stale():
+                return
+            self._training = True
+        threading.Thread(target=self._train_in_background, name='customs-engine-train', daemon=True).start()
+
+    def score(self, ports: Sequence[str], rms_examination: Sequence[bool], duty_amount: Sequence[float],
+              documents_complete: Sequence[bool]) -> Dict[str, np.ndarray]:
+        """Score many shipments at once; every input is one value per shipment."""
+        self._ensure_trained()
+        with self._lock:
+            index, columns = self._index, self._columns
+        rows = np.fromiter((index.get(_norm(port), -1) for port in ports), dtype=np.intp, count=len(ports))
+        rms = np.asarray(rms_examination, dtype=bool)
+        incomplete = ~np.asarray(documents_complete, dtype=bool)
+        duty = np.maximum(np.asarray(duty_amount, dtype=float), 0.0)
+
+        duty_hold = np.minimum(MAX_DUTY_HOLD_PROBABILITY, 0.05 * np.log10(1 + duty / 1000))
+        hold_rate = columns['hold_rate'][rows]
+        hold_probability = 1 - (1 - hold_rate) * (1 - RMS_HOLD_PROBABILITY * rms) \
+            * (1 - INCOMPLETE_DOCS_HOLD_PROBABILITY * incomplete) * (1 - duty_hold)
+        delay_days = columns['clearance_days'][rows] + hold_probability * columns['hold_extra_days'][rows]
+
+        risk = np.where(
+            (delay_days >= Config.CUSTOMS_HIGH_RISK_DAYS) | (hold_probability >= 0.5), 'HIGH',
+            np.where((delay_days <= Config.CUSTOMS_LOW_RISK_DAYS) & (hold_probability < 0.2), 'LOW', 'MEDIUM')
+        )
+        cleared = columns['cleared'][rows]
+        # Confidence follows how many clearances back the port's figures
+        confidence = np.where(rows >= 0, 0.4 + 0.5 * cleared / (cleared + 20), 0.35)
+        return {
+            'rows': rows,
+            'risk': risk,
+            'delay_days': delay_days,
+            'hold_probability': hold_probability,
+            'hold_rate': hold_rate,
+            'clearance_days': columns['clearance_days'][rows],
+            'cleared': cleared,
+            'duty_hold': duty_hold,
+            'confidence': confidence
+        }
+
+    def _prediction(self, scores: Dict[str, np.ndarray], i: int, port: str, rms: bool,
+                    documents_complete: bool) -> Dict[str, Any]:
+        known = scores['rows'][i] >= 0
+        cleared = int(scores['cleared'][i])
+        reasons = []
+        if known and cleared:
+            reasons.append(f"Median clearance at {port} is {scores['clearance_days'][i]:.1f} days "
+                           f"over {cleared} shipments")
+        else:
+            reasons.append(f"No clearance history for {port}; using the network average")
+        if scores['hold_rate'][i] >= 0.1:
+            reasons.append(f"{scores['hold_rate'][i]:.0%} of shipments {'at this port ' if known else ''}were held")
+        if rms:
+            reasons.append("RMS examination raises the chance of a hold")
+        if not documents_complete:
+            reasons.append("Incomplete documents commonly lead to holds")
+        if scores['duty_hold'][i] >= 0.1:
+            reasons.append("High duty amount draws additional scrutiny")
+
+        risk = str(scores['risk'][i])
+        if risk == 'HIGH':
+            recommendation = "Plan for a hold: pre-clear documents with the broker and keep buffer days"
+        elif risk == 'MEDIUM':
+            recommendation = "Check documents before arrival to avoid a hold"
+        else:
+            recommendation = "Clearance is expected to be routine"
+        return {
+            "delayRisk": risk,
+            "predictedDelayDays": int(round(float(scores['delay_days'][i]))),
+            "confidenceScore": round(float(scores['confidence'][i]), 2),
+            "reasons": reasons,
+            "recommendation": recommendation,
+            "holdProbability": round(float(scores['hold_probability'][i]), 2),
+            "sampleSize": cleared if known else 0,
+            "source": "historical"
+        }
+
+    def predict(self, port: str, rms_examination: bool, duty_amount: float,
+                documents_complete: bool) -> Optional[Dict[str, Any]]:
+        """One shipment, or None when the port has fewer than CUSTOMS_ENGINE_MIN_SAMPLES clearances."""
+        scores = self.score([port], [rms_examination], [duty_amount], [documents_complete])
+        if scores['rows'][0] < 0 or scores['cleared'][0] < Config.CUSTOMS_ENGINE_MIN_SAMPLES:
+            self.no_data += 1
+            return None
+        self.local += 1
+        return self._prediction(scores, 0, port, rms_examination, documents_complete)
+
+    def predict_batch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Score a portfolio in one pass; ports without history get the network figures."""
+        ports = [item['port'] for item in items]
+        rms = [bool(item['rms_examination']) for item in items]
+        documents = [bool(item['documents_complete']) for item in items]
+        scores = self.score(ports, rms, [item['duty_amount'] for item in items], documents)
+        self.batch_calls += 1
+        self.batch_rows += len(items)
+        return [self._prediction(scores, i, ports[i], rms[i], documents[i]) for i in range(len(items))]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": Config.CUSTOMS_ENGINE_ENABLED,
+            "ports": len(self._index),
+            "shipments": self.shipments,
+            "trained_at": datetime.utcfromtimestamp(self._trained_at).isoformat() if self._trained_at else None,
+            "train_ms": self.train_ms,
+            "local_predictions": self.local,
+            "no_data": self.no_data,
+            "batch_calls": self.batch_calls,
+            "batch_rows": self.batch_rows
+        }
+
+
+customs_engine = CustomsEngine()
@@ -0,0 +1,245 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import Config
+from app.utils.pdf_text import extract_pdf_text
+
+logger = logging.getLogger(__name__)
+
+# Weighted phrases that characterise each DocumentModel.type. A phrase shared by
+# several types counts for less through its inverse document frequency, so the
+# shared bill-of-lading vocabulary mostly separates BLs from everything else and
+# the few house/master/telex phrases decide between them. 'other' has no profile:
+# it is what Gemini is asked about when nothing here fits.
+PROFILES: Dict[str, Dict[str, float]] = {
+    'invoice': {
+        'invoice': 3, 'tax invoice': 3, 'invoice no': 2, 'invoice number': 2, 'invoice date': 2, 'bill to': 2,
+        'due date': 2, 'amount due': 2, 'subtotal': 2, 'sub total': 2, 'gst': 1, 'vat': 1, 'tax': 1,
+        'payment terms': 1, 'total amount': 1, 'unit price': 1, 'qty': 1, 'balance due': 2, 'remit to': 1,
+        'bank details': 1, 'description': 0.5, 'amount': 0.5,
+    },
+    'commercial_invoice': {
+        'commercial invoice': 4, 'invoice': 1, 'invoice no': 1, 'exporter': 2, 'importer': 2,
+        'consignee': 1, 'incoterms': 2, 'terms of delivery': 2, 'hs code': 2, 'hs': 1, 'country of origin': 1,
+        'fob': 1, 'cif': 1, 'cfr': 1, 'exw': 1, 'port of loading': 1, 'port of discharge': 1,
+        'final destination': 1, 'unit price': 1, 'total value': 1, 'currency': 1, 'buyer': 1, 'seller': 1,
+        'declaration': 1, 'we declare': 1, 'lc no': 1, 'iec': 1,
+    },
+    'packing_list': {
+        'packing list': 4, 'packing': 1, 'gross weight': 2, 'net weight': 2, 'carton': 2, 'cartons': 2,
+        'packages': 2, 'no of packages': 2, 'dimensions': 2, 'cbm': 2, 'measurement': 1, 'marks and numbers': 2,
+        'marks': 1, 'pkgs': 2, 'carton no': 2, 'pcs': 1, 'kgs': 1, 'pallet': 1, 'pallets': 1, 'total cartons': 2,
+        'volume': 1,
+    },
+    'certificate_of_origin': {
+        'certificate of origin': 4, 'certificate': 1, 'origin': 1, 'country of origin': 2,
+        'chamber of commerce': 3, 'hereby certify': 3, 'certify': 1, 'originating': 2, 'origin criterion': 3,
+        'preferential': 2, 'form a': 2, 'gsp': 2, 'issuing authority': 2, 'certification': 1,
+        'declaration by the exporter': 2, 'producer': 1, 'fta': 1, 'attestation': 2,
+    },
+    'bill_of_lading': {
+        'bill of lading': 4, 'b/l': 2, 'b/l no': 2, 'shipper': 2, 'consignee': 1, 'notify party': 2,
+        'port of loading': 1, 'port of discharge': 1, 'place of receipt': 2, 'place of delivery': 2,
+        'vessel': 1, 'voyage': 1, 'voyage no': 1, 'ocean vessel': 2, 'shipped on board': 2, 'on board': 1,
+        'freight prepaid': 2, 'freight collect': 2, 'number of original': 2, 'originals': 1, 'container no': 1,
+        'seal no': 2, 'said to contain': 2, 'stc': 1, 'carrier': 1, 'place and date of issue': 2,
+    },
+    'house_bl': {
+        'house bill of lading': 5, 'house b/l': 5, 'hbl': 4, 'hbl no': 4, 'nvocc': 3, 'freight forwarder': 2,
+        'forwarder': 1, 'bill of lading': 1, 'shipper': 1, 'notify party': 1, 'master b/l no': 2,
+        'as agent': 1, 'consolidation': 2, 'co loader': 2,
+    },
+    'master_bl': {
+        'master bill of lading': 5, 'master b/l': 5, 'mbl': 4, 'mbl no': 4, 'ocean carrier': 2,
+        'bill of lading': 1, 'shipper': 1, 'notify party': 1, 'scac': 3, 'booking no': 1, 'carrier': 1,
+        'liner': 1, 'as carrier': 2,
+    },
+    'telex_release': {
+        'telex release': 5, 'telex released': 5, 'express release': 4, 'surrendered': 3, 'surrender': 2,
+        'original bills': 2, 'original b/l': 2, 'without presentation': 3, 'release the cargo': 3,
+        'release cargo': 2, 'please release': 3, 'seaway bill': 2, 'b/l no': 1, 'bill of lading': 1,
+        'consignee': 1,
+    },
+}
+
+# Headings that name the type outright; found near the top they decide most documents
+TITLES: Dict[str, List[str]] = {
+    'invoice': ['tax invoice', 'invoice', 'proforma invoice'],
+    'commercial_invoice': ['commercial invoice', 'export invoice', 'customs invoice'],
+    'packing_list': ['packing list', 'packing slip', 'packing specification', 'weight list'],
+    'certificate_of_origin': ['certificate of origin', 'origin certificate'],
+    'bill_of_lading': ['bill of lading', 'ocean bill of lading', 'combined transport bill of lading'],
+    'house_bl': ['house bill of lading', 'house b/l'],
+    'master_bl': ['master bill of lading', 'master b/l'],
+    'telex_release': ['telex release', 'express release', 'telex released'],
+}
+# How many leading characters count as the heading
+TITLE_CHARS = 300
+TITLE_BONUS = 0.3
+BL_SUBTYPES = ('house_bl', 'master_bl')
+# Below this, a bill of lading without a house/master heading is a plain one
+SUBTYPE_MIN_EVIDENCE = 0.05
+
+_WORD = re.compile(r"[a-z0-9]+(?:/[a-z0-9]+)*")
+_MAX_NGRAM = max(len(phrase.split()) for profile in PROFILES.values() for phrase in profile)
+
+
+def _tokens(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+class DocumentClassifier:
+    """Local document-type classifier for text-layer PDFs.
+
+    The document's phrase counts are weighted by TF-IDF over the type
+    profiles and compared by cosine similarity against every profile in one
+    matrix product; a type named in the heading gets ``TITLE_BONUS``. The
+    best type is returned only when it scores ``DOC_CLASSIFIER_MIN_SCORE``
+    and beats the runner-up by ``DOC_CLASSIFIER_MIN_MARGIN``; anything else
+    (including scans, images and PDFs without a usable text layer) returns
+    None and goes to Gemini.
+    """
+
+    def __init__(self):
+        self.types = list(PROFILES)
+        self.vocabulary = sorted({phrase for profile in PROFILES.values() for phrase in profile})
+        self._column = {phrase: i for i, phrase in enumerate(self.vocabulary)}
+        document_frequency = np.array([sum(phrase in profile for profile in PROFILES.values())
+                                       for phrase in self.vocabulary], dtype=float)
+        self.idf = np.log((1 + len(PROFILES)) / (1 + document_frequency)) + 1
+        weights = np.zeros((len(self.types), len(self.vocabulary)))
+        for row, document_type in enumerate(self.types):
+            for phrase, weight in PROFILES[document_type].items():
+                weights[row, self._column[phrase]] = weight * self.idf[self._column[phrase]]
+        self.profiles = weights / np.linalg.norm(weights, axis=1, keepdims=True)
+
+        self._bl_specific = {
+            subtype: np.array([self._column[phrase] for phrase in PROFILES[subtype]
+                               if phrase not in PROFILES['bill_of_lading']], dtype=np.intp)
+            for subtype in BL_SUBTYPES
+        }
+        # "Master B/L No" or "Invoice Date" is a field label, not a heading
+        self._titles = [(re.compile(r'(?<![a-z0-9/])' + re.escape(title) + r'(?![a-z0-9/])(?! (?:no|number|date)\b)'),
+                         title, document_type)
+                        for document_type, titles in TITLES.items() for title in titles]
+        self._lock = threading.Lock()
+        self.classified = 0
+        self.ambiguous = 0
+        self.no_text = 0
+        self.total_ms = 0.0
+
+    def vectorize(self, text: str) -> np.ndarray:
+        tokens = _tokens(text)
+        counts = Counter()
+        for size in range(1, _MAX_NGRAM + 1):
+            for i in range(len(tokens) - size + 1):
+                phrase = ' '.join(tokens[i:i + size])
+                if phrase in self._column:
+                    counts[self._column[phrase]] += 1
+        vector = np.zeros(len(self.vocabulary))
+        if counts:
+            columns = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+            values = np.fromiter(counts.values(), dtype=float, count=len(counts))
+            vector[columns] = (1 + np.log(values)) * self.idf[columns]
+            vector /= np.linalg.norm(vector)
+        return vector
+
+    def _title(self, text: str) -> Optional[str]:
+        """The type whose heading appears first; "commercial invoice" beats the "invoice" inside it."""
+        heading = ' '.join(_tokens(text[:TITLE_CHARS]))
+        found = []
+        for pattern, title, document_type in self._titles:
+            match = pattern.search(heading)
+            if match:
+                found.append((match.start(), -len(title), document_type))
+        return min(found)[2] if found else None
+
+    def _bl_subtype(self, vector: np.ndarray, title: Optional[str]) -> Optional[str]:
+        """House, master or plain BL, from the phrases only the house or master profile has."""
+        if title in BL_SUBTYPES:
+            return title
+        evidence = {subtype: float(self.profiles[self.types.index(subtype)][columns] @ vector[columns])
+                    for subtype, columns in self._bl_specific.items()}
+        (first, first_score), (_, second_score) = sorted(evidence.items(), key=lambda item: -item[1])
+        if first_score < SUBTYPE_MIN_EVIDENCE:
+            return 'bill_of_lading'
+        # A house BL quotes the master B/L number, so some master evidence is normal; only a clear lead counts
+        return first if first_score >= 2 * second_score else None
+
+    def classify_text(self, text: str) -> Optional[Tuple[str, float]]:
+        if len(text.strip()) < Config.DOC_CLASSIFIER_MIN_TEXT_CHARS:
+            return None
+        vector = self.vectorize(text)
+        title = self._title(text)
+        similarity = self.profiles @ vector
+        if title is not None:
+            similarity[self.types.index(title)] += TITLE_BONUS
+
+        # House and master BLs are bills of lading first: the three compete with the
+        # other types as one family, then the subtype is settled on its own evidence
+        families: Dict[str, float] = {}
+        for document_type, score in zip(self.types, similarity):
+            family = 'bill_of_lading' if document_type in BL_SUBTYPES else document_type
+            families[family] = max(families.get(family, 0.0), float(score))
+        ranked = sorted(families.items(), key=lambda item: -item[1])
+        (best, best_score), (_, second_score) = ranked[0], ranked[1]
+        margin = best_score - second_score
+        if best_score < Config.DOC_CLASSIFIER_MIN_SCORE or margin < Config.DOC_CLASSIFIER_MIN_MARGIN:
+            return None
+        if best == 'bill_of_lading':
+            best = self._bl_subtype(vector, title)
+            if best is None:
+                return None
+        return best, round(min(0.99, 0.6 + margin), 2)
+
+    def extract_text(self, file_data: bytes, mime_type: str) -> str:
+        if mime_type == 'application/pdf' or file_data[:5] == b'%PDF-':
+            return extract_pdf_text(file_data, max_chars=Config.DOC_CLASSIFIER_MAX_TEXT_CHARS)
+        if mime_type.startswith('text/'):
+            return file_data[:Config.DOC_CLASSIFIER_MAX_TEXT_CHARS].decode('utf-8', 'ignore')
+        # No OCR in this stack: images carry no text we can score
+        return ''
+
+    def classify(self, file_data: bytes, mime_type: str) -> Optional[Tuple[str, float]]:
+        """(type, confidence) when the text layer settles it, else None."""
+        start_time = time.perf_counter()
+        try:
+            text = self.extract_text(file_data, mime_type)
+            result = self.classify_text(text) if text.strip() else None
+        except Exception as e:
+            logger.warning("Local document classification failed: %s", e)
+            text, result = '', None
+        with self._lock:
+            self.total_ms += (time.perf_counter() - start_time) * 1000
+            if result is not None:
+                self.classified += 1
+            elif text.strip():
+                self.ambiguous += 1
+            else:
+                self.no_text += 1
+        return result
+
+    def classify_file(self, file_path: str, mime_type: str) -> Optional[Tuple[str, float]]:
+        with open(file_path, 'rb') as f:
+            return self.classify(f.read(), mime_type)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self.classified + self.ambiguous + self.no_text
+            return {
+                "enabled": Config.DOC_CLASSIFIER_ENABLED,
+                "classified": self.classified,
+                "ambiguous": self.ambiguous,
+                "no_text": self.no_text,
+                "local_rate": round(self.classified / calls, 4) if calls else 0.0,
+                "avg_ms": round(self.total_ms / calls, 2) if calls else 0.0
+            }
+
+
+document_classifier = DocumentClassifier()
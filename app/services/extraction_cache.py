@@ -0,0 +1,96 @@
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from mongoengine import NotUniqueError
+
+from app.config import Config
+from app.models.document import ExtractionCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Bump when the parsing/confidence logic changes in a way the prompt text does not show
+EXTRACTION_CACHE_VERSION = 1
+
+CACHE_METHOD_PREFIX = 'cache:'
+
+
+class ExtractionCache:
+    """Content-addressed cache of AI extraction results.
+
+    Entries are keyed by the SHA-256 of the file bytes, the document type and a
+    fingerprint of the prompt, so editing a prompt never serves stale results.
+    Mongo expires entries through a TTL index on ``created_at``.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0
+
+    @staticmethod
+    def fingerprint(prompt: str, model_name: str) -> str:
+        raw = f"{EXTRACTION_CACHE_VERSION}|{model_name}|{prompt}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def make_key(file_data: bytes, document_type: str, fingerprint: str) -> Tuple[str, str]:
+        content_hash = hashlib.sha256(file_data).hexdigest()
+        return f"{content_hash}:{document_type}:{fingerprint}", content_hash
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float, str, int]]:
+        """Cached data, confidence, ``cache:``-prefixed method and the original extraction time."""
+        if not self.enabled:
+            return None
+        try:
+            entry = ExtractionCacheEntry.objects(key=key).modify(inc__hits=1, new=True)
+        except Exception as e:
+            logger.warning("Extraction cache lookup error: %s", e)
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_ms += entry.processing_time_ms or 0
+        return (entry.extracted_data, entry.confidence_score, f"{CACHE_METHOD_PREFIX}{entry.model_name}",
+                entry.processing_time_ms or 0)
+
+    def set(self, key: str, content_hash: str, document_type: str, fingerprint: str,
+            extracted_data: Dict[str, Any], confidence: float, model_name: str, processing_time_ms: int):
+        if not self.enabled or not extracted_data:
+            return
+        try:
+            ExtractionCacheEntry(
+                key=key,
+                content_hash=content_hash,
+                document_type=document_type,
+                fingerprint=fingerprint,
+                extracted_data=extracted_data,
+                confidence_score=confidence,
+                model_name=model_name,
+                processing_time_ms=processing_time_ms
+            ).save()
+        except NotUniqueError:
+            # A concurrent upload of the same file already stored it
+            pass
+        except Exception as e:
+            logger.warning("Extraction cache store error: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "saved_ms": self.saved_ms
+            }
+
+
+extraction_cache = ExtractionCache(enabled=Config.EXTRACTION_CACHE_ENABLED)
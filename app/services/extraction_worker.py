@@ -0,0 +1,243 @@
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from mongoengine import Q
+
+from app.config import Config
+from app.models.document import DocumentModel, ExtractionJob
+from app.services.ai_service import AIService
+from app.utils.references import reference_id
+
+logger = logging.getLogger(__name__)
+
+
+class RetryableExtractionError(Exception):
+    pass
+
+
+class ExtractionWorkerPool:
+    """Long-lived pool of threads draining the ``extraction_jobs`` collection.
+
+    Jobs are claimed with a single ``find_one_and_update`` (pending ->
+    processing), so any number of pools, in-process or standalone, can share
+    the queue. A claim is a lease: jobs still ``processing`` after
+    ``lease_seconds`` belong to a crashed worker and are put back.
+    """
+
+    def __init__(self, concurrency: int = 2, poll_seconds: float = 2.0, max_attempts: int = 3,
+                 backoff_seconds: float = 30.0, lease_seconds: int = 600):
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._last_recovery = 0.0
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name=f"extraction-worker-{i}", daemon=True)
+                for i in range(max(self.concurrency, 1))
+            ]
+            for thread in self._threads:
+                thread.start()
+        logger.info("Extraction worker %s started with %d threads", self.worker_id, len(self._threads))
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def notify(self):
+        """Wake idle workers so a freshly queued job is picked up immediately."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.recover_stale_jobs()
+                job = self.claim_next()
+            except Exception:
+                logger.exception("Extraction worker failed to poll the job queue")
+                job = None
+
+            if job is None:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+
+            self.process(job)
+
+    def claim_next(self) -> Optional[ExtractionJob]:
+        now = datetime.utcnow()
+        # QuerySet.modify issues a single find_one_and_update, so two workers
+        # can never claim the same job
+        return ExtractionJob.objects(
+            Q(status='pending') & (Q(available_at__lte=now) | Q(available_at=None))
+        ).order_by('available_at', 'created_at').modify(
+            new=True,
+            set__status='processing',
+            set__started_at=now,
+            set__worker_id=self.worker_id,
+            set__updated_at=now,
+            inc__attempts=1
+        )
+
+    def recover_stale_jobs(self) -> int:
+        """Hand jobs whose lease expired back to the queue, or fail them for good."""
+        if time.monotonic() - self._last_recovery < self.poll_seconds:
+            return 0
+        self._last_recovery = time.monotonic()
+
+        now = datetime.utcnow()
+        stale = Q(status='processing') & (Q(started_at__lt=now - timedelta(seconds=self.lease_seconds)) | Q(started_at=None))
+        exhausted = ExtractionJob.objects(stale & Q(attempts__gte=self.max_attempts)).update(
+            set__status='failed',
+            set__error_message='Worker lease expired',
+            set__updated_at=now
+        )
+        requeued = ExtractionJob.objects(stale & Q(attempts__lt=self.max_attempts)).update(
+            set__status='pending',
+            set__available_at=now,
+            set__updated_at=now,
+            unset__worker_id=True
+        )
+        if exhausted or requeued:
+            logger.warning("Recovered stale extraction jobs: %d requeued, %d failed", requeued, exhausted)
+        return requeued + exhausted
+
+    def process(self, job: ExtractionJob):
+        start_time = time.time()
+        file_path = None
+        try:
+            document = DocumentModel.objects(id=reference_id(job, 'document_id')).exclude('extracted_data').first()
+            if not document:
+                raise ValueError("Document not found")
+            if not document.file_blob:
+                raise ValueError("Document has no stored file to extract from")
+
+            file_path = self._download(document)
+            ai_service = AIService()
+            extracted_data, confidence, method = ai_service.extract_document_data(file_path, document.type)
+            if method == 'error':
+                raise RetryableExtractionError("AI extraction error")
+
+            # A cache hit records the extraction time it saved, next to its cache: method
+            finished = self._finish(
+                job,
+                status='completed' if extracted_data else 'failed',
+                model_used=method,
+                processing_time_ms=ai_service.cache_saved_ms if ai_service.cache_saved_ms is not None
+                else int((time.time() - start_time) * 1000),
+                error_message=None
+            )
+            if not finished:
+                logger.warning("Extraction job %s lost its lease; discarding its result", job.id)
+                return
+
+            document.extracted_data = extracted_data
+            document.confidence_score = confidence
+            document.extraction_method = method
+            document.needs_review = confidence < 0.8
+            document.save()
+        except Exception as e:
+            self._fail(job, e, retryable=not isinstance(e, ValueError))
+        finally:
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+
+    def _download(self, document: DocumentModel) -> str:
+        # AIService infers the mime type from the extension, so keep it
+        suffix = os.path.splitext(document.file_name or '')[1]
+        fd, file_path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'wb') as f:
+            blob = document.file_blob.get()
+            for chunk in blob:
+                f.write(chunk)
+        return file_path
+
+    def _finish(self, job: ExtractionJob, **fields) -> bool:
+        """Write ``fields`` only while this claim still holds the job's lease.
+
+        Once the lease expires, recover_stale_jobs may hand the job to another
+        worker (or back to this pool, with a new ``started_at``); that claim owns it now.
+        """
+        updates = {f'set__{name}': value for name, value in fields.items()}
+        return ExtractionJob.objects(
+            id=job.id, status='processing', worker_id=self.worker_id, started_at=job.started_at
+        ).update_one(set__updated_at=datetime.utcnow(), **updates) > 0
+
+    def _fail(self, job: ExtractionJob, error: Exception, retryable: bool):
+        retry = retryable and job.attempts < self.max_attempts
+        delay = self.backoff_seconds * (2 ** max(job.attempts - 1, 0))
+        fields = {'status': 'pending', 'available_at': datetime.utcnow() + timedelta(seconds=delay)} \
+            if retry else {'status': 'failed'}
+        try:
+            finished = self._finish(job, error_message=str(error), **fields)
+        except Exception:
+            # The lease expires and recover_stale_jobs picks the job up again
+            logger.exception("Could not record failure of extraction job %s", job.id)
+            return
+        if not finished:
+            logger.warning("Extraction job %s lost its lease; not recording its failure: %s", job.id, error)
+        elif retry:
+            logger.warning("Extraction job %s failed (attempt %d), retrying in %.0fs: %s",
+                           job.id, job.attempts, delay, error)
+        else:
+            logger.error("Extraction job %s failed permanently: %s", job.id, error)
+
+
+extraction_pool = ExtractionWorkerPool(
+    concurrency=Config.EXTRACTION_WORKER_CONCURRENCY,
+    poll_seconds=Config.EXTRACTION_WORKER_POLL_SECONDS,
+    max_attempts=Config.EXTRACTION_JOB_MAX_ATTEMPTS,
+    backoff_seconds=Config.EXTRACTION_JOB_BACKOFF_SECONDS,
+    lease_seconds=Config.EXTRACTION_JOB_LEASE_SECONDS
+)
+
+
+def enqueue_extraction(document: DocumentModel) -> ExtractionJob:
+    extraction_job = ExtractionJob(document_id=document, status='pending', available_at=datetime.utcnow())
+    extraction_job.save()
+
+    if Config.EXTRACTION_WORKER_IN_PROCESS:
+        extraction_pool.start()
+    extraction_pool.notify()
+    return extraction_job
+
+
+def main():
+    from app import create_app
+
+    # One app for the Mongo connection and logging config; the pool needs no request context
+    create_app()
+    extraction_pool.start()
+    try:
+        while extraction_pool.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        extraction_pool.stop(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
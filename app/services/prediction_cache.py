@@ -0,0 +1,127 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from app.config import Config
+
+
+class PredictionCache:
+    """Process-wide TTL/LRU cache of AI predictions with single-flight loading.
+
+    Concurrent misses on the same key share one ``compute`` call: the first
+    caller runs it and the rest wait on its result. Only successful results
+    are cached; an exception is handed to everyone waiting on that call and
+    the next request tries again.
+    """
+
+    def __init__(self, name: str, max_size: int = 2048, ttl_seconds: float = 900.0):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[1])
+            if entry is not None:
+                del self._entries[key]
+
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return dict(future.result())
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            if self.max_size > 0 and self.ttl_seconds > 0:
+                self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        future.set_result(value)
+        return dict(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+            inflight = len(self._inflight)
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": inflight,
+            # Coalesced callers were served without their own model call too
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions
+        }
+
+
+def _bucket(value: float, size: float) -> int:
+    return int(math.floor(float(value) / size)) if size > 0 else int(round(float(value)))
+
+
+def _norm(value: Any) -> str:
+    return ''.join(str(value).split()).upper()
+
+
+def rate_cache_key(origin: str, destination: str, carrier: str, container_type: str,
+                   current_rate: float) -> Tuple:
+    """Lane, carrier and container, plus the current rate in AI_RATE_BUCKET_USD steps."""
+    return (_norm(origin), _norm(destination), _norm(carrier), _norm(container_type),
+            _bucket(current_rate, Config.AI_RATE_BUCKET_USD))
+
+
+def customs_cache_key(port: str, rms_examination: bool, duty_amount: float, documents_complete: bool) -> Tuple:
+    """Port and flags, plus the duty in AI_DUTY_BUCKET_USD steps."""
+    return (_norm(port), bool(rms_examination), _bucket(duty_amount, Config.AI_DUTY_BUCKET_USD),
+            bool(documents_complete))
+
+
+rate_prediction_cache = PredictionCache(
+    'rate',
+    max_size=Config.AI_PREDICTION_CACHE_MAX_SIZE,
+    ttl_seconds=Config.AI_RATE_CACHE_TTL_SECONDS
+)
+customs_prediction_cache = PredictionCache(
+    'customs',
+    max_size=Config.AI_PREDICTION_CACHE_MAX_SIZE,
+    ttl_seconds=Config.AI_CUSTOMS_CACHE_TTL_SECONDS
+)
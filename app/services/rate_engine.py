@@ -0,0 +1,321 @@
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+from mongoengine import signals
+
+from app.config import Config
+from app.models.quote import Quote
+from app.models.shipment import Shipment
+from app.utils.references import reference_id
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400.0
+ANY_CONTAINER = '*'
+# Cap on the fitted drift, in log-rate per day (~1%/day), so a few outliers cannot extrapolate wildly
+MAX_DAILY_SLOPE = 0.01
+
+
+def _norm(value: Any) -> str:
+    return ''.join(str(value or '').split()).upper()
+
+
+def _day(moment: datetime) -> float:
+    return moment.timestamp() / SECONDS_PER_DAY if moment.tzinfo else \
+        (moment - datetime(1970, 1, 1)).total_seconds() / SECONDS_PER_DAY
+
+
+class RateFit(NamedTuple):
+    level: float         # fitted per-container rate today, USD
+    slope: float         # log-rate drift per day
+    volatility: float    # weighted residual std of log rates
+    samples: int
+    effective_samples: float
+    fitted_at: float     # day number the fit is relative to
+
+
+class RateSeries:
+    """Per-container rate observations for one lane, in growable NumPy arrays."""
+
+    __slots__ = ('days', 'rates', 'size', '_fit')
+
+    def __init__(self, capacity: int = 16):
+        self.days = np.empty(capacity)
+        self.rates = np.empty(capacity)
+        self.size = 0
+        self._fit: Optional[RateFit] = None
+
+    @classmethod
+    def from_arrays(cls, days: np.ndarray, rates: np.ndarray) -> "RateSeries":
+        series = cls(capacity=max(16, len(days) * 2))
+        series.days[:len(days)] = days
+        series.rates[:len(rates)] = rates
+        series.size = len(days)
+        return series
+
+    def append(self, day: float, rate: float):
+        if self.size == len(self.days):
+            self.days = np.resize(self.days, self.size * 2)
+            self.rates = np.resize(self.rates, self.size * 2)
+        self.days[self.size] = day
+        self.rates[self.size] = rate
+        self.size += 1
+        self._fit = None
+
+    def fit(self, today: float) -> Optional[RateFit]:
+        """Exponentially weighted least squares of log(rate) on time, relative to ``today``.
+
+        Cached until the series changes or a day has passed.
+        """
+        if self._fit is not None and today - self._fit.fitted_at < 1.0:
+            return self._fit
+        days = self.days[:self.size] - today
+        mask = days >= -Config.RATE_ENGINE_WINDOW_DAYS
+        if int(mask.sum()) < Config.RATE_ENGINE_MIN_SAMPLES:
+            self._fit = None
+            return None
+        t = days[mask]
+        y = np.log(self.rates[:self.size][mask])
+        w = np.power(0.5, -t / Config.RATE_ENGINE_HALF_LIFE_DAYS)
+
+        total = w.sum()
+        t_mean = (w * t).sum() / total
+        y_mean = (w * y).sum() / total
+        t_var = (w * (t - t_mean) ** 2).sum() / total
+        slope = (w * (t - t_mean) * (y - y_mean)).sum() / total / t_var if t_var > 1e-9 else 0.0
+        slope = float(np.clip(slope, -MAX_DAILY_SLOPE, MAX_DAILY_SLOPE))
+        intercept = y_mean - slope * t_mean
+        residuals = y - (intercept + slope * t)
+
+        self._fit = RateFit(
+            level=float(math.exp(intercept)),
+            slope=slope,
+            volatility=float(math.sqrt((w * residuals ** 2).sum() / total)),
+            samples=int(t.size),
+            effective_samples=float(total ** 2 / (w ** 2).sum()),
+            fitted_at=today
+        )
+        return self._fit
+
+
+class RateEngine:
+    """Local freight-rate prediction from our own quotes.
+
+    Every ``Quote.total_amount_usd`` and accepted ``Shipment.quote_amount``
+    becomes a per-container observation on its (origin, destination,
+    container type) series, and on the lane's all-containers series. A
+    prediction fits a decayed trend and volatility to the series and
+    extrapolates ``RATE_ENGINE_HORIZON_DAYS`` ahead. The carrier is not
+    part of the key because quotes do not record one. Lanes with fewer than
+    ``RATE_ENGINE_MIN_SAMPLES`` recent observations return None so the
+    caller can fall back to Gemini.
+
+    Trained from Mongo in the background, starting on first use, and every
+    ``RATE_ENGINE_RETRAIN_SECONDS`` after that. Quotes saved by this process
+    are added as they arrive.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, str, str], RateSeries] = {}
+        self._trained_at: Optional[float] = None
+        self._training = False
+        self.train_ms = 0
+        self.observations = 0
+        self.local = 0
+        self.no_data = 0
+
+    def _add(self, series: Dict[Tuple[str, str, str], RateSeries], origin: str, destination: str,
+             container_type: str, day: float, rate: float):
+        for container in (_norm(container_type) or ANY_CONTAINER, ANY_CONTAINER):
+            key = (_norm(origin), _norm(destination), container)
+            entry = series.get(key)
+            if entry is None:
+                entry = series[key] = RateSeries()
+            entry.append(day, rate)
+            if container == ANY_CONTAINER:
+                break
+
+    def _load(self) -> Iterable[Tuple[str, str, str, float, float]]:
+        cutoff = datetime.utcnow() - timedelta(days=Config.RATE_ENGINE_WINDOW_DAYS)
+        lanes = {}
+        for row in Shipment._get_collection().find({}, {
+            'origin_port': 1, 'destination_port': 1, 'container_type': 1, 'container_qty': 1,
+            'quote_amount': 1, 'quote_time': 1, 'updated_at': 1
+        }):
+            if not row.get('origin_port') or not row.get('destination_port'):
+                continue
+            lanes[row['_id']] = (row['origin_port'], row['destination_port'], row.get('container_type'))
+            quoted_at = row.get('quote_time') or row.get('updated_at')
+            if row.get('quote_amount') and quoted_at and quoted_at >= cutoff:
+                yield (row['origin_port'], row['destination_port'], row.get('container_type'),
+                       _day(quoted_at), row['quote_amount'] / max(row.get('container_qty') or 1, 1))
+
+        for row in Quote._get_collection().find({'total_amount_usd': {'$gt': 0}, 'created_at': {'$gte': cutoff}}, {
+            'shipment_id': 1, 'total_amount_usd': 1, 'container_type': 1, 'container_quantity': 1, 'created_at': 1
+        }):
+            lane = lanes.get(row.get('shipment_id'))
+            if lane is None:
+                continue
+            yield (lane[0], lane[1], row.get('container_type') or lane[2], _day(row['created_at']),
+                   row['total_amount_usd'] / max(row.get('container_quantity') or 1, 1))
+
+    def train(self):
+        """Rebuild every series from Mongo and swap them in at once."""
+        start_time = time.time()
+        columns: Dict[Tuple[str, str, str], Tuple[list, list]] = {}
+        count = 0
+        for origin, destination, container_type, day, rate in self._load():
+            if rate <= 0:
+                continue
+            for container in (_norm(container_type) or ANY_CONTAINER, ANY_CONTAINER):
+                days, rates = columns.setdefault((_norm(origin), _norm(destination), container), ([], []))
+                days.append(day)
+                rates.append(rate)
+                if container == ANY_CONTAINER:
+                    break
+            count += 1
+        series = {key: RateSeries.from_arrays(np.asarray(days), np.asarray(rates))
+                  for key, (days, rates) in columns.items()}
+        with self._lock:
+            self._series = series
+            self.observations = count
+            self._trained_at = time.time()
+            self.train_ms = int((time.time() - start_time) * 1000)
+        logger.info("Rate engine trained on %s observations across %s series in %sms",
+                    count, len(series), self.train_ms)
+
+    def _train_in_background(self):
+        try:
+            self.train()
+        except Exception as e:
+            logger.warning("Rate engine training failed: %s", e)
+        finally:
+            self._training = False
+
+    def _stale(self) -> bool:
+        return self._trained_at is None or time.time() - self._trained_at >= Config.RATE_ENGINE_RETRAIN_SECONDS
+
+    def _ensure_trained(self):
+        """Start a (re)training in the background when the model is missing or stale.
+
+        Never trains on the calling request: until the first training lands, every
+        lane has no data and callers fall back to Gemini.
+        """
+        if not self._stale():
+            return
+        with self._lock:
+            if self._training or not self._stale():
+                return
+            self._training = True
+        threading.Thread(target=self._train_in_background, name='rate-engine-train', daemon=True).start()
+
+    def observe(self, origin: str, destination: str, container_type: str, moment: datetime, rate: float):
+        """Add one per-container observation, refitting only the affected series on next use."""
+        if rate <= 0 or not origin or not destination:
+            return
+        with self._lock:
+            self._add(self._series, origin, destination, container_type, _day(moment), rate)
+            self.observations += 1
+
+    def predict(self, origin: str, destination: str, container_type: str,
+                current_rate: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        self._ensure_trained()
+        today = time.time() / SECONDS_PER_DAY
+        lane = (_norm(origin), _norm(destination))
+        fit = None
+        # observe() grows the same arrays in place; fits are cached, so holding the lock is cheap
+        with self._lock:
+            for container in (_norm(container_type), ANY_CONTAINER):
+                series = self._series.get(lane + (container,))
+                fit = series.fit(today) if series is not None else None
+                if fit is not None:
+                    break
+            if fit is None:
+                self.no_data += 1
+                return None
+            self.local += 1
+
+        horizon = Config.RATE_ENGINE_HORIZON_DAYS
+        change = math.exp(fit.slope * horizon) - 1
+        anchor = current_rate if current_rate and current_rate > 0 else fit.level
+        if change > Config.RATE_ENGINE_TREND_THRESHOLD:
+            trend = "UP"
+            recommendation = f"Rates on this lane are rising about {change:.0%} over {horizon} days; book soon"
+        elif change < -Config.RATE_ENGINE_TREND_THRESHOLD:
+            trend = "DOWN"
+            recommendation = f"Rates on this lane are falling about {-change:.0%} over {horizon} days; wait if the cargo can"
+        else:
+            trend = "STABLE"
+            recommendation = "Rates on this lane are stable; book when ready"
+
+        # More (recent) data and less noise raise confidence; a lane-wide fit standing in
+        # for the requested container type is discounted
+        data_weight = fit.effective_samples / (fit.effective_samples + 10)
+        confidence = 0.3 + 0.65 * data_weight / (1 + 2 * fit.volatility)
+        if container != _norm(container_type):
+            confidence *= 0.8
+        return {
+            "predictedRateUSD": round(anchor * (1 + change), 2),
+            "trend": trend,
+            "confidenceScore": round(min(max(confidence, 0.3), 0.95), 2),
+            "recommendation": recommendation,
+            "marketRateUSD": round(fit.level, 2),
+            "sampleSize": fit.samples,
+            "source": "historical"
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            series = len(self._series)
+        return {
+            "enabled": Config.RATE_ENGINE_ENABLED,
+            "series": series,
+            "observations": self.observations,
+            "trained_at": datetime.utcfromtimestamp(self._trained_at).isoformat() if self._trained_at else None,
+            "train_ms": self.train_ms,
+            "local_predictions": self.local,
+            "no_data": self.no_data
+        }
+
+
+rate_engine = RateEngine()
+
+
+def _on_quote_saved(sender, document, created=False, **kwargs):
+    if not created or not document.total_amount_usd:
+        return
+    try:
+        lane = Shipment._get_collection().find_one(
+            {'_id': reference_id(document, 'shipment_id')},
+            {'origin_port': 1, 'destination_port': 1, 'container_type': 1}
+        )
+        if lane:
+            rate_engine.observe(lane.get('origin_port'), lane.get('destination_port'),
+                                document.container_type or lane.get('container_type'),
+                                document.created_at or datetime.utcnow(),
+                                document.total_amount_usd / max(document.container_quantity or 1, 1))
+    except Exception as e:
+        logger.warning("Rate engine could not record quote %s: %s", document.id, e)
+
+
+def _on_shipment_saved(sender, document, created=False, **kwargs):
+    # post_save runs before changed fields are cleared, so only new quote amounts count
+    if not document.quote_amount or (not created and 'quote_amount' not in document._get_changed_fields()):
+        return
+    try:
+        rate_engine.observe(document.origin_port, document.destination_port, document.container_type,
+                            document.quote_time or datetime.utcnow(),
+                            document.quote_amount / max(document.container_qty or 1, 1))
+    except Exception as e:
+        logger.warning("Rate engine could not record shipment %s: %s", document.id, e)
+
+
+def register_rate_engine_signals():
+    signals.post_save.connect(_on_quote_saved, sender=Quote)
+    signals.post_save.connect(_on_shipment_saved, sender=Shipment)
@@ -1,28 +1,126 @@
+import base64
 import os
+import random
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from app.config import Config
-from typing import Optional
+from app.utils.metrics import record_storage_request
+from typing import Any, Dict, Optional
 import uuid
 
+RETRY_STATUS_CODES = {500, 502, 503, 504}
+
+
+class StorageStats:
+    """Per-operation call, retry, byte and latency counters for storage traffic."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations: Dict[str, Dict[str, int]] = {}
+
+    def record(self, operation: str, elapsed_ms: int, bytes_sent: int = 0, retries: int = 0, ok: bool = True):
+        record_storage_request(operation, elapsed_ms / 1000, bytes_sent, ok)
+        with self._lock:
+            counters = self._operations.setdefault(operation, {
+                'calls': 0, 'errors': 0, 'retries': 0, 'bytes': 0, 'total_ms': 0, 'max_ms': 0
+            })
+            counters['calls'] += 1
+            counters['errors'] += 0 if ok else 1
+            counters['retries'] += retries
+            counters['bytes'] += bytes_sent
+            counters['total_ms'] += elapsed_ms
+            counters['max_ms'] = max(counters['max_ms'], elapsed_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                operation: dict(counters, avg_ms=round(counters['total_ms'] / counters['calls'], 1))
+                for operation, counters in self._operations.items()
+            }
+
+
+storage_stats = StorageStats()
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process-wide pooled session so uploads reuse TCP/TLS connections to Supabase."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=Config.STORAGE_POOL_CONNECTIONS,
+                                      pool_maxsize=Config.STORAGE_POOL_MAXSIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
 
 class StorageService:
     def __init__(self):
         self.supabase_url = Config.SUPABASE_URL
         self.service_role_key = Config.SUPABASE_SERVICE_ROLE_KEY
         self.bucket = Config.STORAGE_BUCKET
+        self.session = get_session()
+        self.timeout = (Config.STORAGE_CONNECT_TIMEOUT_SECONDS, Config.STORAGE_READ_TIMEOUT_SECONDS)
+        self.max_retries = Config.STORAGE_MAX_RETRIES
+        self.backoff_seconds = Config.STORAGE_BACKOFF_SECONDS
+    
+    def _request(self, operation: str, method: str, url: str, body_file=None, bytes_sent: int = 0,
+                 retry_headers: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+        """Send a request, retrying 5xx and connection errors with full-jitter backoff.
+        
+        ``body_file`` is rewound before every attempt so file uploads stream from
+        disk instead of being loaded into memory. ``retry_headers`` are added from
+        the first retry on, e.g. so a write that may already have landed is replaced.
+        """
+        start_time = time.time()
+        retries = 0
+        while True:
+            try:
+                if retries and retry_headers:
+                    kwargs['headers'] = dict(kwargs.get('headers') or {}, **retry_headers)
+                if body_file is not None:
+                    body_file.seek(0)
+                    kwargs['data'] = body_file
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                if response.status_code not in RETRY_STATUS_CODES or retries >= self.max_retries:
+                    storage_stats.record(operation, int((time.time() - start_time) * 1000),
+                                         bytes_sent, retries, ok=response.status_code < 400)
+                    return response
+            except (requests.ConnectionError, requests.Timeout):
+                if retries >= self.max_retries:
+                    storage_stats.record(operation, int((time.time() - start_time) * 1000), 0, retries, ok=False)
+                    raise
+            retries += 1
+            time.sleep(random.uniform(0, self.backoff_seconds * (2 ** (retries - 1))))
     
-    def upload_file(self, file_path: str, destination_path: str) -> Optional[str]:
+    def upload_file(self, file_path: str, destination_path: str, content_type: str = "application/octet-stream") -> Optional[str]:
         try:
-            url = f"{self.supabase_url}/storage/v1/object/{self.bucket}/{destination_path}"
-            headers = {
-                "Authorization": f"Bearer {self.service_role_key}",
-                "Content-Type": "application/octet-stream"
-            }
-            
-            with open(file_path, 'rb') as f:
-                response = requests.put(url, data=f, headers=headers)
+            file_size = os.path.getsize(file_path)
+            if file_size > Config.STORAGE_RESUMABLE_THRESHOLD_BYTES:
+                uploaded = self._upload_resumable(file_path, destination_path, file_size, content_type)
+            else:
+                url = f"{self.supabase_url}/storage/v1/object/{self.bucket}/{destination_path}"
+                headers = {
+                    "Authorization": f"Bearer {self.service_role_key}",
+                    "Content-Type": content_type
+                }
+                
+                # A 5xx or dropped connection may come after the object was stored; without
+                # x-upsert the retry would then fail with 409 Duplicate
+                with open(file_path, 'rb') as f:
+                    response = self._request('upload', 'PUT', url, body_file=f, bytes_sent=file_size, headers=headers,
+                                             retry_headers={"x-upsert": "true"})
+                uploaded = response.status_code in [200, 201]
             
-            if response.status_code in [200, 201]:
+            if uploaded:
                 public_url = f"{self.supabase_url}/storage/v1/object/public/{self.bucket}/{destination_path}"
                 return public_url
             else:
@@ -31,13 +129,65 @@ class StorageService:
             print(f"Storage upload error: {str(e)}")
             return None
     
+    def _upload_resumable(self, file_path: str, destination_path: str, file_size: int, content_type: str) -> bool:
+        """Upload through Supabase's TUS endpoint in fixed-size chunks.
+        
+        A failed chunk resumes from the offset the server reports instead of
+        resending the whole file.
+        """
+        def encode(value: str) -> str:
+            return base64.b64encode(value.encode('utf-8')).decode('ascii')
+        
+        headers = {
+            "Authorization": f"Bearer {self.service_role_key}",
+            "Tus-Resumable": "1.0.0"
+        }
+        response = self._request('upload_create', 'POST', f"{self.supabase_url}/storage/v1/upload/resumable", headers=dict(headers, **{
+            "Upload-Length": str(file_size),
+            "Upload-Metadata": ",".join([
+                f"bucketName {encode(self.bucket)}",
+                f"objectName {encode(destination_path)}",
+                f"contentType {encode(content_type)}"
+            ]),
+            "x-upsert": "true"
+        }))
+        if response.status_code != 201 or not response.headers.get('Location'):
+            return False
+        upload_url = response.headers['Location']
+        
+        chunk_size = Config.STORAGE_CHUNK_SIZE_BYTES
+        offset = 0
+        failures = 0
+        with open(file_path, 'rb') as f:
+            while offset < file_size:
+                f.seek(offset)
+                chunk = f.read(chunk_size)
+                response = self._request('upload_chunk', 'PATCH', upload_url, data=chunk, bytes_sent=len(chunk), headers=dict(headers, **{
+                    "Upload-Offset": str(offset),
+                    "Content-Type": "application/offset+octet-stream"
+                }))
+                if response.status_code == 204:
+                    offset = int(response.headers.get('Upload-Offset', offset + len(chunk)))
+                    failures = 0
+                    continue
+                
+                failures += 1
+                if failures > self.max_retries:
+                    return False
+                # Ask the server how much it actually kept and resume from there
+                head = self._request('upload_offset', 'HEAD', upload_url, headers=headers)
+                if head.status_code not in [200, 204] or 'Upload-Offset' not in head.headers:
+                    return False
+                offset = int(head.headers['Upload-Offset'])
+        return True
+    
     def delete_file(self, file_path: str) -> bool:
         try:
             url = f"{self.supabase_url}/storage/v1/object/{self.bucket}/{file_path}"
             headers = {
                 "Authorization": f"Bearer {self.service_role_key}"
             }
-            response = requests.delete(url, headers=headers)
+            response = self._request('delete', 'DELETE', url, headers=headers)
             return response.status_code in [200, 204]
         except Exception:
             return False
@@ -49,7 +199,7 @@ class StorageService:
                 "Authorization": f"Bearer {self.service_role_key}"
             }
             params = {"expires_in": expires_in}
-            response = requests.get(url, headers=headers, params=params)
+            response = self._request('sign', 'GET', url, headers=headers, params=params)
             if response.status_code == 200:
                 data = response.json()
                 signed_path = data.get('signedURL', '').split('/')[-1]
@@ -61,4 +211,3 @@ class StorageService:
     def generate_document_path(self, shipment_id: str, filename: str) -> str:
         unique_filename = f"{uuid.uuid4()}_{filename}"
         return f"shipments/{shipment_id}/documents/{unique_filename}"
-
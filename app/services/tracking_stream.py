@@ -0,0 +1,155 @@
+import json
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class Subscription:
+    def __init__(self, shipment_id: str, max_queue: int):
+        self.shipment_id = shipment_id
+        self.queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def get(self, timeout: float) -> Dict[str, Any]:
+        return self.queue.get(timeout=timeout)
+
+
+class TrackingEventBus:
+    """In-process fan-out of tracking events to live stream subscribers.
+
+    Publishing never blocks: a subscriber whose queue is full loses the
+    message and is expected to resume with ``Last-Event-ID`` on reconnect.
+    """
+
+    def __init__(self, max_subscribers: int = 500, max_queue: int = 100):
+        self.max_subscribers = max_subscribers
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._count = 0
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, shipment_id: str) -> Subscription:
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise TooManySubscribers("Too many live tracking connections on this worker")
+            subscription = Subscription(shipment_id, self.max_queue)
+            self._subscribers[shipment_id].add(subscription)
+            self._count += 1
+            return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.shipment_id)
+            if subscribers and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._count -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.shipment_id]
+
+    def publish(self, shipment_id: str, event_type: str, data: Dict[str, Any], event_id: Optional[str] = None):
+        message = {'event': event_type, 'data': data, 'id': event_id}
+        with self._lock:
+            subscribers = list(self._subscribers.get(shipment_id, ()))
+            self.published += 1
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                subscription.dropped += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "subscribers": self._count,
+                "max_subscribers": self.max_subscribers,
+                "shipments": len(self._subscribers),
+                "published": self.published
+            }
+
+
+tracking_bus = TrackingEventBus(
+    max_subscribers=Config.TRACKING_STREAM_MAX_CONNECTIONS,
+    max_queue=Config.TRACKING_STREAM_QUEUE_SIZE
+)
+
+
+def format_sse(event_type: str, data: Dict[str, Any], event_id: Optional[str] = None) -> str:
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def publish_tracking_event(event_dict: Dict[str, Any]):
+    """Announce a stored tracking event. With change streams on, Mongo does this instead."""
+    if Config.TRACKING_CHANGE_STREAM_ENABLED:
+        return
+    tracking_bus.publish(event_dict['shipment_id'], 'tracking_event', event_dict, event_dict['id'])
+
+
+def publish_status_change(shipment_id: str, status: str):
+    if Config.TRACKING_CHANGE_STREAM_ENABLED:
+        return
+    tracking_bus.publish(shipment_id, 'status', {'shipment_id': shipment_id, 'status': status})
+
+
+def _watch(collection, pipeline, handle, stop: threading.Event):
+    resume_token = None
+    while not stop.is_set():
+        try:
+            with collection.watch(pipeline, full_document='updateLookup', resume_after=resume_token) as stream:
+                for change in stream:
+                    resume_token = stream.resume_token
+                    handle(change)
+                    if stop.is_set():
+                        return
+        except Exception:
+            logger.exception("Tracking change stream on %s failed, reconnecting", collection.name)
+            time.sleep(5)
+
+
+def start_change_stream_source() -> threading.Event:
+    """Feed ``tracking_bus`` from Mongo change streams so every process sees every write.
+
+    Requires a replica set (Atlas always is one).
+    """
+    from app.models.shipment import Shipment
+    from app.models.tracking_event import TrackingEvent
+
+    stop = threading.Event()
+
+    def on_event(change):
+        event = TrackingEvent._from_son(change['fullDocument'])
+        event_dict = event.to_dict()
+        tracking_bus.publish(event_dict['shipment_id'], 'tracking_event', event_dict, event_dict['id'])
+
+    def on_status(change):
+        shipment_id = str(change['documentKey']['_id'])
+        status = change['updateDescription']['updatedFields']['status']
+        tracking_bus.publish(shipment_id, 'status', {'shipment_id': shipment_id, 'status': status})
+
+    sources = [
+        (TrackingEvent._get_collection(), [{'$match': {'operationType': 'insert'}}], on_event),
+        (Shipment._get_collection(), [{'$match': {
+            'operationType': 'update',
+            'updateDescription.updatedFields.status': {'$exists': True}
+        }}], on_status)
+    ]
+    for collection, pipeline, handle in sources:
+        threading.Thread(target=_watch, args=(collection, pipeline, handle, stop),
+                         name=f"change-stream-{collection.name}", daemon=True).start()
+    return stop
@@ -1,6 +1,10 @@
 import bcrypt
 from flask_jwt_extended import create_access_token, get_jwt_identity, get_jwt
 from app.models.user import User
+from app.models.driver import Driver
+from app.utils.identity_cache import resolve_identity, register_invalidation
+
+register_invalidation(User, Driver)
 
 
 def hash_password(password: str) -> str:
@@ -34,7 +38,7 @@ def create_token(user: User) -> dict:
 
 def get_current_user():
     email = get_jwt_identity()
-    return User.objects(email=email).first()
+    return resolve_identity(User, 'User', email=email)
 
 
 def require_role(*roles):
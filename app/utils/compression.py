@@ -0,0 +1,169 @@
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator
+
+from flask import request
+
+from app.config import Config
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional, gzip always works
+    brotli = None
+
+
+class CompressionStats:
+    """Per-encoding response counts, byte totals and compression time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._encodings: Dict[str, Dict[str, int]] = {}
+        self.skipped_small = 0
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, elapsed_ms: float, streamed: bool = False):
+        with self._lock:
+            counters = self._encodings.setdefault(encoding, {
+                'responses': 0, 'streamed': 0, 'bytes_in': 0, 'bytes_out': 0, 'total_ms': 0.0
+            })
+            counters['responses'] += 1
+            counters['streamed'] += 1 if streamed else 0
+            counters['bytes_in'] += bytes_in
+            counters['bytes_out'] += bytes_out
+            counters['total_ms'] += elapsed_ms
+
+    def skip_small(self):
+        with self._lock:
+            self.skipped_small += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            encodings = {
+                encoding: dict(
+                    counters,
+                    total_ms=round(counters['total_ms'], 1),
+                    ratio=round(counters['bytes_out'] / counters['bytes_in'], 3) if counters['bytes_in'] else None,
+                    avg_ms=round(counters['total_ms'] / counters['responses'], 2)
+                )
+                for encoding, counters in self._encodings.items()
+            }
+            return {'encodings': encodings, 'skipped_small': self.skipped_small}
+
+
+compression_stats = CompressionStats()
+
+
+class _Encoder:
+    """Incremental gzip/brotli encoder with a per-chunk flush for streams."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=min(Config.COMPRESSION_BROTLI_QUALITY, 11))
+        else:
+            # wbits=31 writes a gzip header and trailer
+            self._compressor = zlib.compressobj(min(Config.COMPRESSION_GZIP_LEVEL, 9), zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == 'br':
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == 'br':
+            return self._compressor.flush()
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def negotiate_encoding() -> str:
+    """Best encoding the client accepts, honouring q-values; brotli wins ties."""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+
+def _is_compressible(response) -> bool:
+    return (
+        200 <= response.status_code < 300
+        and response.status_code != 204
+        and 'Content-Encoding' not in response.headers
+        and response.mimetype in Config.COMPRESSION_MIMETYPES
+    )
+
+
+def _stream(chunks: Iterable[bytes], encoder: _Encoder) -> Iterator[bytes]:
+    bytes_in = bytes_out = 0
+    elapsed = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            start_time = time.perf_counter()
+            # Flushing every chunk keeps server-sent events arriving as they happen
+            out = encoder.compress(chunk) + encoder.flush()
+            elapsed += time.perf_counter() - start_time
+            bytes_in += len(chunk)
+            bytes_out += len(out)
+            yield out
+        tail = encoder.finish()
+        bytes_out += len(tail)
+        yield tail
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+        compression_stats.record(encoder.encoding, bytes_in, bytes_out, elapsed * 1000, streamed=True)
+
+
+def _weaken_etag(response):
+    # The encoded bytes differ from the identity ones, so a strong validator
+    # would be wrong; weak ETags still match If-None-Match
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        response.headers['ETag'] = f"W/{etag}"
+
+
+def compress_response(response):
+    if response.status_code == 304:
+        # There is no body to tell whether the 200 would have been compressed, so
+        # repeat the validator in the form the client holds: weak only if it was
+        etag, weak = response.get_etag()
+        if etag and negotiate_encoding():
+            response.vary.add('Accept-Encoding')
+            if not weak and request.if_none_match.is_weak(etag):
+                _weaken_etag(response)
+        return response
+    if not _is_compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    encoding = negotiate_encoding()
+    if not encoding:
+        return response
+
+    if response.is_streamed:
+        response.response = _stream(response.response, _Encoder(encoding))
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < Config.COMPRESSION_MIN_SIZE:
+            compression_stats.skip_small()
+            return response
+        start_time = time.perf_counter()
+        encoder = _Encoder(encoding)
+        compressed = encoder.compress(data) + encoder.finish()
+        compression_stats.record(encoding, len(data), len(compressed), (time.perf_counter() - start_time) * 1000)
+        response.set_data(compressed)
+
+    response.headers['Content-Encoding'] = encoding
+    _weaken_etag(response)
+    return response
+
+
+def init_compression(app):
+    if Config.COMPRESSION_ENABLED:
+        app.after_request(compress_response)
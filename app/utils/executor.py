@@ -0,0 +1,27 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+from app.config import Config
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Bounded, process-wide pool for blocking network calls made inside a request."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=Config.IO_EXECUTOR_MAX_WORKERS,
+                                               thread_name_prefix='io')
+    return _executor
+
+
+def timed(fn: Callable, *args, **kwargs) -> Tuple[Any, int]:
+    """Run ``fn`` and return ``(result, elapsed_ms)``."""
+    start_time = time.time()
+    result = fn(*args, **kwargs)
+    return result, int((time.time() - start_time) * 1000)
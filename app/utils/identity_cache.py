@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from mongoengine import signals
+
+from app.config import Config
+
+
+class IdentityCache:
+    """Bounded, process-wide TTL/LRU cache of resolved identities.
+
+    Entries hold the raw SON of the document rather than the document itself,
+    so every request gets its own instance and can never mutate another
+    request's copy.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 60.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, son = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return son
+
+    def set(self, key: Tuple[str, str], son: Any):
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, son)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, kind: str, document_id: Any):
+        """Drop every entry of ``kind`` that resolves to ``document_id``."""
+        with self._lock:
+            stale = [key for key, (_, son) in self._entries.items()
+                     if key[0] == kind and son.get('_id') == document_id]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+identity_cache = IdentityCache(
+    max_size=Config.IDENTITY_CACHE_MAX_SIZE,
+    ttl_seconds=Config.IDENTITY_CACHE_TTL_SECONDS
+)
+
+
+def resolve_identity(model, kind: str, **lookup):
+    """Resolve a single document through the request memo and identity cache.
+
+    ``lookup`` must contain exactly one field; it doubles as the cache key so a
+    driver looked up by id and a user looked up by email never collide.
+    """
+    from flask import g, has_request_context
+
+    (field, value), = lookup.items()
+    if value is None:
+        return None
+    key = (kind, f"{field}:{value}")
+
+    memo = g.setdefault('_identity_memo', {}) if has_request_context() else None
+    if memo is not None and key in memo:
+        return memo[key]
+
+    son = identity_cache.get(key)
+    if son is not None:
+        document = model._from_son(son)
+    else:
+        document = model.objects(**lookup).first()
+        if document:
+            identity_cache.set(key, document.to_mongo().to_dict())
+
+    if memo is not None:
+        memo[key] = document
+    return document
+
+
+def _invalidate_on_change(sender, document, **kwargs):
+    identity_cache.invalidate(sender.__name__, document.pk)
+
+
+def register_invalidation(*models):
+    for model in models:
+        signals.post_save.connect(_invalidate_on_change, sender=model)
+        signals.post_delete.connect(_invalidate_on_change, sender=model)
@@ -0,0 +1,391 @@
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import g, request
+from pymongo import monitoring
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        # Only taken the first time a label combination is seen
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            lines.extend(self._expose_child(key, child))
+        return lines
+
+    def _expose_child(self, key, child) -> Iterable[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class _Value:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _Value()
+
+
+class _HistogramValue:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def _expose_child(self, key, child) -> Iterable[str]:
+        with child._lock:
+            counts = list(child.counts)
+            total, count = child.sum, child.count
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames, key, (('le', _format_value(bound)),))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Run ``collector`` on every scrape, e.g. to refresh a gauge from the database."""
+        self._collectors.append(collector)
+
+    def expose(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                # A failing collector leaves its gauges stale; the scrape still succeeds
+                name = getattr(collector, '__name__', repr(collector))
+                logger.exception("Metrics collector %s failed", name)
+                metrics_collector_errors.labels(name).inc()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    'http_requests_total', 'HTTP requests by blueprint, route, method and status.',
+    ('blueprint', 'route', 'method', 'status')
+)
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency until the response is built.',
+    ('blueprint', 'route', 'method')
+)
+http_requests_in_flight = registry.gauge(
+    'http_requests_in_flight', 'Requests currently being handled, by blueprint.', ('blueprint',)
+)
+mongo_commands = registry.counter(
+    'mongo_commands_total', 'MongoDB commands by collection, command and outcome.',
+    ('collection', 'command', 'outcome')
+)
+mongo_command_duration = registry.histogram(
+    'mongo_command_duration_seconds', 'MongoDB command latency.', ('collection', 'command'),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+ai_calls = registry.counter(
+    'ai_calls_total', 'Gemini calls by AIService method and outcome (ok, error, timeout, rejected).',
+    ('method', 'outcome')
+)
+ai_call_duration = registry.histogram(
+    'ai_call_duration_seconds', 'Gemini call latency by AIService method.', ('method',),
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+)
+storage_requests = registry.counter(
+    'storage_requests_total', 'Supabase storage requests by operation and outcome.', ('operation', 'outcome')
+)
+storage_bytes = registry.counter(
+    'storage_bytes_sent_total', 'Bytes sent to Supabase storage by operation.', ('operation',)
+)
+storage_request_duration = registry.histogram(
+    'storage_request_duration_seconds', 'Supabase storage latency including retries.', ('operation',)
+)
+extraction_jobs = registry.gauge(
+    'extraction_jobs', 'ExtractionJob documents by status.', ('status',)
+)
+compression_bytes = registry.counter(
+    'http_compression_bytes_total', 'Response bytes before (in) and after (out) compression.', ('encoding', 'direction')
+)
+compression_seconds = registry.counter(
+    'http_compression_seconds_total', 'Time spent compressing responses.', ('encoding',)
+)
+tracking_stream_subscribers = registry.gauge(
+    'tracking_stream_subscribers', 'Open live tracking streams on this process.'
+)
+ai_prediction_cache = registry.counter(
+    'ai_prediction_cache_total', 'Rate/customs prediction lookups by result (hit, miss, coalesced).',
+    ('cache', 'result')
+)
+ai_circuit_open = registry.gauge(
+    'ai_circuit_open', '1 while the Gemini circuit breaker is rejecting calls, else 0.'
+)
+rate_engine_predictions = registry.counter(
+    'rate_engine_predictions_total', 'Rate predictions by the local model (local) or passed on for lack of data (no_data).',
+    ('result',)
+)
+document_classifications = registry.counter(
+    'document_classifier_total', 'Local document-type classifications: answered (local), left to Gemini (ambiguous, no_text).',
+    ('result',)
+)
+customs_engine_predictions = registry.counter(
+    'customs_engine_predictions_total', 'Customs-delay predictions by the local model: single (local), passed on (no_data), batch rows (batch).',
+    ('result',)
+)
+metrics_collector_errors = registry.counter(
+    'metrics_collector_errors_total', 'Scrape-time collectors that raised, by collector.', ('collector',)
+)
+
+
+def _route_labels() -> Tuple[str, str]:
+    # The rule template, not the concrete path, keeps label cardinality bounded
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    return request.blueprint or 'app', route
+
+
+def _before_request():
+    blueprint, _ = _route_labels()
+    g.metrics_started = time.perf_counter()
+    g.metrics_blueprint = blueprint
+    http_requests_in_flight.labels(blueprint).inc()
+
+
+def _after_request(response):
+    if 'metrics_started' in g:
+        blueprint, route = _route_labels()
+        http_request_duration.labels(blueprint, route, request.method).observe(time.perf_counter() - g.metrics_started)
+        http_requests.labels(blueprint, route, request.method, response.status_code).inc()
+    return response
+
+
+def _teardown_request(_exc):
+    # Runs even when a view raised, so the gauge never drifts upwards
+    blueprint = g.pop('metrics_blueprint', None)
+    if blueprint is not None:
+        http_requests_in_flight.labels(blueprint).dec()
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Command counts and latency per collection, fed by pymongo's monitoring hooks."""
+
+    def __init__(self):
+        # request_id -> collection; plain dict operations are atomic under the GIL
+        self._pending: Dict[int, str] = {}
+
+    def started(self, event):
+        # getMore names its collection separately; the command value is the cursor id
+        value = event.command.get('collection') if event.command_name == 'getMore' else event.command.get(event.command_name)
+        self._pending[event.request_id] = value if isinstance(value, str) else '-'
+
+    def _finish(self, event, outcome: str):
+        collection = self._pending.pop(event.request_id, '-')
+        mongo_commands.labels(collection, event.command_name, outcome).inc()
+        mongo_command_duration.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._finish(event, 'ok')
+
+    def failed(self, event):
+        self._finish(event, 'error')
+
+
+def record_ai_call(method: str, elapsed_seconds: float, error: Optional[BaseException] = None):
+    # ai_client imports this module, so its exceptions are looked up on use
+    from app.services.ai_client import AITimeoutError, CircuitOpenError
+
+    if error is None:
+        outcome = 'ok'
+    elif isinstance(error, CircuitOpenError):
+        # Failed fast by the breaker; Gemini was never called
+        outcome = 'rejected'
+    elif isinstance(error, AITimeoutError):
+        outcome = 'timeout'
+    else:
+        outcome = 'error'
+    ai_calls.labels(method, outcome).inc()
+    ai_call_duration.labels(method).observe(elapsed_seconds)
+
+
+def record_storage_request(operation: str, elapsed_seconds: float, bytes_sent: int, ok: bool):
+    storage_requests.labels(operation, 'ok' if ok else 'error').inc()
+    storage_bytes.labels(operation).inc(bytes_sent)
+    storage_request_duration.labels(operation).observe(elapsed_seconds)
+
+
+def _collect_extraction_jobs():
+    from app.models.document import ExtractionJob
+
+    # One count per status, each answered from the status index rather than a collection scan
+    collection = ExtractionJob._get_collection()
+    for status in ExtractionJob._fields['status'].choices:
+        extraction_jobs.labels(status).set(collection.count_documents({'status': status}))
+
+
+def _collect_process_stats():
+    # Mirrors the in-process counters already shown on /health
+    from app.services.ai_client import ai_client
+    from app.services.customs_engine import customs_engine
+    from app.services.document_classifier import document_classifier
+    from app.services.prediction_cache import customs_prediction_cache, rate_prediction_cache
+    from app.services.rate_engine import rate_engine
+    from app.services.tracking_stream import tracking_bus
+    from app.utils.compression import compression_stats
+
+    for encoding, counters in compression_stats.stats()['encodings'].items():
+        compression_bytes.labels(encoding, 'in').set(counters['bytes_in'])
+        compression_bytes.labels(encoding, 'out').set(counters['bytes_out'])
+        compression_seconds.labels(encoding).set(counters['total_ms'] / 1000)
+    tracking_stream_subscribers.labels().set(tracking_bus.stats()['subscribers'])
+    ai_circuit_open.labels().set(1 if ai_client.breaker.state == 'open' else 0)
+    for cache in (rate_prediction_cache, customs_prediction_cache):
+        counters = cache.stats()
+        for result, field in (('hit', 'hits'), ('miss', 'misses'), ('coalesced', 'coalesced')):
+            ai_prediction_cache.labels(cache.name, result).set(counters[field])
+    rate_engine_predictions.labels('local').set(rate_engine.local)
+    rate_engine_predictions.labels('no_data').set(rate_engine.no_data)
+    customs_engine_predictions.labels('local').set(customs_engine.local)
+    customs_engine_predictions.labels('no_data').set(customs_engine.no_data)
+    customs_engine_predictions.labels('batch').set(customs_engine.batch_rows)
+    for result, field in (('local', 'classified'), ('ambiguous', 'ambiguous'), ('no_text', 'no_text')):
+        document_classifications.labels(result).set(getattr(document_classifier, field))
+
+
+_mongo_listener: Optional[MongoCommandListener] = None
+
+
+def register_mongo_listener():
+    """Must run before the first MongoClient is created; pymongo only reads listeners then."""
+    global _mongo_listener
+    if _mongo_listener is None:
+        _mongo_listener = MongoCommandListener()
+        monitoring.register(_mongo_listener)
+
+
+def init_metrics(app):
+    if not Config.METRICS_ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    if not registry._collectors:
+        registry.add_collector(_collect_extraction_jobs)
+        registry.add_collector(_collect_process_stats)
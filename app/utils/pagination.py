@@ -0,0 +1,66 @@
+import base64
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from mongoengine import Q
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def parse_limit(value, default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE) -> int:
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    return min(limit, maximum)
+
+
+def encode_cursor(timestamp: datetime, document_id) -> str:
+    raw = f"{timestamp.isoformat()}|{document_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, ObjectId]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        timestamp, document_id = raw.split('|', 1)
+        return datetime.fromisoformat(timestamp), ObjectId(document_id)
+    except (ValueError, InvalidId, UnicodeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def keyset_before(field: str, cursor: str) -> Q:
+    """Filter for rows strictly after ``cursor`` in ``(-field, -_id)`` order."""
+    timestamp, document_id = decode_cursor(cursor)
+    return Q(**{f"{field}__lt": timestamp}) | (Q(**{field: timestamp}) & Q(id__lt=document_id))
+
+
+def keyset_page(queryset, field: str, limit: int, after: str = None):
+    """Return ``(documents, next_cursor)`` for a newest-first keyset page.
+
+    One extra row is fetched to decide whether another page exists, so callers
+    never need a count query. Works on ``as_pymongo()`` querysets as well.
+    """
+    if after:
+        queryset = queryset.filter(keyset_before(field, after))
+    documents = list(queryset.order_by(f"-{field}", '-id').limit(limit + 1))
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        if isinstance(last, dict):
+            next_cursor = encode_cursor(last[field], last['_id'])
+        else:
+            next_cursor = encode_cursor(getattr(last, field), last.id)
+    return documents, next_cursor
@@ -0,0 +1,128 @@
+import re
+import zlib
+
+# An object's dictionary followed by its stream; the dictionary tells us the filters.
+# The dictionary may not cross an endobj, so a stream-less object (a page, a font
+# descriptor) is never read as part of the next object's dictionary
+_STREAM = re.compile(rb'\d+\s+\d+\s+obj\s*<<((?:(?!endobj).)*?)>>\s*stream\r?\n(.*?)\r?\n?endstream', re.S)
+# Content-stream tokens: literal strings (one level of nested parens), hex strings,
+# array brackets, numbers and the text operators
+_TOKEN = re.compile(
+    rb'\((?:\\.|[^\\()]|\((?:\\.|[^\\()])*\))*\)'
+    rb'|<[0-9A-Fa-f\s]*>'
+    rb'|\[|\]'
+    rb'|-?\d*\.?\d+'
+    rb"|T\*|\bT[jJdDm]\b|\bET\b|'|\"",
+    re.S
+)
+_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f',
+            b'(': b'(', b')': b')', b'\\': b'\\'}
+# Images, cross-reference and object streams, and embedded font programs (/Length1-3,
+# or a FontFile3 subtype). Whole names only: /ImageB in a ProcSet is not an image
+_SKIPPED_STREAM = re.compile(
+    rb'(?:/Subtype\s*/(?:Image|Type1C|CIDFontType0C|OpenType)|/Type\s*/(?:XRef|ObjStm)'
+    rb'|/(?:DCTDecode|JPXDecode|CCITTFaxDecode|FontFile\d?|Length[123]))'
+    rb'(?![^\s()<>\[\]{}/%])'
+)
+# Kerning inside a TJ array wider than this (thousandths of an em) is a word gap
+_WORD_GAP = 200
+# Content-stream bytes read per character of text wanted; operators and positioning
+# outweigh the strings they show, but a decompression bomb cannot inflate past this
+_STREAM_BYTES_PER_CHAR = 32
+
+
+def _unescape(literal: bytes) -> bytes:
+    out = bytearray()
+    i = 0
+    while i < len(literal):
+        char = literal[i:i + 1]
+        if char != b'\\':
+            out += char
+            i += 1
+            continue
+        following = literal[i + 1:i + 2]
+        if following in _ESCAPES:
+            out += _ESCAPES[following]
+            i += 2
+        elif following in b'01234567':
+            digits = re.match(rb'[0-7]{1,3}', literal[i + 1:i + 4]).group()
+            out.append(int(digits, 8) & 0xFF)
+            i += 1 + len(digits)
+        else:
+            # Line continuation, or an unknown escape whose backslash is dropped
+            i += 2 if following in (b'\n', b'\r') else 1
+    return bytes(out)
+
+
+def _decode_string(token: bytes) -> str:
+    if token.startswith(b'<'):
+        hex_digits = re.sub(rb'\s', b'', token[1:-1])
+        raw = bytes.fromhex((hex_digits + b'0' * (len(hex_digits) % 2)).decode())
+    else:
+        raw = _unescape(token[1:-1])
+    if raw.startswith(b'\xfe\xff'):
+        return raw[2:].decode('utf-16-be', 'ignore')
+    return raw.decode('latin-1')
+
+
+def _content_text(content: bytes) -> str:
+    parts = []
+    pending = []
+    in_array = False
+    for match in _TOKEN.finditer(content):
+        token = match.group()
+        if token[:1] in (b'(', b'<'):
+            pending.append(_decode_string(token))
+        elif token == b'[':
+            in_array = True
+        elif token == b']':
+            in_array = False
+        elif token[:1].isdigit() or token[:1] in (b'-', b'.'):
+            if in_array and float(token) < -_WORD_GAP and pending:
+                pending.append(' ')
+        elif token in (b'Tj', b'TJ', b"'", b'"'):
+            parts.append(''.join(pending))
+            pending = []
+            if token in (b"'", b'"'):
+                parts.append('\n')
+        else:
+            # Td, TD, T*, Tm and ET move to a new line or block
+            pending = []
+            parts.append('\n')
+    return ''.join(parts)
+
+
+def extract_pdf_text(data: bytes, max_chars: int = 20000) -> str:
+    """Best-effort text layer of a PDF, using only the standard library.
+
+    Reads every Flate-compressed or plain content stream and collects the
+    strings shown by the text operators. Fonts with custom encodings or CID
+    glyphs come out as noise and scanned pages as nothing; callers treat
+    little or no usable text as "unknown". Stops after ``max_chars``, or once
+    ``max_chars * _STREAM_BYTES_PER_CHAR`` stream bytes have been read; no
+    stream is inflated past what is left of that budget.
+    """
+    text = []
+    size = 0
+    budget = max_chars * _STREAM_BYTES_PER_CHAR
+    for match in _STREAM.finditer(data):
+        dictionary, stream = match.groups()
+        if _SKIPPED_STREAM.search(dictionary):
+            continue
+        if b'/FlateDecode' in dictionary:
+            try:
+                stream = zlib.decompressobj().decompress(stream, budget)
+            except zlib.error:
+                continue
+        elif b'/Filter' in dictionary:
+            continue
+        else:
+            stream = stream[:budget]
+        budget -= len(stream)
+        if b'T' in stream:
+            chunk = _content_text(stream)
+            text.append(chunk)
+            size += len(chunk)
+        if size >= max_chars or budget <= 0:
+            break
+    return ''.join(text)[:max_chars]
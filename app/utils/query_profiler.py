@@ -0,0 +1,167 @@
+import json
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from flask import g
+from pymongo import monitoring
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Commands that are driver housekeeping rather than application queries
+IGNORED_COMMANDS = {'hello', 'ismaster', 'isMaster', 'ping', 'endSessions', 'saslStart', 'saslContinue', 'buildInfo'}
+
+_active: ContextVar[Tuple["QueryCollector", ...]] = ContextVar('query_collectors', default=())
+
+
+def _shape(value: Any) -> Any:
+    """Replace every literal with ``?`` so queries differing only in values compare equal."""
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in sorted(value.items())}
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        return [_shape(value[0])]
+    return '?'
+
+
+def query_shape(command_name: str, command: Dict[str, Any]) -> str:
+    if command_name == 'getMore':
+        return f"getMore {command.get('collection')}"
+    collection = command.get(command_name)
+    if command_name == 'aggregate':
+        criteria = [_shape(stage) if '$match' in stage else next(iter(stage), None)
+                    for stage in command.get('pipeline', [])]
+    elif command_name in ('update', 'delete'):
+        statements = command.get('updates') or command.get('deletes') or [{}]
+        criteria = _shape(statements[0].get('q', {}))
+    elif command_name in ('count', 'findAndModify'):
+        criteria = _shape(command.get('query', {}))
+    else:
+        criteria = _shape(command.get('filter', {}))
+    return f"{command_name} {collection} {json.dumps(criteria, sort_keys=True, default=str)}"
+
+
+class QueryCollector:
+    """Query count, DB time and repeated shapes for one request (or one test block)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: Counter = Counter()
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        return {shape: count for shape, count in self.shapes.most_common() if count >= threshold}
+
+    def report(self) -> str:
+        lines = [f"{self.count} queries, {self.total_ms:.1f}ms"]
+        lines.extend(f"  {count}x {shape}" for shape, count in self.shapes.most_common())
+        return '\n'.join(lines)
+
+
+class ProfilerListener(monitoring.CommandListener):
+    """Attribute each command to the collectors active in the calling context.
+
+    pymongo publishes events synchronously on the thread running the command,
+    so the context variable set for the request is visible here.
+    """
+
+    def started(self, event):
+        collectors = _active.get()
+        if not collectors or event.command_name in IGNORED_COMMANDS:
+            return
+        shape = query_shape(event.command_name, event.command)
+        for collector in collectors:
+            collector.count += 1
+            collector.shapes[shape] += 1
+
+    def _finish(self, event):
+        collectors = _active.get()
+        if not collectors or event.command_name in IGNORED_COMMANDS:
+            return
+        for collector in collectors:
+            collector.total_ms += event.duration_micros / 1000
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+
+_listener: Optional[ProfilerListener] = None
+
+
+def register_profiler_listener():
+    """Must run before the first MongoClient is created; pymongo only reads listeners then."""
+    global _listener
+    if _listener is None:
+        _listener = ProfilerListener()
+        monitoring.register(_listener)
+
+
+@contextmanager
+def collect_queries() -> Iterator[QueryCollector]:
+    collector = QueryCollector()
+    token = _active.set(_active.get() + (collector,))
+    try:
+        yield collector
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryCollector]:
+    """Fail when the block issues more than ``limit`` Mongo commands.
+
+        with assert_max_queries(3):
+            client.get('/api/quotes/shipment/<id>')
+    """
+    with collect_queries() as collector:
+        yield collector
+    if collector.count > limit:
+        raise AssertionError(f"Expected at most {limit} queries, got {collector.report()}")
+
+
+def _before_request():
+    collector = QueryCollector()
+    g.query_collector = collector
+    g.query_collector_token = _active.set(_active.get() + (collector,))
+
+
+def _after_request(response):
+    collector = g.get('query_collector')
+    if collector is None:
+        return response
+    if Config.QUERY_PROFILER_HEADERS:
+        response.headers['X-DB-Queries'] = str(collector.count)
+        response.headers.add('Server-Timing', f'db;dur={collector.total_ms:.1f};desc="{collector.count} queries"')
+
+    repeated = collector.repeated(Config.QUERY_PROFILER_REPEAT_THRESHOLD)
+    if collector.count > Config.QUERY_PROFILER_MAX_QUERIES or repeated:
+        logger.warning("Query budget exceeded: %s queries, %.1fms", collector.count, collector.total_ms, extra={'data': {
+            'db_queries': collector.count,
+            'db_ms': round(collector.total_ms, 1),
+            'repeated_shapes': repeated
+        }})
+    return response
+
+
+def _teardown_request(_exc):
+    token = g.pop('query_collector_token', None)
+    if token is not None:
+        try:
+            _active.reset(token)
+        except ValueError:
+            # Torn down from a different context; nothing of ours is left in it
+            pass
+
+
+def init_query_profiler(app):
+    if not Config.QUERY_PROFILER_ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,33 @@
+from typing import Any, Dict, Iterable, Optional, Union
+
+from bson import DBRef, ObjectId
+from mongoengine import Document
+
+
+def reference_id(document: Union[Document, Dict[str, Any]], field: str) -> Optional[ObjectId]:
+    """Return the id stored in a ReferenceField without dereferencing it.
+
+    Works whether the field currently holds a DBRef, a raw ObjectId or an
+    already-loaded document, and on raw ``as_pymongo()`` rows too.
+    """
+    data = document if isinstance(document, dict) else document._data
+    value = data.get(field)
+    if value is None:
+        return None
+    if isinstance(value, (DBRef, Document)):
+        return value.id
+    return value
+
+
+def prefetch_references(documents: Iterable[Document], field: str, model,
+                        only: Iterable[str] = ('name', 'company_name')) -> Dict[ObjectId, Any]:
+    """Load every document referenced by ``field`` with one ``$in`` query.
+
+    Returns ``{id: document}`` projected to ``only``, so serializing a list of
+    N documents costs one extra query instead of N.
+    """
+    ids = {reference_id(document, field) for document in documents}
+    ids.discard(None)
+    if not ids:
+        return {}
+    return {related.id: related for related in model.objects(id__in=list(ids)).only(*only)}
@@ -0,0 +1,104 @@
+from typing import Any, Dict
+
+from bson import DBRef, ObjectId
+from flask.json.provider import DefaultJSONProvider
+from mongoengine import FloatField, IntField
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+_numeric_fields: Dict[type, Dict[str, Any]] = {}
+
+
+def raw_value(model, son: Dict[str, Any], name: str) -> Any:
+    """Read ``name`` from a raw ``as_pymongo()`` document the way the model would.
+
+    Missing keys fall back to the field default, and Int/Float fields are coerced
+    like ``to_python`` does, so raw serializers emit exactly what ``to_dict``
+    emits for the same stored document.
+    """
+    field = model._fields[name]
+    db_field = field.db_field or name
+    if db_field in son:
+        value = son[db_field]
+    else:
+        default = field.default
+        value = default() if callable(default) else default
+    if value is not None and name in _numeric_fields_for(model):
+        value = field.to_python(value)
+    return value
+
+
+def _numeric_fields_for(model) -> Dict[str, Any]:
+    fields = _numeric_fields.get(model)
+    if fields is None:
+        fields = {name: field for name, field in model._fields.items() if isinstance(field, (IntField, FloatField))}
+        _numeric_fields[model] = fields
+    return fields
+
+
+def raw_iso(value) -> Any:
+    return value.isoformat() if value else None
+
+
+def raw_ref(value) -> Any:
+    """String id of a stored reference, whether it is an ObjectId or a DBRef."""
+    if not value:
+        return None
+    if isinstance(value, DBRef):
+        return str(value.id)
+    return str(value)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson.
+
+    Keys are sorted and non-native values (ObjectId, datetime, Decimal, ...)
+    go through Flask's default hook, so payloads carry the same data as the
+    stdlib provider, but not the same bytes:
+
+    - non-ASCII text is sent as UTF-8 rather than ``\\u`` escapes;
+    - floats use orjson's shortest form (``0.00001``, ``1e16`` where the
+      stdlib writes ``1e-05``, ``1e+16``);
+    - NaN and Infinity become ``null`` instead of the non-standard ``NaN``.
+
+    Payloads orjson refuses, such as integers wider than 64 bits, are
+    encoded by the stdlib provider instead.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self._dumps_bytes(obj, indent=kwargs.get('indent')).decode('utf-8')
+
+    def _dumps_bytes(self, obj: Any, indent=None) -> bytes:
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self._default, option=option)
+        except orjson.JSONEncodeError:
+            return super().dumps(obj, default=self._default, indent=indent).encode('utf-8')
+
+    @staticmethod
+    def _default(value: Any) -> Any:
+        if isinstance(value, (ObjectId, DBRef)):
+            return str(value.id if isinstance(value, DBRef) else value)
+        return DefaultJSONProvider.default(value)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        # Trailing newline matches DefaultJSONProvider.response
+        return self._app.response_class(
+            self._dumps_bytes(obj, indent=2 if pretty else None) + b"\n",
+            mimetype=self.mimetype
+        )
+
+
+def init_json_provider(app):
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,158 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Mapping, Optional
+
+from flask import g, has_request_context, request
+
+from app.config import Config
+
+REDACTED = '[REDACTED]'
+SENSITIVE_HEADERS = {'authorization', 'cookie', 'set-cookie', 'proxy-authorization', 'x-api-key'}
+SENSITIVE_FIELDS = {'password', 'hashed_password', 'token', 'access_token', 'refresh_token', 'secret'}
+
+access_logger = logging.getLogger('app.access')
+
+_listener: Optional[QueueListener] = None
+
+
+def redact_headers(headers: Mapping[str, str]) -> Dict[str, str]:
+    return {name: REDACTED if name.lower() in SENSITIVE_HEADERS else value for name, value in headers.items()}
+
+
+def redact_fields(data: Any) -> Any:
+    if not isinstance(data, dict):
+        return data
+    return {key: REDACTED if key.lower() in SENSITIVE_FIELDS else value for key, value in data.items()}
+
+
+def get_request_id() -> str:
+    if has_request_context():
+        return getattr(g, 'request_id', '-')
+    return '-'
+
+
+def verbose_request_logging() -> bool:
+    """Whether this request was sampled for verbose (DEBUG) request logs."""
+    return has_request_context() and getattr(g, 'log_verbose', False) and logging.getLogger().isEnabledFor(logging.DEBUG)
+
+
+def _sample_rate(endpoint: Optional[str]) -> float:
+    return Config.LOG_REQUEST_SAMPLE_RATES.get(endpoint or '', Config.LOG_REQUEST_SAMPLE_RATE)
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = get_request_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``extra={'data': {...}}`` adds structured fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-')
+        }
+        data = getattr(record, 'data', None)
+        if data:
+            entry.update(data)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _RequestThreadQueueHandler(QueueHandler):
+    """Resolve everything that needs the request thread, then hand off.
+
+    The message is rendered and the traceback captured here so the listener
+    thread never touches request state or live exception objects.
+    """
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        # A full queue means the sink cannot keep up; drop rather than block requests
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _before_request():
+    g.request_id = request.headers.get('X-Request-ID', '')[:64] or uuid.uuid4().hex
+    g.request_started = time.perf_counter()
+    g.log_verbose = random.random() < _sample_rate(request.endpoint)
+
+
+def _after_request(response):
+    response.headers['X-Request-ID'] = get_request_id()
+    if Config.LOG_ACCESS_ENABLED and 'request_started' in g:
+        elapsed_ms = (time.perf_counter() - g.request_started) * 1000
+        access_logger.info("%s %s %s %.1fms", request.method, request.path, response.status_code, elapsed_ms, extra={
+            'data': {
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'duration_ms': round(elapsed_ms, 1)
+            }
+        })
+    if verbose_request_logging():
+        access_logger.debug("Request headers", extra={'data': {'headers': redact_headers(request.headers)}})
+    return response
+
+
+def init_logging(app):
+    """Route all logging through a queue so handler I/O stays off request threads."""
+    global _listener
+    level = getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO)
+
+    if _listener is None:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        if Config.LOG_FORMAT == 'json':
+            stream_handler.setFormatter(JsonFormatter())
+        else:
+            stream_handler.setFormatter(logging.Formatter(
+                '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'
+            ))
+
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+        queue_handler = _RequestThreadQueueHandler(log_queue)
+        queue_handler.addFilter(RequestIdFilter())
+
+        root = logging.getLogger()
+        root.handlers = [queue_handler]
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    logging.getLogger().setLevel(level)
+    app.logger.setLevel(level)
+    # Flask's own handler would write synchronously; let records reach the root queue
+    app.logger.handlers = []
+    app.logger.propagate = True
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
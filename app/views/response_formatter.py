@@ -1,29 +1,67 @@
-from flask import jsonify
+import hashlib
+from datetime import datetime, timezone
+from flask import jsonify, make_response, request
 from typing import Any, Dict, List, Optional
+from werkzeug.http import http_date, quote_etag
 
 
-def success_response(data: Any = None, message: str = None, status_code: int = 200):
+def make_etag(*parts: Any) -> str:
+    """Opaque strong ETag for the values a representation is derived from.
+    
+    Pass ``(id, updated_at)`` for a single document, or the same pair for every
+    row of a page for list responses.
+    """
+    raw = '|'.join(part.isoformat() if isinstance(part, datetime) else str(part) for part in parts)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Mongo hands back naive UTC datetimes
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    headers = {
+        'ETag': quote_etag(etag),
+        # Authenticated data: clients may keep it but must revalidate every time
+        'Cache-Control': 'private, no-cache'
+    }
+    if last_modified:
+        headers['Last-Modified'] = http_date(_as_utc(last_modified))
+    return headers
+
+
+def is_not_modified(etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Evaluate the request's ``If-None-Match`` (or ``If-Modified-Since``) against these validators."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified and request.if_modified_since:
+        return _as_utc(last_modified).replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None):
+    return make_response('', 304, cache_headers(etag, last_modified))
+
+
+def success_response(data: Any = None, message: str = None, status_code: int = 200,
+                     etag: Optional[str] = None, last_modified: Optional[datetime] = None):
     if data is not None:
         if isinstance(data, dict):
-            response = data.copy()
-            if message:
-                response['message'] = message
-            return jsonify(response), status_code
-        elif isinstance(data, list):
-            response = {'data': data}
-            if message:
-                response['message'] = message
-            return jsonify(response), status_code
+            # Only copy when the caller's dict actually needs changing
+            response = dict(data, message=message) if message else data
         else:
             response = {'data': data}
             if message:
                 response['message'] = message
-            return jsonify(response), status_code
     else:
         response = {}
         if message:
             response['message'] = message
-        return jsonify(response), status_code
+    
+    if etag:
+        return jsonify(response), status_code, cache_headers(etag, last_modified)
+    return jsonify(response), status_code
 
 
 def error_response(error: str, reason: str, module: str = "unknown", 
@@ -0,0 +1,95 @@
+"""Compare a load-test result against a saved baseline.
+
+    python -m benchmarks.compare benchmarks/results/baseline.json benchmarks/results/20250301T101500.json
+
+Exits 1 on a regression: a scenario's p95 latency up by more than
+``--threshold`` percent (and by at least ``--min-delta-ms``, so noise on fast
+endpoints does not count), its error rate up by more than
+``--max-error-increase``, or overall throughput down by more than
+``--threshold`` percent. Per-scenario throughput is shown but not gated; it
+mostly reflects that scenario's share of the random mix. Scenarios with
+fewer than ``--min-samples`` requests in either run are reported only.
+"""
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+
+def _change(before: float, after: float) -> Optional[float]:
+    if not before:
+        return None
+    return (after - before) / before * 100
+
+
+def _format_change(change: Optional[float]) -> str:
+    return 'n/a' if change is None else f"{change:+.1f}%"
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_delta_ms: float,
+            max_error_increase: float, min_samples: int) -> List[str]:
+    """Print a side-by-side table and return one message per regression."""
+    regressions = []
+    if baseline['meta'].get('backend') != current['meta'].get('backend'):
+        print(f"Warning: comparing a {baseline['meta'].get('backend')} baseline with a "
+              f"{current['meta'].get('backend')} run", file=sys.stderr)
+
+    header = f"{'scenario':<30} {'p95 before':>11} {'p95 after':>10} {'p95 Δ':>8} {'rps Δ':>8} {'err before':>10} {'err after':>10}"
+    print(header)
+    print('-' * len(header))
+    names = [name for name in baseline['results'] if name in current['results']]
+    for name in names:
+        before, after = baseline['results'][name], current['results'][name]
+        p95_change = _change(before['p95_ms'], after['p95_ms'])
+        rps_change = _change(before['rps'], after['rps'])
+        row = (f"{name:<30} {before['p95_ms']:>11.1f} {after['p95_ms']:>10.1f} {_format_change(p95_change):>8} "
+               f"{_format_change(rps_change):>8} {before['error_rate']:>10.2%} {after['error_rate']:>10.2%}")
+        if min(before['count'], after['count']) < min_samples:
+            print(f"{row}  (few samples)")
+            continue
+        flags = []
+        if p95_change is not None and p95_change > threshold and after['p95_ms'] - before['p95_ms'] >= min_delta_ms:
+            flags.append(f"p95 {before['p95_ms']:.1f}ms -> {after['p95_ms']:.1f}ms ({_format_change(p95_change)})")
+        if name == 'overall' and rps_change is not None and rps_change < -threshold:
+            flags.append(f"rps {before['rps']:.1f} -> {after['rps']:.1f} ({_format_change(rps_change)})")
+        if after['error_rate'] - before['error_rate'] > max_error_increase:
+            flags.append(f"error rate {before['error_rate']:.2%} -> {after['error_rate']:.2%}")
+        regressions.extend(f"{name}: {flag}" for flag in flags)
+
+        print(f"{row}  <-- regression" if flags else row)
+
+    for name in sorted(set(baseline['results']) ^ set(current['results'])):
+        where = 'baseline' if name in baseline['results'] else 'current run'
+        print(f"{name:<30} only in {where}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=10.0, help='allowed p95/rps change in percent')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='ignore p95 increases smaller than this')
+    parser.add_argument('--max-error-increase', type=float, default=0.01,
+                        help='allowed absolute error-rate increase (0.01 = one percentage point)')
+    parser.add_argument('--min-samples', type=int, default=30, help='gate only scenarios with this many requests')
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = compare(baseline, current, args.threshold, args.min_delta_ms, args.max_error_increase,
+                          args.min_samples)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s):")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,404 @@
+"""Accuracy and latency of the local document classifier against a labeled corpus.
+
+    python -m benchmarks.documents                       # synthetic corpus, 40 documents per type
+    python -m benchmarks.documents --per-type 200 --seed 7
+    python -m benchmarks.documents --corpus ~/tradeflow-docs   # real files laid out as <type>/<file>
+    python -m benchmarks.documents --write /tmp/corpus     # dump the synthetic corpus to look at
+
+The synthetic corpus renders every ``DocumentModel.type`` as text-layer PDFs
+from varied templates: headings missing or moved, fields shuffled, TJ
+kerning, uncompressed streams, full ProcSets and embedded TrueType fonts.
+It adds ``other`` documents and scanned (image-only) files, which should
+both be left to Gemini.
+
+A document the classifier answers is "local". A local answer that is wrong
+cannot be corrected later, so the number to watch is local precision.
+Coverage is the share of documents that needed no Gemini call. Exits 1 when
+local precision falls below ``--min-precision``.
+"""
+import argparse
+import json
+import mimetypes
+import os
+import random
+import sys
+import time
+import zlib
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.load import percentile
+
+COMPANIES = ['Coimbatore Cotton Mills Pvt Ltd', 'Shenzhen Bright Electronics Co', 'Rotterdam Apparel BV',
+             'Hamburg Machinery GmbH', 'Gulf Spices Trading LLC', 'Pacific Home Goods Inc', 'Tiruppur Knits Exports',
+             'Ningbo Hardware Industrial', 'Lagos Agro Imports Ltd', 'Santos Coffee Exportadora']
+PORTS = ['Nhava Sheva, India', 'Rotterdam, Netherlands', 'Shanghai, China', 'Jebel Ali, UAE', 'Hamburg, Germany',
+         'Los Angeles, USA', 'Singapore', 'Chennai, India', 'Felixstowe, UK', 'Santos, Brazil']
+GOODS = ['Cotton T-Shirts', 'LED Panel Lights', 'Stainless Steel Fasteners', 'Black Pepper Whole',
+         'Ceramic Dinnerware Sets', 'Knitted Sweaters', 'Hydraulic Pump Spares', 'Green Coffee Beans']
+CARRIERS = ['MSC Mediterranean Shipping Co', 'Maersk Line', 'CMA CGM', 'Hapag-Lloyd', 'ONE Ocean Network Express']
+FORWARDERS = ['TradeFlow Logistics Pvt Ltd', 'Blue Anchor Freight Forwarders', 'Oceanic Cargo Services']
+VESSELS = ['MSC AURORA', 'MAERSK ESSEN', 'CMA CGM JACQUES', 'EVER GIVEN', 'ONE APUS']
+
+
+def _money(rng) -> str:
+    return f"{rng.uniform(800, 95000):,.2f}"
+
+
+def _date(rng) -> str:
+    return f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025"
+
+
+def _heading(rng, title: str, lines: List[str]) -> List[str]:
+    """Put the title first (usually), after the letterhead, or leave it out."""
+    roll = rng.random()
+    if roll < 0.7:
+        return [title.upper()] + lines
+    if roll < 0.9:
+        return lines[:2] + [title.title()] + lines[2:]
+    return lines
+
+
+def _items(rng, columns: str, row: Callable[[str], str]) -> List[str]:
+    return [columns] + [row(good) for good in rng.sample(GOODS, rng.randint(1, 4))]
+
+
+def invoice(rng) -> List[str]:
+    lines = [rng.choice(COMPANIES), f"Invoice No: INV-{rng.randint(1000, 99999)}", f"Invoice Date: {_date(rng)}",
+             f"Bill To: {rng.choice(COMPANIES)}", f"Due Date: {_date(rng)}"]
+    body = _items(rng, "Description  Qty  Unit Price  Amount",
+                  lambda good: f"{good}  {rng.randint(1, 500)}  {_money(rng)}  {_money(rng)}")
+    body += [f"Subtotal: {_money(rng)}", f"{rng.choice(['GST 18%', 'VAT 20%', 'Tax'])}: {_money(rng)}",
+             f"Total Amount: {_money(rng)}", f"Amount Due: {_money(rng)}",
+             rng.choice(["Payment Terms: Net 30", "Bank Details: HDFC Bank A/C 5010023", "Remit To: Accounts Dept"])]
+    rng.shuffle(body)
+    return _heading(rng, rng.choice(['Invoice', 'Tax Invoice']), lines + body)
+
+
+def commercial_invoice(rng) -> List[str]:
+    lines = [f"Exporter: {rng.choice(COMPANIES)}", f"Invoice No. & Date: EXP/{rng.randint(100, 999)} {_date(rng)}",
+             f"Consignee: {rng.choice(COMPANIES)}", f"Buyer (if other than consignee): {rng.choice(COMPANIES)}"]
+    body = [f"Port of Loading: {rng.choice(PORTS)}", f"Port of Discharge: {rng.choice(PORTS)}",
+            f"Final Destination: {rng.choice(PORTS)}", f"Country of Origin of Goods: India",
+            f"Terms of Delivery: {rng.choice(['FOB', 'CIF', 'CFR', 'EXW'])} {rng.choice(PORTS)}",
+            f"Currency: {rng.choice(['USD', 'EUR'])}", f"IEC: {rng.randint(10**9, 10**10 - 1)}"]
+    body += _items(rng, "Marks  HS Code  Description  Qty  Unit Price  Total Value",
+                   lambda good: f"{rng.randint(1, 99)}  HS {rng.randint(100000, 999999)}  {good}  {rng.randint(10, 9000)}  "
+                                f"{_money(rng)}  {_money(rng)}")
+    body.append("We declare that this invoice shows the actual price of the goods described and that all particulars "
+                "are true and correct.")
+    rng.shuffle(body)
+    return _heading(rng, rng.choice(['Commercial Invoice', 'Export Invoice']), lines + body)
+
+
+def packing_list(rng) -> List[str]:
+    lines = [f"Shipper: {rng.choice(COMPANIES)}", f"Invoice No: EXP/{rng.randint(100, 999)}", f"Date: {_date(rng)}",
+             f"Consignee: {rng.choice(COMPANIES)}"]
+    body = _items(rng, "Carton No  Description  Pcs  Net Weight (KGS)  Gross Weight (KGS)  Dimensions (CM)",
+                  lambda good: f"{rng.randint(1, 50)}-{rng.randint(51, 400)}  {good}  {rng.randint(10, 5000)}  "
+                               f"{rng.uniform(100, 9000):.1f}  {rng.uniform(100, 9500):.1f}  60x40x{rng.randint(20, 60)}")
+    body += [f"Total Cartons: {rng.randint(20, 900)}", f"Total Net Weight: {rng.uniform(500, 20000):.1f} KGS",
+             f"Total Gross Weight: {rng.uniform(500, 21000):.1f} KGS", f"Total Measurement: {rng.uniform(5, 68):.2f} CBM",
+             f"Marks and Numbers: {rng.choice(['AS PER INVOICE', 'N/M', 'RAB/ROTTERDAM/1-420'])}",
+             f"No of Packages: {rng.randint(20, 900)} PKGS on {rng.randint(1, 24)} pallets"]
+    rng.shuffle(body)
+    return _heading(rng, rng.choice(['Packing List', 'Packing Slip', 'Weight List']), lines + body)
+
+
+def certificate_of_origin(rng) -> List[str]:
+    lines = [f"1. Goods consigned from (Exporter's business name, address, country): {rng.choice(COMPANIES)}",
+             f"2. Goods consigned to (Consignee's name, address, country): {rng.choice(COMPANIES)}",
+             f"3. Means of transport and route: By sea from {rng.choice(PORTS)} to {rng.choice(PORTS)}"]
+    body = [f"4. Item number  Marks and numbers  Number and kind of packages; description of goods: "
+            f"{rng.choice(GOODS)}",
+            f"Origin criterion: {rng.choice(['P', 'W', 'WO'])}", f"Gross weight: {rng.uniform(100, 20000):.0f} KGS",
+            "Declaration by the exporter: The undersigned hereby declares that the above details and statements "
+            "are correct; that all the goods were produced in India and that they comply with the origin "
+            "requirements specified for those goods.",
+            f"Certification: It is hereby certified, on the basis of control carried out, that the declaration by "
+            f"the exporter is correct. {rng.choice(['Chamber of Commerce', 'Export Inspection Council'])}",
+            f"Issuing authority stamp and signature, {_date(rng)}"]
+    if rng.random() < 0.4:
+        body.append("Generalised System of Preferences, Form A")
+    rng.shuffle(body)
+    return _heading(rng, 'Certificate of Origin', lines + body)
+
+
+def _bl_body(rng) -> List[str]:
+    return [f"Shipper: {rng.choice(COMPANIES)}", f"Consignee: TO ORDER OF {rng.choice(COMPANIES)}",
+            f"Notify Party: {rng.choice(COMPANIES)}", f"Place of Receipt: {rng.choice(PORTS)}",
+            f"Ocean Vessel / Voyage No: {rng.choice(VESSELS)} / {rng.randint(100, 999)}W",
+            f"Port of Loading: {rng.choice(PORTS)}", f"Port of Discharge: {rng.choice(PORTS)}",
+            f"Place of Delivery: {rng.choice(PORTS)}",
+            f"Container No / Seal No: MSCU{rng.randint(1000000, 9999999)} / {rng.randint(100000, 999999)}",
+            f"1 X 40HC SAID TO CONTAIN {rng.randint(20, 900)} CARTONS {rng.choice(GOODS).upper()}",
+            f"Freight {rng.choice(['Prepaid', 'Collect'])}",
+            f"Number of Original B/L: {rng.choice(['THREE (3)', 'ONE (1)', 'ZERO (0)'])}",
+            f"Shipped on board: {_date(rng)}", f"Place and date of issue: {rng.choice(PORTS)} {_date(rng)}"]
+
+
+def bill_of_lading(rng) -> List[str]:
+    body = _bl_body(rng)
+    rng.shuffle(body)
+    lines = [f"B/L No: {rng.choice(['MEDU', 'MAEU', 'CMDU'])}{rng.randint(10**7, 10**8 - 1)}",
+             f"Carrier: {rng.choice(CARRIERS)}"] + body
+    return _heading(rng, rng.choice(['Bill of Lading', 'Ocean Bill of Lading']), lines)
+
+
+def house_bl(rng) -> List[str]:
+    body = _bl_body(rng) + [f"Master B/L No: MEDU{rng.randint(10**7, 10**8 - 1)}",
+                            f"Issued by {rng.choice(FORWARDERS)} as agent (NVOCC), freight forwarder"]
+    rng.shuffle(body)
+    lines = [f"HBL No: TFL{rng.randint(10**5, 10**6 - 1)}"] + body
+    return _heading(rng, rng.choice(['House Bill of Lading', 'House B/L']), lines)
+
+
+def master_bl(rng) -> List[str]:
+    body = _bl_body(rng) + [f"Booking No: {rng.randint(10**8, 10**9 - 1)}", f"SCAC: {rng.choice(['MSCU', 'MAEU'])}",
+                            f"Signed by {rng.choice(CARRIERS)} as carrier"]
+    rng.shuffle(body)
+    lines = [f"MBL No: MEDU{rng.randint(10**7, 10**8 - 1)}"] + body
+    return _heading(rng, rng.choice(['Master Bill of Lading', 'Master B/L']), lines)
+
+
+def telex_release(rng) -> List[str]:
+    bl_number = f"MEDU{rng.randint(10**7, 10**8 - 1)}"
+    lines = [f"To: {rng.choice(CARRIERS)} - {rng.choice(PORTS)} office", f"Date: {_date(rng)}",
+             f"Re: B/L No {bl_number}, vessel {rng.choice(VESSELS)}",
+             f"Please be advised that the full set of original bills of lading for B/L No {bl_number} has been "
+             f"surrendered at the port of loading.",
+             f"Please release the cargo to the consignee {rng.choice(COMPANIES)} without presentation of the "
+             f"original B/L.",
+             "Thank you."]
+    return _heading(rng, rng.choice(['Telex Release', 'Express Release']), lines)
+
+
+def other(rng) -> List[str]:
+    kind = rng.choice(['insurance', 'booking', 'delivery_order', 'letter', 'arrival'])
+    if kind == 'insurance':
+        return ["MARINE CARGO INSURANCE POLICY", f"Assured: {rng.choice(COMPANIES)}", f"Sum insured: USD {_money(rng)}",
+                "Institute Cargo Clauses (A)", f"Voyage: {rng.choice(PORTS)} to {rng.choice(PORTS)}",
+                "Claims payable at destination in the currency of this policy."]
+    if kind == 'booking':
+        return ["BOOKING CONFIRMATION", f"Booking No: {rng.randint(10**8, 10**9 - 1)}", f"Carrier: {rng.choice(CARRIERS)}",
+                f"Vessel: {rng.choice(VESSELS)}", f"ETD: {_date(rng)}  ETA: {_date(rng)}",
+                f"Empty pick-up depot: {rng.choice(PORTS)}", "Cut-off VGM: 48 hours before ETD",
+                "Equipment: 1 x 40HC"]
+    if kind == 'delivery_order':
+        return ["DELIVERY ORDER", f"To: Terminal Manager, {rng.choice(PORTS)}",
+                f"Please deliver to {rng.choice(COMPANIES)} the undermentioned container upon payment of charges.",
+                f"Container: MSCU{rng.randint(1000000, 9999999)}", f"Valid until: {_date(rng)}"]
+    if kind == 'arrival':
+        return ["ARRIVAL NOTICE", f"Vessel {rng.choice(VESSELS)} is expected at {rng.choice(PORTS)} on {_date(rng)}.",
+                "Kindly arrange customs clearance and settle destination charges before the free time expires.",
+                f"Free days: {rng.randint(3, 14)}", f"Contact: {rng.choice(FORWARDERS)}"]
+    return [f"Dear {rng.choice(['Sir', 'Madam', 'Team'])},",
+            "Following our call this morning, please find below the revised production schedule for the next order.",
+            f"Samples will be dispatched by courier on {_date(rng)}.",
+            "Let us know if the colour references are acceptable.", "Best regards,", rng.choice(COMPANIES)]
+
+
+TEMPLATES: Dict[str, Callable] = {
+    'invoice': invoice, 'commercial_invoice': commercial_invoice, 'packing_list': packing_list,
+    'certificate_of_origin': certificate_of_origin, 'bill_of_lading': bill_of_lading, 'house_bl': house_bl,
+    'master_bl': master_bl, 'telex_release': telex_release, 'other': other,
+}
+
+
+def _escape(text: str) -> bytes:
+    return text.encode('latin-1', 'replace').replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def render_pdf(lines: List[str], rng) -> bytes:
+    """A one-page PDF with ``lines`` as its text layer, written the way different producers do."""
+    kerned = rng.random() < 0.3
+    content = [b'BT', b'/F1 9 Tf', b'40 800 Td', b'11 TL']
+    for line in lines:
+        if kerned:
+            words = [b'(' + _escape(word) + b')' for word in line.split(' ')]
+            content.append(b'[' + b' -250 '.join(words) + b'] TJ T*')
+        else:
+            content.append(b'(' + _escape(line) + b") '")
+    content.append(b'ET')
+    stream = b'\n'.join(content)
+    compressed = rng.random() < 0.8
+    if compressed:
+        stream = zlib.compress(stream)
+    stream_dict = b'<< /Length %d%s >>' % (len(stream), b' /Filter /FlateDecode' if compressed else b'')
+    # Office and print drivers list every ProcSet and embed the font program
+    procset = b'/ProcSet [/PDF /Text /ImageB /ImageC /ImageI] ' if rng.random() < 0.5 else b''
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R '
+        b'/Resources << ' + procset + b'/Font << /F1 5 0 R >> >> >>',
+        stream_dict + b'\nstream\n' + stream + b'\nendstream',
+    ]
+    if rng.random() < 0.5:
+        font_program = zlib.compress(b'\x00\x01\x00\x00' + rng.randbytes(1024))
+        objects += [
+            b'<< /Type /Font /Subtype /TrueType /BaseFont /Arial /FirstChar 32 /LastChar 255 '
+            b'/Encoding /WinAnsiEncoding /FontDescriptor 6 0 R >>',
+            b'<< /Type /FontDescriptor /FontName /Arial /Flags 32 /FontBBox [-665 -325 2000 1006] '
+            b'/ItalicAngle 0 /Ascent 905 /Descent -212 /CapHeight 716 /StemV 80 /FontFile2 7 0 R >>',
+            b'<< /Length %d /Length1 1028 /Filter /FlateDecode >>\nstream\n' % len(font_program)
+            + font_program + b'\nendstream',
+        ]
+    else:
+        objects.append(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>')
+    return _assemble(objects)
+
+
+def render_scan(rng) -> bytes:
+    """A scanned page: one JPEG image and no text layer."""
+    image = b'\xff\xd8\xff\xe0' + rng.randbytes(2048) + b'\xff\xd9'
+    return _assemble([
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R '
+        b'/Resources << /XObject << /Im1 5 0 R >> >> >>',
+        b'<< /Length 31 >>\nstream\nq 595 0 0 842 0 0 cm /Im1 Do Q\nendstream',
+        b'<< /Type /XObject /Subtype /Image /Width 1240 /Height 1754 /BitsPerComponent 8 '
+        b'/ColorSpace /DeviceRGB /Filter /DCTDecode /Length %d >>\nstream\n' % len(image) + image + b'\nendstream',
+    ])
+
+
+def _assemble(objects: List[bytes]) -> bytes:
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+Sample = Tuple[str, str, str, bytes]  # (label, name, mime type, data)
+
+
+def synthetic_corpus(per_type: int, scan_share: float, rng) -> List[Sample]:
+    samples = []
+    for label, template in TEMPLATES.items():
+        for i in range(per_type):
+            if rng.random() < scan_share:
+                samples.append((label, f"{label}_{i:04d}_scan.pdf", 'application/pdf', render_scan(rng)))
+            else:
+                samples.append((label, f"{label}_{i:04d}.pdf", 'application/pdf', render_pdf(template(rng), rng)))
+    return samples
+
+
+def load_corpus(root: str) -> List[Sample]:
+    samples = []
+    for label in sorted(os.listdir(root)):
+        directory = os.path.join(root, label)
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            with open(os.path.join(directory, name), 'rb') as f:
+                samples.append((label, name, mimetypes.guess_type(name)[0] or 'application/octet-stream', f.read()))
+    return samples
+
+
+def write_corpus(samples: List[Sample], root: str):
+    for label, name, _, data in samples:
+        os.makedirs(os.path.join(root, label), exist_ok=True)
+        with open(os.path.join(root, label, name), 'wb') as f:
+            f.write(data)
+
+
+def evaluate(samples: List[Sample]) -> dict:
+    from app.services.document_classifier import DocumentClassifier
+
+    classifier = DocumentClassifier()
+    per_label = defaultdict(Counter)
+    mistakes = Counter()
+    latencies = []
+    for label, name, mime_type, data in samples:
+        started = time.perf_counter()
+        result: Optional[Tuple[str, float]] = classifier.classify(data, mime_type)
+        latencies.append((time.perf_counter() - started) * 1000)
+        per_label[label]['count'] += 1
+        if result is None:
+            per_label[label]['deferred'] += 1
+            continue
+        per_label[label]['local'] += 1
+        if result[0] == label:
+            per_label[label]['correct'] += 1
+        else:
+            mistakes[(label, result[0])] += 1
+
+    total = Counter()
+    for counts in per_label.values():
+        total.update(counts)
+    latencies.sort()
+    return {
+        'documents': total['count'],
+        'local': total['local'],
+        'correct': total['correct'],
+        'coverage': round(total['local'] / total['count'], 4) if total['count'] else 0.0,
+        'local_precision': round(total['correct'] / total['local'], 4) if total['local'] else 1.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+            'max': round(latencies[-1], 3) if latencies else 0.0,
+        },
+        'per_type': {label: dict(counts) for label, counts in sorted(per_label.items())},
+        'mistakes': [{'expected': expected, 'predicted': predicted, 'count': count}
+                     for (expected, predicted), count in mistakes.most_common()],
+    }
+
+
+def print_report(report: dict, out=sys.stdout):
+    header = f"{'type':<24} {'docs':>6} {'local':>6} {'correct':>8} {'deferred':>9} {'precision':>10}"
+    print(header, file=out)
+    print('-' * len(header), file=out)
+    for label, counts in report['per_type'].items():
+        local = counts.get('local', 0)
+        precision = f"{counts.get('correct', 0) / local:.1%}" if local else '-'
+        print(f"{label:<24} {counts['count']:>6} {local:>6} {counts.get('correct', 0):>8} "
+              f"{counts.get('deferred', 0):>9} {precision:>10}", file=out)
+    latency = report['latency_ms']
+    print(f"\n{report['documents']} documents: {report['coverage']:.1%} classified locally at "
+          f"{report['local_precision']:.2%} precision; the rest go to Gemini", file=out)
+    print(f"latency p50 {latency['p50']:.2f}ms  p95 {latency['p95']:.2f}ms  p99 {latency['p99']:.2f}ms  "
+          f"max {latency['max']:.2f}ms", file=out)
+    for mistake in report['mistakes']:
+        print(f"  {mistake['expected']} classified as {mistake['predicted']}: {mistake['count']}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='directory of real documents laid out as <type>/<file>')
+    parser.add_argument('--per-type', type=int, default=40, help='synthetic documents per type')
+    parser.add_argument('--scan-share', type=float, default=0.1, help='share of synthetic documents that are scans')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--write', help='write the synthetic corpus to this directory and exit')
+    parser.add_argument('--output', help='also save the report as JSON')
+    parser.add_argument('--min-precision', type=float, default=0.98)
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        samples = load_corpus(args.corpus)
+    else:
+        samples = synthetic_corpus(args.per_type, args.scan_share, random.Random(args.seed))
+    if args.write:
+        write_corpus(samples, args.write)
+        print(f"Wrote {len(samples)} documents to {args.write}", file=sys.stderr)
+        return 0
+    if not samples:
+        parser.error("The corpus is empty")
+
+    report = evaluate(samples)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0 if report['local_precision'] >= args.min_precision else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
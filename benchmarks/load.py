@@ -0,0 +1,268 @@
+"""Offline load test: seed a database, serve the app locally and drive a weighted request mix.
+
+Gemini and Supabase storage are replaced with latency-configurable stubs
+(``benchmarks.stubs``), so a run needs no credentials and no network.
+
+    python -m benchmarks.load --duration 60 --concurrency 16
+    python -m benchmarks.load --mongo-uri mongodb://localhost:27017 --shipments 20000
+    python -m benchmarks.load --scenario reads --output benchmarks/results/baseline.json
+
+``--mongo-uri memory`` (the default) runs against mongomock. It is good for
+comparing Python-side costs between commits, but has none of mongod's
+query planner or index behaviour; use a local mongod for numbers that
+matter, and only compare results produced against the same backend.
+"""
+import argparse
+import functools
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+from benchmarks.stubs import Latency, install_gemini_stub, start_storage_stub
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), timeout=5).stdout.strip()
+    except Exception:
+        return ''
+
+
+def _configure_environment(args, storage_url: str):
+    # Everything create_app and Config read at import time, pointed at local stand-ins
+    os.environ.update({
+        'MONGODB_URI': 'mongodb://localhost' if args.mongo_uri == 'memory' else args.mongo_uri,
+        'MONGODB_DB_NAME': args.db,
+        'SUPABASE_URL': storage_url,
+        'SUPABASE_SERVICE_ROLE_KEY': 'bench-service-role-key',
+        'STORAGE_BUCKET': 'bench',
+        'GEMINI_API_KEY': 'bench-gemini-key',
+        'ENABLE_AI_EXTRACTION': 'True',
+        'ACCESS_TOKEN_EXPIRE_MINUTES': str(24 * 60),
+        'LOG_LEVEL': 'WARNING',
+        'LOG_ACCESS_ENABLED': 'False',
+        # The per-scenario query counts in the report come from X-DB-Queries; mongomock
+        # publishes no command events, so they are only available against mongod
+        'QUERY_PROFILER_ENABLED': 'True',
+        'QUERY_PROFILER_HEADERS': str(args.mongo_uri != 'memory'),
+        # Clients do not send Accept-Encoding, but keep compression in the measured path when they do
+        'COMPRESSION_ENABLED': os.environ.get('COMPRESSION_ENABLED', 'True'),
+    })
+
+
+def build_app(args):
+    import mongoengine
+
+    import app as app_package
+
+    if args.mongo_uri == 'memory':
+        import mongomock
+        import mongomock.gridfs
+
+        mongomock.gridfs.enable_gridfs_integration()
+        app_package.connect = functools.partial(mongoengine.connect, mongo_client_class=mongomock.MongoClient)
+
+    flask_app = app_package.create_app()
+    # A real mongod may hold a previous run; the in-memory store is always empty
+    mongoengine.get_db().client.drop_database(args.db)
+    return flask_app
+
+
+def mint_tokens(flask_app, fixture) -> Dict[str, str]:
+    from app.controllers.driverController import create_driver_token
+    from app.utils.auth import create_token
+
+    with flask_app.app_context():
+        tokens = {user.email: create_token(user)['access_token']
+                  for user in fixture.suppliers + fixture.forwarders + fixture.buyers}
+        tokens.update({driver.email: create_driver_token(driver)['access_token'] for driver in fixture.drivers})
+    return tokens
+
+
+def serve(flask_app) -> str:
+    from werkzeug.serving import make_server
+
+    # One access line per request would dominate both the output and the profile
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-server', daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def run_load(base_url: str, context, scenarios, concurrency: int, duration: float, seed: int):
+    """Drive ``scenarios`` for ``duration`` seconds; return samples and the measured wall time."""
+    import requests
+
+    weights = [scenario.weight for scenario in scenarios]
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id: int):
+        rng = random.Random(seed * 1000 + worker_id)
+        session = requests.Session()
+        samples = []
+        while time.perf_counter() < deadline:
+            scenario = rng.choices(scenarios, weights)[0]
+            method, path, kwargs = scenario.build(context, rng)
+            started = time.perf_counter()
+            try:
+                response = session.request(method, base_url + path, allow_redirects=False, timeout=120, **kwargs)
+                status = response.status_code
+                db_queries = response.headers.get('X-DB-Queries')
+            except requests.RequestException:
+                status, db_queries = 0, None
+            samples.append((scenario.name, (time.perf_counter() - started) * 1000, status,
+                            int(db_queries) if db_queries else None))
+        session.close()
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='bench-client') as executor:
+        per_worker = list(executor.map(worker, range(concurrency)))
+    return [sample for samples in per_worker for sample in samples], time.perf_counter() - started
+
+
+def summarize(samples, elapsed: float) -> Dict[str, dict]:
+    by_scenario = defaultdict(list)
+    for sample in samples:
+        by_scenario[sample[0]].append(sample)
+    by_scenario['overall'] = samples
+
+    summary = {}
+    for name, rows in sorted(by_scenario.items()):
+        latencies = sorted(row[1] for row in rows)
+        statuses = Counter(str(row[2]) for row in rows)
+        errors = sum(1 for row in rows if row[2] == 0 or row[2] >= 400)
+        queries = [row[3] for row in rows if row[3] is not None]
+        summary[name] = {
+            'count': len(rows),
+            'errors': errors,
+            'error_rate': round(errors / len(rows), 4) if rows else 0.0,
+            'statuses': dict(sorted(statuses.items())),
+            'rps': round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            'max_ms': round(latencies[-1], 2) if latencies else 0.0,
+            'db_queries_avg': round(sum(queries) / len(queries), 2) if queries else None,
+        }
+    return summary
+
+
+def print_report(summary: Dict[str, dict], out=sys.stdout):
+    header = f"{'scenario':<30} {'count':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err%':>6} {'queries':>7}"
+    print(header, file=out)
+    print('-' * len(header), file=out)
+    for name, row in summary.items():
+        queries = '' if row['db_queries_avg'] is None else f"{row['db_queries_avg']:.1f}"
+        print(f"{name:<30} {row['count']:>7} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['error_rate'] * 100:>6.1f} {queries:>7}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongo-uri', default='memory', help="mongod URI, or 'memory' for mongomock")
+    parser.add_argument('--db', default='tradeflow_bench', help='database name; dropped before seeding')
+    parser.add_argument('--scenario', action='append', default=None,
+                        help='group (all, reads, writes, uploads, ai), blueprint prefix or scenario name; repeatable')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30.0, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3.0, help='unmeasured seconds before the run')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--shipments', type=int, default=2000)
+    parser.add_argument('--events-per-shipment', type=int, default=12)
+    parser.add_argument('--suppliers', type=int, default=50)
+    parser.add_argument('--forwarders', type=int, default=20)
+    parser.add_argument('--drivers', type=int, default=20)
+    parser.add_argument('--gemini-latency-ms', type=float, default=800.0)
+    parser.add_argument('--gemini-jitter-ms', type=float, default=200.0)
+    parser.add_argument('--gemini-error-rate', type=float, default=0.0)
+    parser.add_argument('--storage-latency-ms', type=float, default=80.0)
+    parser.add_argument('--storage-jitter-ms', type=float, default=20.0)
+    parser.add_argument('--storage-error-rate', type=float, default=0.0)
+    parser.add_argument('--output', help='result JSON path (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--no-save', action='store_true', help='print the report without writing JSON')
+    args = parser.parse_args(argv)
+
+    storage_url = start_storage_stub(Latency(args.storage_latency_ms, args.storage_jitter_ms, args.storage_error_rate))
+    _configure_environment(args, storage_url)
+
+    # Imports app (and freezes Config), so only after the environment is in place
+    from benchmarks import scenarios as scenario_module
+
+    selected = scenario_module.select(args.scenario or ['all'])
+    if args.mongo_uri == 'memory':
+        skipped = [scenario.name for scenario in selected if scenario.mongod_only]
+        if skipped:
+            print(f"Skipping {', '.join(skipped)}: needs a real mongod", file=sys.stderr)
+        selected = [scenario for scenario in selected if not scenario.mongod_only]
+    if not selected:
+        parser.error(f"No scenarios match {args.scenario}")
+    install_gemini_stub(Latency(args.gemini_latency_ms, args.gemini_jitter_ms, args.gemini_error_rate))
+    flask_app = build_app(args)
+
+    from benchmarks.seed import Volumes, seed
+
+    seed_started = time.perf_counter()
+    fixture = seed(Volumes(
+        suppliers=args.suppliers, forwarders=args.forwarders, drivers=args.drivers,
+        shipments=args.shipments, events_per_shipment=args.events_per_shipment
+    ), random.Random(args.seed))
+    print(f"Seeded {fixture.counts} in {time.perf_counter() - seed_started:.1f}s", file=sys.stderr)
+
+    context = scenario_module.Context(fixture, mint_tokens(flask_app, fixture))
+    base_url = serve(flask_app)
+
+    if args.warmup > 0:
+        run_load(base_url, context, selected, args.concurrency, args.warmup, args.seed + 1)
+    samples, elapsed = run_load(base_url, context, selected, args.concurrency, args.duration, args.seed)
+    summary = summarize(samples, elapsed)
+    print_report(summary)
+
+    if args.no_save:
+        return 0
+    result = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': 'mongomock' if args.mongo_uri == 'memory' else 'mongod',
+            'elapsed_seconds': round(elapsed, 2),
+            'seeded': fixture.counts,
+            'scenarios': [scenario.name for scenario in selected],
+            'args': {key: value for key, value in vars(args).items() if key not in ('output', 'no_save')},
+        },
+        'results': summary,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved {output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
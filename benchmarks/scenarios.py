@@ -0,0 +1,225 @@
+"""Weighted request mix covering every blueprint.
+
+Each scenario builds one request from the seeded fixture; the runner picks
+scenarios by weight, so the mix approximates production traffic: mostly
+reads by suppliers and forwarders, with a tail of writes, uploads and AI
+calls.
+"""
+import os
+import random
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from benchmarks.seed import BENCH_PASSWORD, PNG_BYTES, PORTS, Fixture
+
+# (method, path, requests kwargs)
+Request = Tuple[str, str, dict]
+
+
+@dataclass
+class Scenario:
+    name: str
+    weight: float
+    # Which token the request is sent with: supplier, forwarder, driver or None
+    role: Optional[str]
+    build: Callable[["Context", random.Random], Request]
+    # Uses aggregation stages mongomock does not implement ($lookup with a pipeline)
+    mongod_only: bool = False
+
+
+class Context:
+    """The seeded fixture plus a bearer token per bench account, keyed by email."""
+
+    def __init__(self, fixture: Fixture, tokens: Dict[str, str]):
+        self.fixture = fixture
+        self.tokens = tokens
+        # Suppliers that own at least one shipment, so owned-shipment reads are authorized
+        self.owners = [supplier for supplier in fixture.suppliers if fixture.shipments_by_supplier.get(supplier.id)]
+        self.emails = {user.id: user.email for user in fixture.suppliers}
+
+    def supplier_shipment(self, rng: random.Random) -> Tuple[str, str]:
+        """A random (supplier email, shipment id) pair the supplier may read."""
+        supplier = rng.choice(self.owners)
+        return supplier.email, str(rng.choice(self.fixture.shipments_by_supplier[supplier.id]))
+
+    def tracked_shipment(self, rng: random.Random) -> Tuple[str, str]:
+        """Like ``supplier_shipment``, limited to shipments that have tracking events."""
+        supplier_id, shipment_id = rng.choice(self.fixture.tracked_shipments)
+        return self.emails[supplier_id], str(shipment_id)
+
+    def auth(self, email: str) -> dict:
+        return {'Authorization': f"Bearer {self.tokens[email]}"}
+
+
+def _as_supplier(build, tracked: bool = False):
+    """Build a request for a shipment owned by a random supplier, authorized as that supplier."""
+    def wrapper(ctx: Context, rng: random.Random) -> Request:
+        email, shipment_id = ctx.tracked_shipment(rng) if tracked else ctx.supplier_shipment(rng)
+        method, path, kwargs = build(shipment_id, rng)
+        kwargs.setdefault('headers', {}).update(ctx.auth(email))
+        return method, path, kwargs
+    return wrapper
+
+
+def _as(role: str, build):
+    def wrapper(ctx: Context, rng: random.Random) -> Request:
+        account = rng.choice(getattr(ctx.fixture, f"{role}s"))
+        method, path, kwargs = build(ctx, rng)
+        kwargs.setdefault('headers', {}).update(ctx.auth(account.email))
+        return method, path, kwargs
+    return wrapper
+
+
+def _upload_bytes(rng: random.Random) -> bytes:
+    # Distinct bytes per upload; identical files would all be extraction-cache hits
+    return PNG_BYTES + os.urandom(rng.randint(64, 4096))
+
+
+# Event statuses that are also valid Shipment statuses. Tracking writes copy the event
+# status onto the shipment, and any other value makes later shipment.save() calls fail
+# validation, which would turn unrelated scenarios into errors.
+WRITE_EVENT_STATUSES = ['booked', 'in_transit', 'delivered']
+
+
+def _port(rng: random.Random) -> str:
+    return rng.choice(PORTS)[0]
+
+
+SCENARIOS = [
+    # health
+    Scenario('health.root', 1, None, lambda ctx, rng: ('GET', '/', {})),
+    Scenario('health.health', 2, None, lambda ctx, rng: ('GET', '/health', {})),
+    # auth (bcrypt-bound by design, so it stays a small share of the mix)
+    Scenario('auth.login', 1, None, lambda ctx, rng: ('POST', '/api/auth/login', {
+        'json': {'email': rng.choice(ctx.fixture.suppliers).email, 'password': BENCH_PASSWORD}
+    })),
+    # user
+    Scenario('user.me', 4, 'supplier', _as('supplier', lambda ctx, rng: ('GET', '/api/me', {}))),
+    # shipments
+    Scenario('shipment.list', 12, 'supplier', _as('supplier', lambda ctx, rng: (
+        'GET', '/api/shipments/list', {'params': {'limit': 20}}
+    ))),
+    Scenario('shipment.get', 14, 'supplier', _as_supplier(lambda shipment_id, rng: (
+        'GET', f'/api/shipments/{shipment_id}', {}
+    ))),
+    Scenario('shipment.create', 3, 'supplier', _as('supplier', lambda ctx, rng: ('POST', '/api/shipments/create', {
+        'json': {
+            'origin_port': _port(rng), 'destination_port': _port(rng),
+            'weight': round(rng.uniform(1000, 20000), 1), 'volume': round(rng.uniform(5, 60), 1)
+        }
+    }))),
+    Scenario('shipment.accepted_quotes', 3, 'supplier', _as('supplier', lambda ctx, rng: (
+        'GET', '/api/shipments/showAcceptedQuotes', {}
+    ))),
+    # tracking
+    Scenario('tracking.history', 12, 'supplier', _as_supplier(lambda shipment_id, rng: (
+        'GET', f'/api/tracking/shipments/{shipment_id}', {}
+    ))),
+    Scenario('tracking.latest', 10, 'supplier', _as_supplier(lambda shipment_id, rng: (
+        'GET', f'/api/tracking/shipments/{shipment_id}/events/latest', {}
+    ), tracked=True)),
+    # Writes target shipments already in transit, leaving open ones to forwarder.request_accept
+    Scenario('tracking.create_event', 4, 'forwarder', _as('forwarder', lambda ctx, rng: (
+        'POST', f'/api/tracking/shipments/{ctx.tracked_shipment(rng)[1]}/events', {'json': {
+            'status': rng.choice(WRITE_EVENT_STATUSES), 'location': _port(rng), 'description': 'Benchmark tracking update'
+        }}
+    ))),
+    Scenario('tracking.bulk_events', 1, 'forwarder', _as('forwarder', lambda ctx, rng: (
+        'POST', '/api/tracking/events/bulk', {'json': {'events': [{
+            'shipment_id': ctx.tracked_shipment(rng)[1], 'status': rng.choice(WRITE_EVENT_STATUSES),
+            'location': _port(rng), 'description': 'Benchmark bulk update'
+        } for _ in range(50)]}}
+    ))),
+    # documents
+    Scenario('document.list', 6, 'supplier', _as_supplier(lambda shipment_id, rng: (
+        'GET', f'/api/documents/shipments/{shipment_id}/list', {}
+    ))),
+    Scenario('document.invoice', 3, 'supplier', _as_supplier(lambda shipment_id, rng: (
+        'GET', f'/api/documents/shipments/{shipment_id}/invoice', {}
+    ))),
+    Scenario('document.get', 4, 'supplier', _as('supplier', lambda ctx, rng: (
+        'GET', f'/api/documents/{rng.choice(ctx.fixture.document_ids)}', {}
+    ))),
+    Scenario('document.content', 2, 'supplier', _as('supplier', lambda ctx, rng: (
+        'GET', f'/api/documents/{rng.choice(ctx.fixture.document_ids)}/content', {}
+    ))),
+    Scenario('document.upload', 1, 'supplier', _as_supplier(lambda shipment_id, rng: (
+        'POST', f'/api/documents/shipments/{shipment_id}/upload', {
+            'files': {'file': ('packing.png', _upload_bytes(rng), 'image/png')}, 'data': {'document_type': 'packing_list'}
+        }
+    ))),
+    Scenario('document.upload_invoice', 1, 'supplier', _as_supplier(lambda shipment_id, rng: (
+        'POST', '/api/documents/uploadInvoice', {
+            'files': {'file': ('invoice.png', _upload_bytes(rng), 'image/png')}, 'data': {'shipment_id': shipment_id}
+        }
+    ))),
+    # quotes
+    Scenario('quote.list', 4, 'supplier', _as_supplier(lambda shipment_id, rng: (
+        'GET', f'/api/quotes/shipments/{shipment_id}/quotes', {}
+    ))),
+    # forwarder
+    Scenario('forwarder.show_shipments', 2, 'forwarder', _as('forwarder', lambda ctx, rng: (
+        'GET', '/api/forwarder/show-shipments', {}
+    ))),
+    Scenario('forwarder.profile', 2, 'forwarder', _as('forwarder', lambda ctx, rng: (
+        'GET', '/api/forwarder/my-profile', {}
+    ))),
+    Scenario('forwarder.accepted_quotes', 4, 'forwarder', _as('forwarder', lambda ctx, rng: (
+        'GET', '/api/forwarder/accepted-quotes', {}
+    )), mongod_only=True),
+    Scenario('forwarder.show_drivers', 1, 'forwarder', _as('forwarder', lambda ctx, rng: (
+        'GET', '/api/forwarder/show-drivers', {}
+    ))),
+    Scenario('forwarder.request_accept', 1, 'forwarder', _as('forwarder', lambda ctx, rng: (
+        'PUT', f'/api/forwarder/request-accept/{rng.choice(ctx.fixture.open_shipment_ids)}', {
+            'json': {'quote_amount': round(rng.uniform(1500, 4200), 2)}
+        }
+    ))),
+    # driver
+    Scenario('driver.profile', 1, 'driver', _as('driver', lambda ctx, rng: ('GET', '/api/driver/my-profile', {}))),
+    Scenario('driver.my_shipments', 3, 'driver', _as('driver', lambda ctx, rng: (
+        'GET', '/api/driver/my-shipments', {}
+    ))),
+    # carriers and customs (AI-backed endpoints hit the Gemini stub)
+    Scenario('carrier.schedule_search', 2, 'supplier', _as('supplier', lambda ctx, rng: (
+        'GET', '/api/carriers/schedule/search', {'params': {'origin': _port(rng), 'destination': _port(rng)}}
+    ))),
+    Scenario('carrier.predict_rate', 2, 'supplier', _as('supplier', lambda ctx, rng: (
+        'POST', '/api/carriers/ai/rates/predict', {'json': {
+            'origin': _port(rng), 'destination': _port(rng), 'carrier': rng.choice(['MSC', 'MAERSK', 'CMA CGM']),
+            'containerType': rng.choice(['20GP', '40GP', '40HC']), 'currentRateUSD': round(rng.uniform(1500, 4200), 2)
+        }}
+    ))),
+    Scenario('customs.clearance_status', 1, 'supplier', _as_supplier(lambda shipment_id, rng: (
+        'GET', f'/api/customs/clearance/status/{shipment_id}', {}
+    ))),
+    Scenario('customs.predict_delay', 2, 'supplier', _as('supplier', lambda ctx, rng: (
+        'POST', '/api/customs/ai/prediction', {'json': {
+            'port': _port(rng), 'rmsExamination': rng.random() < 0.3,
+            'dutyAmount': round(rng.uniform(500, 20000), 2), 'documentsComplete': rng.random() < 0.8
+        }}
+    ))),
+]
+
+# Named subsets for focused runs: ``--scenario reads`` etc.
+GROUPS = {
+    'all': lambda scenario: True,
+    'reads': lambda scenario: not any(
+        verb in scenario.name for verb in ('create', 'bulk', 'upload', 'request_accept', 'login', 'predict')
+    ),
+    'writes': lambda scenario: any(verb in scenario.name for verb in ('create', 'bulk', 'request_accept')),
+    'uploads': lambda scenario: 'upload' in scenario.name,
+    'ai': lambda scenario: 'predict' in scenario.name or 'upload' in scenario.name,
+}
+
+
+def select(names) -> list:
+    """Scenarios matching any of ``names``, each a group name, scenario name or blueprint prefix."""
+    selected = []
+    for scenario in SCENARIOS:
+        for name in names:
+            if (name in GROUPS and GROUPS[name](scenario)) or scenario.name == name \
+                    or scenario.name.startswith(f"{name}."):
+                selected.append(scenario)
+                break
+    return selected
@@ -0,0 +1,204 @@
+"""Seed a benchmark database with realistic volumes.
+
+Writes go straight to the collections with ``insert_many`` so seeding tens of
+thousands of rows takes seconds; documents are still built through the
+models, so defaults and field names match what the API writes.
+"""
+import io
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from bson import ObjectId
+
+from app.models.document import DocumentModel
+from app.models.driver import Driver
+from app.models.quote import Quote
+from app.models.shipment import LatestTrackingEvent, Shipment
+from app.models.tracking_event import TrackingEvent
+from app.models.user import User
+from app.utils.auth import hash_password
+
+BENCH_PASSWORD = 'bench-password'
+
+PORTS = [
+    ('INMAA', 13.08, 80.27), ('INNSA', 18.95, 72.95), ('NLRTM', 51.95, 4.14), ('DEHAM', 53.54, 9.98),
+    ('SGSIN', 1.26, 103.84), ('CNSHA', 31.23, 121.47), ('USLAX', 33.74, -118.27), ('AEJEA', 25.01, 55.06)
+]
+EVENT_FLOW = ['booked', 'gate_in', 'vessel_departed', 'in_transit', 'port_arrival', 'customs_clearance', 'gate_out', 'delivered']
+MILESTONES = {'booked', 'vessel_departed', 'port_arrival', 'delivered'}
+
+# 1x1 PNG; uploads append random bytes so the extraction cache does not absorb every call
+PNG_BYTES = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000100e221bc330000000049454e44ae426082'
+)
+
+
+@dataclass
+class Volumes:
+    suppliers: int = 50
+    forwarders: int = 20
+    buyers: int = 30
+    drivers: int = 20
+    shipments: int = 2000
+    events_per_shipment: int = 12
+    quotes_per_shipment: int = 3
+    documents_per_shipment: int = 2
+
+
+@dataclass
+class Fixture:
+    suppliers: List[User] = field(default_factory=list)
+    forwarders: List[User] = field(default_factory=list)
+    buyers: List[User] = field(default_factory=list)
+    drivers: List[Driver] = field(default_factory=list)
+    # supplier id -> that supplier's shipment ids, for requests that must be authorized
+    shipments_by_supplier: Dict[ObjectId, List[ObjectId]] = field(default_factory=dict)
+    open_shipment_ids: List[ObjectId] = field(default_factory=list)
+    # (supplier id, shipment id) for shipments with tracking history
+    tracked_shipments: List[Tuple[ObjectId, ObjectId]] = field(default_factory=list)
+    document_ids: List[ObjectId] = field(default_factory=list)
+    quote_ids: List[ObjectId] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+
+def _insert(model, documents, batch_size: int = 5000):
+    collection = model._get_collection()
+    for start in range(0, len(documents), batch_size):
+        collection.insert_many([document.to_mongo() for document in documents[start:start + batch_size]], ordered=False)
+
+
+def _users(role: str, count: int, hashed_password: str) -> List[User]:
+    return [User(
+        id=ObjectId(),
+        email=f"{role}{i}@bench.tradeflow.test",
+        hashed_password=hashed_password,
+        name=f"Bench {role.title()} {i}",
+        company_name=f"{role.title()} Logistics {i}",
+        phone=f"+9198{i:08d}",
+        role=role,
+        is_verified=True
+    ) for i in range(count)]
+
+
+def _shipment_status(progress: int) -> str:
+    if progress <= 1:
+        return 'booked'
+    return 'delivered' if progress == len(EVENT_FLOW) else 'in_transit'
+
+
+def seed(volumes: Volumes, rng: random.Random) -> Fixture:
+    # bcrypt is deliberately slow; every bench account shares one hash
+    hashed_password = hash_password(BENCH_PASSWORD)
+    fixture = Fixture(
+        suppliers=_users('supplier', volumes.suppliers, hashed_password),
+        forwarders=_users('forwarder', volumes.forwarders, hashed_password),
+        buyers=_users('buyer', volumes.buyers, hashed_password)
+    )
+    fixture.drivers = [Driver(
+        id=ObjectId(), username=f"driver{i}", email=f"driver{i}@bench.tradeflow.test",
+        phone=f"+9197{i:08d}", hashed_password=hashed_password
+    ) for i in range(volumes.drivers)]
+    _insert(User, fixture.suppliers + fixture.forwarders + fixture.buyers)
+    _insert(Driver, fixture.drivers)
+
+    now = datetime.utcnow().replace(microsecond=0)
+    shipments, events, quotes, documents = [], [], [], []
+    for i in range(volumes.shipments):
+        supplier = rng.choice(fixture.suppliers)
+        (origin, origin_lat, origin_lng), (destination, destination_lat, destination_lng) = rng.sample(PORTS, 2)
+        created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 120))
+        # A fifth of shipments are still open for quotes; the rest are somewhere along EVENT_FLOW
+        progress = 0 if rng.random() < 0.2 else rng.randint(1, len(EVENT_FLOW))
+        forwarder = rng.choice(fixture.forwarders) if progress else None
+        shipment = Shipment(
+            id=ObjectId(),
+            shipment_number=f"SHB{i:08d}",
+            supplier_id=supplier,
+            buyer_id=rng.choice(fixture.buyers),
+            forwarder_id=forwarder,
+            quote_forwarder_id=forwarder,
+            quote_status='accepted' if forwarder else 'pending',
+            quote_amount=round(rng.uniform(1500, 4200), 2) if forwarder else None,
+            assigned_driver_id=rng.choice(fixture.drivers) if forwarder and fixture.drivers else None,
+            origin_port=origin, destination_port=destination,
+            origin_latitude=origin_lat, origin_longitude=origin_lng,
+            destination_latitude=destination_lat, destination_longitude=destination_lng,
+            incoterm=rng.choice(['FOB', 'CIF', 'EXW', 'DAP']),
+            cargo_type='FCL', container_type=rng.choice(['20GP', '40GP', '40HC']),
+            container_qty=rng.randint(1, 4),
+            goods_description='Cotton garments', hs_code='620342',
+            gross_weight_kg=round(rng.uniform(2000, 24000), 1), volume_cbm=round(rng.uniform(10, 70), 1),
+            preferred_etd=created_at + timedelta(days=7), preferred_eta=created_at + timedelta(days=35),
+            status=_shipment_status(progress) if forwarder else rng.choice(['draft', 'pending_quote']),
+            metadata={'source': 'benchmark'},
+            created_at=created_at, updated_at=created_at
+        )
+        if not forwarder:
+            fixture.open_shipment_ids.append(shipment.id)
+        fixture.shipments_by_supplier.setdefault(supplier.id, []).append(shipment.id)
+
+        event_count = min(volumes.events_per_shipment, progress * 2) if forwarder else 0
+        for n in range(event_count):
+            status = EVENT_FLOW[min(n * len(EVENT_FLOW) // max(event_count, 1), len(EVENT_FLOW) - 1)]
+            event = TrackingEvent(
+                id=ObjectId(), shipment_id=shipment, created_by=forwarder, status=status,
+                location=rng.choice(PORTS)[0], vessel_name='MSC Aurora', voyage_number=f"FA{rng.randint(100, 999)}E",
+                container_number=f"MSCU{rng.randint(1000000, 9999999)}", description=f"{status.replace('_', ' ')} update",
+                is_milestone=status in MILESTONES, timestamp=created_at + timedelta(hours=6 * (n + 1)),
+                updated_at=created_at + timedelta(hours=6 * (n + 1))
+            )
+            events.append(event)
+            shipment.latest_event = LatestTrackingEvent(
+                event_id=event.id, status=event.status, location=event.location, description=event.description,
+                vessel_name=event.vessel_name, voyage_number=event.voyage_number,
+                container_number=event.container_number, is_milestone=event.is_milestone, timestamp=event.timestamp
+            )
+
+        for _ in range(volumes.quotes_per_shipment if not forwarder else 1):
+            amount = round(rng.uniform(1500, 4200), 2)
+            quote = Quote(
+                id=ObjectId(), shipment_id=shipment, forwarder_id=forwarder or rng.choice(fixture.forwarders),
+                freight_amount_usd=amount, total_amount_usd=round(amount * 1.12, 2),
+                validity_date=now + timedelta(days=14), transit_time_days=rng.randint(18, 40),
+                container_type=shipment.container_type, container_quantity=shipment.container_qty,
+                status='accepted' if forwarder else 'pending', created_at=created_at
+            )
+            quotes.append(quote)
+            fixture.quote_ids.append(quote.id)
+
+        for n in range(volumes.documents_per_shipment):
+            document = DocumentModel(
+                id=ObjectId(), shipment_id=shipment, uploaded_by=supplier,
+                type='invoice' if n == 0 else rng.choice(['packing_list', 'bill_of_lading', 'certificate_of_origin']),
+                file_name=f"{shipment.shipment_number}-{n}.png",
+                file_url=f"https://storage.invalid/{shipment.shipment_number}/{n}.png",
+                file_size=len(PNG_BYTES), mime_type='image/png',
+                extracted_data=dict(rng.choice([{}, {'invoice_number': f"INV-{i}", 'total_amount': 1000.0 + i}])),
+                confidence_score=round(rng.uniform(0.6, 0.98), 2), extraction_method='gemini-1.5-flash',
+                created_at=created_at, updated_at=created_at
+            )
+            if n == 0:
+                document.file_blob.put(io.BytesIO(PNG_BYTES), content_type='image/png', filename=document.file_name)
+            documents.append(document)
+            fixture.document_ids.append(document.id)
+
+        if event_count:
+            fixture.tracked_shipments.append((supplier.id, shipment.id))
+        shipments.append(shipment)
+
+    _insert(Shipment, shipments)
+    _insert(TrackingEvent, events)
+    _insert(Quote, quotes)
+    _insert(DocumentModel, documents)
+    fixture.counts = {
+        'users': volumes.suppliers + volumes.forwarders + volumes.buyers,
+        'drivers': len(fixture.drivers),
+        'shipments': len(shipments),
+        'tracking_events': len(events),
+        'quotes': len(quotes),
+        'documents': len(documents)
+    }
+    return fixture
@@ -0,0 +1,134 @@
+"""Compare the Document ``to_dict`` path with the raw ``as_pymongo()`` path.
+
+Runs without a database: rows are synthetic BSON documents shaped like the
+ones ``/api/shipments/list`` and the tracking history read.
+
+    python -m benchmarks.serialization --rows 200 --repeat 50
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app.models.shipment import Shipment
+from app.models.tracking_event import TrackingEvent
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def make_shipment_rows(count):
+    now = datetime.utcnow().replace(microsecond=0)
+    rows = []
+    for i in range(count):
+        rows.append({
+            '_id': ObjectId(),
+            'shipment_number': f"SHP{i:08d}",
+            'supplier_id': ObjectId(),
+            'buyer_id': ObjectId(),
+            'forwarder_id': ObjectId() if i % 2 else None,
+            'origin_port': 'INMAA',
+            'destination_port': 'NLRTM',
+            'origin_latitude': 13.08,
+            'origin_longitude': 80.27,
+            'incoterm': 'FOB',
+            'cargo_type': 'FCL',
+            'container_type': '40HC',
+            'container_qty': 2,
+            'goods_description': 'Cotton garments',
+            'hs_code': '620342',
+            'gross_weight_kg': 12000 + i,
+            'volume_cbm': 66.5,
+            'total_packages': 400,
+            'preferred_etd': now + timedelta(days=7),
+            'preferred_eta': now + timedelta(days=30),
+            'declared_value_usd': 85000,
+            'insurance_required': bool(i % 3),
+            'status': random.choice(['booked', 'in_transit', 'delivered']),
+            'quote_forwarder_id': ObjectId() if i % 4 == 0 else None,
+            'quote_amount': 2400.0,
+            'quote_status': 'pending',
+            'latest_event': {
+                'event_id': ObjectId(),
+                'status': 'in_transit',
+                'location': 'Colombo',
+                'is_milestone': True,
+                'timestamp': now
+            },
+            'created_at': now - timedelta(minutes=i),
+            'updated_at': now
+        })
+    return rows
+
+
+def make_event_rows(count):
+    now = datetime.utcnow().replace(microsecond=0)
+    shipment_id = ObjectId()
+    return [{
+        '_id': ObjectId(),
+        'shipment_id': shipment_id,
+        'created_by': ObjectId(),
+        'status': 'in_transit',
+        'location': f"Waypoint {i}",
+        'vessel_name': 'MSC Aurora',
+        'voyage_number': 'FA412E',
+        'description': 'Vessel position update',
+        'documents': [],
+        'is_milestone': i % 10 == 0,
+        'timestamp': now - timedelta(hours=i)
+    } for i in range(count)]
+
+
+def document_path(rows, serialize):
+    return json.dumps([serialize(row) for row in rows], default=str, sort_keys=True,
+                      separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def raw_path(rows, serialize):
+    return orjson.dumps([serialize(row) for row in rows], option=orjson.OPT_SORT_KEYS)
+
+
+def measure(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    if orjson is None:
+        raise SystemExit("orjson is not installed")
+
+    cases = [
+        ('shipments', make_shipment_rows(args.rows),
+         lambda row: Shipment._from_son(row).to_dict(include_metadata=False),
+         lambda row: Shipment.raw_to_dict(row, include_metadata=False)),
+        ('tracking_events', make_event_rows(args.rows),
+         lambda row: TrackingEvent._from_son(row).to_dict(),
+         TrackingEvent.raw_to_dict)
+    ]
+    for name, rows, to_dict, raw_to_dict in cases:
+        expected = document_path(rows, to_dict)
+        actual = raw_path(rows, raw_to_dict)
+        if expected != actual:
+            raise SystemExit(f"{name}: raw output differs from to_dict output")
+
+        document_ms = measure(lambda: document_path(rows, to_dict), args.repeat)
+        raw_ms = measure(lambda: raw_path(rows, raw_to_dict), args.repeat)
+        print(f"{name:16} rows={args.rows:<6} to_dict+json={document_ms:8.2f}ms  "
+              f"raw+orjson={raw_ms:8.2f}ms  speedup={document_ms / raw_ms:5.1f}x  bytes={len(actual)}")
+
+
+if __name__ == '__main__':
+    main()
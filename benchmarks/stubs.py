@@ -0,0 +1,140 @@
+"""Local stand-ins for Gemini and Supabase storage with configurable latency.
+
+Gemini is replaced in-process (``google.generativeai.GenerativeModel``);
+storage is a real HTTP server on localhost so ``StorageService`` still goes
+through its pooled session, retries and resumable uploads.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+
+class Latency:
+    def __init__(self, mean_ms: float, jitter_ms: float = 0.0, error_rate: float = 0.0):
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+
+    def sleep(self):
+        delay_ms = max(0.0, random.gauss(self.mean_ms, self.jitter_ms)) if self.jitter_ms else self.mean_ms
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+EXTRACTED_INVOICE = {
+    "invoice_number": "INV-2025-0142",
+    "invoice_date": "2025-01-15",
+    "seller_name": "Coimbatore Cotton Mills Pvt Ltd",
+    "buyer_name": "Rotterdam Apparel BV",
+    "currency": "USD",
+    "total_amount": 48250.0,
+    "hs_code": "620342",
+    "gross_weight_kg": 11850,
+    "net_weight_kg": 11200,
+    "total_packages": 420,
+    "package_type": "cartons",
+    "port_of_loading": "INMAA",
+    "port_of_discharge": "NLRTM",
+    "incoterm": "FOB",
+    "goods_description": "Men's cotton trousers"
+}
+
+
+def _reply(prompt: str) -> str:
+    if 'freight rate' in prompt:
+        return json.dumps({
+            "predictedRateUSD": round(random.uniform(1800, 3200), 2),
+            "trend": random.choice(["UP", "DOWN", "STABLE"]),
+            "confidenceScore": 0.78,
+            "recommendation": "Book within the next two weeks"
+        })
+    if 'customs clearance' in prompt:
+        return json.dumps({
+            "delayRisk": random.choice(["LOW", "MEDIUM", "HIGH"]),
+            "predictedDelayDays": random.randint(0, 6),
+            "confidenceScore": 0.72,
+            "reasons": ["Port congestion", "Examination likelihood"],
+            "recommendation": "File the bill of entry before arrival"
+        })
+    if 'determine its type' in prompt:
+        return "invoice|0.93"
+    return "```json\n" + json.dumps(EXTRACTED_INVOICE) + "\n```"
+
+
+class StubGenerativeModel:
+    latency = Latency(0)
+
+    def __init__(self, model_name, *args, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, contents, *args, **kwargs):
+        self.latency.sleep()
+        if self.latency.should_fail():
+            raise RuntimeError("stub Gemini error")
+        prompt = contents if isinstance(contents, str) else contents[0]
+        return SimpleNamespace(text=_reply(prompt))
+
+
+def install_gemini_stub(latency: Latency):
+    import google.generativeai as genai
+
+    StubGenerativeModel.latency = latency
+    genai.configure = lambda *args, **kwargs: None
+    genai.GenerativeModel = StubGenerativeModel
+
+
+class _StorageHandler(BaseHTTPRequestHandler):
+    latency = Latency(0)
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _drain(self) -> int:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        return length
+
+    def _send(self, status: int, body: bytes = b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _handle(self):
+        received = self._drain()
+        self.latency.sleep()
+        if self.latency.should_fail():
+            return self._send(503, b'{"error":"stub unavailable"}')
+        if self.command == 'POST' and self.path.startswith('/storage/v1/upload/resumable'):
+            location = f"http://{self.headers['Host']}/storage/v1/upload/resumable/{random.getrandbits(64):x}"
+            return self._send(201, headers={'Location': location, 'Tus-Resumable': '1.0.0'})
+        if self.command == 'PATCH':
+            offset = int(self.headers.get('Upload-Offset', 0)) + received
+            return self._send(204, headers={'Upload-Offset': str(offset), 'Tus-Resumable': '1.0.0'})
+        if self.command == 'HEAD':
+            return self._send(200, headers={'Upload-Offset': '0'})
+        if self.command == 'POST' and '/object/sign/' in self.path:
+            return self._send(200, json.dumps({'signedURL': '/object/sign/stub?token=bench'}).encode())
+        return self._send(200, b'{"Key":"stub"}', {'Content-Type': 'application/json'})
+
+    do_GET = do_PUT = do_POST = do_PATCH = do_HEAD = do_DELETE = _handle
+
+
+def start_storage_stub(latency: Latency) -> str:
+    """Serve the Supabase storage API on a free localhost port and return its base URL."""
+    handler = type('StorageHandler', (_StorageHandler,), {'latency': latency})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='storage-stub', daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
@@ -0,0 +1,153 @@
+"""Shared fixtures: the app on an in-memory mongomock database, users and tokens.
+
+Config is read at import time, so the environment is set before anything
+under ``app`` is imported.
+"""
+import functools
+import os
+from types import SimpleNamespace
+
+os.environ.update({
+    'MONGODB_URI': 'mongodb://localhost',
+    'MONGODB_DB_NAME': 'tradeflow_test',
+    'SUPABASE_URL': 'http://127.0.0.1:9',
+    'SUPABASE_SERVICE_ROLE_KEY': 'test-service-role-key',
+    'STORAGE_BUCKET': 'test',
+    'GEMINI_API_KEY': '',
+    'LOG_LEVEL': 'WARNING',
+    'LOG_ACCESS_ENABLED': 'False',
+    'QUERY_PROFILER_ENABLED': 'True',
+    'TRACKING_CHANGE_STREAM_ENABLED': 'False',
+    'AI_WARMUP_ENABLED': 'False',
+    'EXTRACTION_WORKER_IN_PROCESS': 'False',
+})
+
+import mongoengine  # noqa: E402
+import mongomock  # noqa: E402
+import mongomock.gridfs  # noqa: E402
+import pytest  # noqa: E402
+
+# mongomock -> the command name and body pymongo would send, for the query profiler
+_COMMANDS = {
+    'find': lambda args, kwargs: ('find', {'filter': _arg(args, kwargs, 'filter', 0) or {}}),
+    'find_one': lambda args, kwargs: ('find', {'filter': _arg(args, kwargs, 'filter', 0) or {}}),
+    'aggregate': lambda args, kwargs: ('aggregate', {'pipeline': _arg(args, kwargs, 'pipeline', 0) or []}),
+    'count_documents': lambda args, kwargs: ('aggregate', {'pipeline': [{'$match': _arg(args, kwargs, 'filter', 0) or {}}]}),
+    'estimated_document_count': lambda args, kwargs: ('count', {'query': {}}),
+    'distinct': lambda args, kwargs: ('distinct', {'query': _arg(args, kwargs, 'filter', 1) or {}}),
+    'insert_one': lambda args, kwargs: ('insert', {}),
+    'insert_many': lambda args, kwargs: ('insert', {}),
+    'update_one': lambda args, kwargs: ('update', {'updates': [{'q': _arg(args, kwargs, 'filter', 0) or {}}]}),
+    'update_many': lambda args, kwargs: ('update', {'updates': [{'q': _arg(args, kwargs, 'filter', 0) or {}}]}),
+    'replace_one': lambda args, kwargs: ('update', {'updates': [{'q': _arg(args, kwargs, 'filter', 0) or {}}]}),
+    'bulk_write': lambda args, kwargs: ('update', {}),
+    'delete_one': lambda args, kwargs: ('delete', {'deletes': [{'q': _arg(args, kwargs, 'filter', 0) or {}}]}),
+    'delete_many': lambda args, kwargs: ('delete', {'deletes': [{'q': _arg(args, kwargs, 'filter', 0) or {}}]}),
+    'find_one_and_update': lambda args, kwargs: ('findAndModify', {'query': _arg(args, kwargs, 'filter', 0) or {}}),
+    'find_one_and_replace': lambda args, kwargs: ('findAndModify', {'query': _arg(args, kwargs, 'filter', 0) or {}}),
+    'find_one_and_delete': lambda args, kwargs: ('findAndModify', {'query': _arg(args, kwargs, 'filter', 0) or {}}),
+}
+_depth = SimpleNamespace(value=0)
+
+
+def _arg(args, kwargs, name, position):
+    return kwargs[name] if name in kwargs else (args[position] if len(args) > position else None)
+
+
+def _publish_commands():
+    """mongomock publishes no command events; feed the profiler listener the ones pymongo would.
+
+    Nested calls (``find_one`` delegating to ``find``) count once, like the single
+    command the driver sends.
+    """
+    from app.utils import query_profiler
+
+    def wrap(name, method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if _depth.value == 0 and query_profiler._listener is not None:
+                command_name, command = _COMMANDS[name](args, kwargs)
+                command[command_name] = self.name
+                query_profiler._listener.started(SimpleNamespace(command_name=command_name, command=command))
+            _depth.value += 1
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                _depth.value -= 1
+        return wrapper
+
+    for name in _COMMANDS:
+        setattr(mongomock.collection.Collection, name, wrap(name, getattr(mongomock.collection.Collection, name)))
+
+
+@pytest.fixture(scope='session')
+def app():
+    import app as app_package
+
+    mongomock.gridfs.enable_gridfs_integration()
+    app_package.connect = functools.partial(mongoengine.connect, mongo_client_class=mongomock.MongoClient)
+    flask_app = app_package.create_app()
+    flask_app.config['TESTING'] = True
+    _publish_commands()
+    return flask_app
+
+
+@pytest.fixture(autouse=True)
+def clean_db(app):
+    from app.utils.identity_cache import identity_cache
+
+    yield
+    # Users are recreated with the same emails, so cached identities would point at deleted ids
+    identity_cache.clear()
+    db = mongoengine.get_db()
+    for name in db.list_collection_names():
+        db.drop_collection(name)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def _make_user(role, name):
+    from app.models.user import User
+    from app.utils.auth import hash_password
+
+    return User(email=f'{name}@example.com', hashed_password=hash_password('password'), name=name.title(),
+                company_name=f'{name.title()} Ltd', role=role).save()
+
+
+@pytest.fixture
+def supplier(app):
+    return _make_user('supplier', 'supplier')
+
+
+@pytest.fixture
+def forwarder(app):
+    return _make_user('forwarder', 'forwarder')
+
+
+@pytest.fixture
+def auth_headers(app):
+    from app.utils.auth import create_token
+
+    def headers(user):
+        with app.app_context():
+            return {'Authorization': f"Bearer {create_token(user)['access_token']}"}
+    return headers
+
+
+@pytest.fixture
+def make_shipment(supplier):
+    from app.models.shipment import Shipment
+
+    counter = iter(range(1, 100000))
+
+    def make(**fields):
+        fields.setdefault('shipment_number', f'SHP-TEST-{next(counter):05d}')
+        fields.setdefault('supplier_id', supplier)
+        fields.setdefault('origin_port', 'INNSA')
+        fields.setdefault('destination_port', 'NLRTM')
+        fields.setdefault('container_type', '40HC')
+        return Shipment(**fields).save()
+    return make
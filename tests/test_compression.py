@@ -0,0 +1,33 @@
+import pytest
+from flask import Response
+
+from app.config import Config
+from app.utils.compression import compress_response
+
+
+def respond(app, body, status=200, **headers):
+    response = Response(body, status=status, mimetype='application/json')
+    response.set_etag('v1')
+    with app.test_request_context(headers=dict({'Accept-Encoding': 'gzip'}, **headers)):
+        return compress_response(response)
+
+
+def test_small_response_keeps_a_strong_etag(app):
+    response = respond(app, '{}')
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['ETag'] == '"v1"'
+
+
+def test_compressed_response_gets_a_weak_etag(app):
+    response = respond(app, '[' + '0,' * Config.COMPRESSION_MIN_SIZE + '0]')
+
+    assert response.headers['Content-Encoding'] in ('br', 'gzip')
+    assert response.headers['ETag'] == 'W/"v1"'
+
+
+@pytest.mark.parametrize('held, repeated', [('"v1"', '"v1"'), ('W/"v1"', 'W/"v1"')])
+def test_not_modified_repeats_the_validator_the_client_holds(app, held, repeated):
+    response = respond(app, b'', status=304, **{'If-None-Match': held})
+
+    assert response.headers['ETag'] == repeated
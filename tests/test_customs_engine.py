@@ -0,0 +1,64 @@
+import threading
+import time
+
+from app.config import Config
+from app.services.customs_engine import DEFAULT_CLEARANCE_DAYS, CustomsEngine
+
+ITEM = {'port': 'INNSA', 'rms_examination': False, 'duty_amount': 0, 'documents_complete': True}
+BATCH_BODY = {'shipments': [{'port': 'INNSA', 'rmsExamination': False, 'dutyAmount': 0, 'documentsComplete': True,
+                             'shipmentId': 'S-1'}]}
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_first_batch_does_not_wait_for_training():
+    engine = CustomsEngine()
+    training_started = threading.Event()
+    release = threading.Event()
+    trainings = []
+
+    def slow_observations():
+        trainings.append(threading.current_thread().name)
+        training_started.set()
+        release.wait(5)
+        return {}, []
+
+    engine._observations = slow_observations
+    try:
+        # Answered from the network defaults while training is blocked
+        predictions = engine.predict_batch([ITEM, dict(ITEM, port='NLRTM', rms_examination=True)])
+        assert training_started.wait(5)
+        engine.predict_batch([ITEM])
+    finally:
+        release.set()
+
+    assert [prediction['sampleSize'] for prediction in predictions] == [0, 0]
+    assert predictions[0]['predictedDelayDays'] >= DEFAULT_CLEARANCE_DAYS
+    assert predictions[1]['holdProbability'] > predictions[0]['holdProbability']
+    wait_for(lambda: engine.stats()['trained_at'] is not None)
+    # The second call found training under way and did not start another
+    assert trainings == ['customs-engine-train']
+
+
+def test_untrained_port_prediction_defers_to_gemini():
+    engine = CustomsEngine()
+    engine._observations = lambda: ({}, [])
+
+    assert engine.predict('INNSA', False, 0, True) is None
+
+
+def test_batch_endpoint_falls_back_per_item_when_engine_disabled(client, supplier, auth_headers, monkeypatch):
+    monkeypatch.setattr(Config, 'CUSTOMS_ENGINE_ENABLED', False)
+
+    response = client.post('/api/customs/ai/prediction/batch', headers=auth_headers(supplier), json=BATCH_BODY)
+
+    assert response.status_code == 200
+    prediction, = response.get_json()['predictions']
+    assert prediction['reasons'] == ["Local customs engine disabled"]
+    assert prediction['shipmentId'] == 'S-1'
+    assert 'source' not in prediction
@@ -0,0 +1,42 @@
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_options_header
+
+from app.controllers.document_controller import inline_disposition
+
+
+def test_disposition_escapes_quotes_and_drops_line_breaks():
+    value = inline_disposition('inv"oice\r\nSet-Cookie: a=b.pdf')
+
+    assert '\r' not in value and '\n' not in value
+    assert parse_options_header(value) == ('inline', {'filename': 'inv"oiceSet-Cookie: a=b.pdf'})
+    # Werkzeug refuses header values with line breaks; this one is accepted
+    Headers().set('Content-Disposition', value)
+
+
+def test_disposition_encodes_non_ascii_names():
+    value = inline_disposition('चालान ₹ invoice.pdf')
+
+    assert value.encode('latin-1')
+    assert parse_options_header(value)[1]['filename'] == 'चालान ₹ invoice.pdf'
+
+
+def test_documents_without_updated_at_keep_their_validators(client, supplier, auth_headers, make_shipment):
+    from datetime import datetime
+
+    from bson import ObjectId
+
+    from app.models.document import DocumentModel
+
+    shipment = make_shipment()
+    # A row from before save() stamped updated_at
+    document_id = DocumentModel._get_collection().insert_one({
+        '_id': ObjectId(), 'shipment_id': shipment.id, 'uploaded_by': supplier.id, 'type': 'invoice',
+        'file_name': 'invoice.pdf', 'file_url': '/invoice.pdf', 'created_at': datetime(2025, 1, 2, 3, 4, 5)
+    }).inserted_id
+
+    for url in (f'/api/documents/{document_id}', f'/api/documents/shipments/{shipment.id}/list'):
+        first = client.get(url, headers=auth_headers(supplier))
+        second = client.get(url, headers=auth_headers(supplier))
+        assert first.status_code == second.status_code == 200
+        assert first.headers['ETag'] == second.headers['ETag']
+        assert first.headers.get('Last-Modified') == second.headers.get('Last-Modified')
@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+from app.models.document import ExtractionCacheEntry
+from app.services import ai_service as ai_service_module
+from app.services.ai_service import AIService
+from app.services.extraction_cache import extraction_cache
+
+
+def test_cache_is_keyed_on_the_resolved_model_and_reports_saved_time(app, tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(ai_service_module.ai_client, 'get_model', lambda preferred: ('model', 'gemini-pro'))
+
+    def generate(method, model, contents, timeout=None):
+        calls.append(method)
+        return SimpleNamespace(text='{"invoice_number": "INV-1", "total_amount": 100}')
+
+    monkeypatch.setattr(ai_service_module.ai_client, 'generate', generate)
+    file_path = tmp_path / 'invoice.pdf'
+    file_path.write_bytes(b'%PDF-1.4 invoice')
+
+    first = AIService()
+    first.enabled = True
+    data, _, method = first.extract_document_data(str(file_path), 'invoice')
+
+    assert (method, first.cache_saved_ms) == ('gemini-pro', None)
+    entry = ExtractionCacheEntry.objects.get()
+    assert entry.model_name == 'gemini-pro'
+    assert entry.fingerprint == extraction_cache.fingerprint(first._get_extraction_prompt('invoice'), 'gemini-pro')
+
+    second = AIService()
+    second.enabled = True
+    cached_data, _, cached_method = second.extract_document_data(str(file_path), 'invoice')
+
+    assert (cached_data, cached_method) == (data, 'cache:gemini-pro')
+    assert second.cache_saved_ms == entry.processing_time_ms
+    assert calls == ['extract_document_data']
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+import pytest
+
+from app.models.document import DocumentModel, ExtractionJob
+from app.services import extraction_worker
+from app.services.extraction_worker import ExtractionWorkerPool
+
+
+@pytest.fixture
+def claimed(make_shipment, supplier):
+    document = DocumentModel(shipment_id=make_shipment(), uploaded_by=supplier, type='invoice',
+                             file_name='invoice.pdf', file_url='documents/invoice.pdf')
+    document.file_blob.put(b'%PDF-1.4', content_type='application/pdf')
+    document.save()
+    ExtractionJob(document_id=document, status='pending', available_at=datetime.utcnow()).save()
+    pool = ExtractionWorkerPool(max_attempts=3)
+    return pool, pool.claim_next(), document
+
+
+def fake_ai_service(monkeypatch, during_extraction=lambda: None, method='gemini-1.5-flash'):
+    class FakeAIService:
+        cache_saved_ms = None
+
+        def extract_document_data(self, file_path, document_type):
+            during_extraction()
+            if method == 'error':
+                return None, 0.0, 'error'
+            return {'invoice_number': 'INV-1'}, 0.9, method
+
+    monkeypatch.setattr(extraction_worker, 'AIService', FakeAIService)
+
+
+def steal(job):
+    # What recover_stale_jobs and another worker's claim_next do once the lease expires
+    ExtractionJob.objects(id=job.id).update_one(set__worker_id='other-worker', set__started_at=datetime.utcnow())
+
+
+def test_process_records_result_while_holding_the_lease(monkeypatch, claimed):
+    pool, job, document = claimed
+    fake_ai_service(monkeypatch)
+
+    pool.process(job)
+
+    job.reload()
+    assert (job.status, job.model_used) == ('completed', 'gemini-1.5-flash')
+    assert DocumentModel.objects.get(id=document.id).extracted_data == {'invoice_number': 'INV-1'}
+
+
+def test_process_discards_result_after_losing_the_lease(monkeypatch, claimed):
+    pool, job, document = claimed
+    fake_ai_service(monkeypatch, during_extraction=lambda: steal(job))
+
+    pool.process(job)
+
+    stored = ExtractionJob.objects.get(id=job.id)
+    assert (stored.status, stored.worker_id, stored.model_used) == ('processing', 'other-worker', None)
+    assert DocumentModel.objects.get(id=document.id).extracted_data == {}
+
+
+def test_failure_after_losing_the_lease_is_not_recorded(monkeypatch, claimed):
+    pool, job, _ = claimed
+    fake_ai_service(monkeypatch, during_extraction=lambda: steal(job), method='error')
+
+    pool.process(job)
+
+    stored = ExtractionJob.objects.get(id=job.id)
+    assert (stored.status, stored.worker_id, stored.error_message) == ('processing', 'other-worker', None)
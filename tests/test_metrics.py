@@ -0,0 +1,50 @@
+from bson import ObjectId
+
+from app.models.document import ExtractionJob
+from app.services.ai_client import AITimeoutError, CircuitOpenError
+from app.utils.metrics import (MetricsRegistry, _collect_extraction_jobs, ai_calls, extraction_jobs,
+                               metrics_collector_errors, record_ai_call)
+
+
+def sample(metric, *labels):
+    return metric.labels(*labels).value
+
+
+def test_record_ai_call_classifies_by_exception_type(app):
+    before = {outcome: sample(ai_calls, 'test_method', outcome) for outcome in ('ok', 'rejected', 'timeout', 'error')}
+
+    record_ai_call('test_method', 0.1)
+    record_ai_call('test_method', 0.0, CircuitOpenError())
+    record_ai_call('test_method', 20.0, AITimeoutError("Gemini call timed out after 20s"))
+    # Only the ai_client classes count; a message or name mentioning a timeout does not
+    record_ai_call('test_method', 1.0, ValueError("request timed out"))
+
+    assert {outcome: sample(ai_calls, 'test_method', outcome) - before[outcome] for outcome in before} == {
+        'ok': 1, 'rejected': 1, 'timeout': 1, 'error': 1
+    }
+
+
+def test_extraction_job_gauge_counts_every_status(app):
+    ExtractionJob._get_collection().insert_many([
+        {'document_id': ObjectId(), 'status': status} for status in ('pending', 'pending', 'failed')
+    ])
+
+    _collect_extraction_jobs()
+
+    assert {status: sample(extraction_jobs, status) for status in ('pending', 'processing', 'completed', 'failed')} == {
+        'pending': 2, 'processing': 0, 'completed': 0, 'failed': 1
+    }
+
+
+def test_failing_collector_is_logged_and_counted(app, caplog):
+    def broken_collector():
+        raise RuntimeError("count_documents failed")
+
+    registry = MetricsRegistry()
+    registry.counter('still_exposed_total', 'Exposed even when a collector fails.')
+    registry.add_collector(broken_collector)
+    before = sample(metrics_collector_errors, 'broken_collector')
+
+    assert 'still_exposed_total' in registry.expose()
+    assert sample(metrics_collector_errors, 'broken_collector') - before == 1
+    assert 'broken_collector' in caplog.text
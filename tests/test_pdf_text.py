@@ -0,0 +1,60 @@
+import tracemalloc
+import zlib
+
+from app.utils.pdf_text import extract_pdf_text
+
+
+def pdf_with_stream(content: bytes, compress: bool = True) -> bytes:
+    stream = zlib.compress(content, 9) if compress else content
+    flate = b' /Filter /FlateDecode' if compress else b''
+    return (b'%PDF-1.4\n4 0 obj\n<< /Length ' + str(len(stream)).encode() + flate + b' >>\nstream\n'
+            + stream + b'\nendstream\nendobj\n%%EOF\n')
+
+
+def assemble(objects) -> bytes:
+    return b'%PDF-1.4\n' + b''.join(b'%d 0 obj\n' % number + body + b'\nendobj\n'
+                                    for number, body in enumerate(objects, start=1)) + b'%%EOF\n'
+
+
+def test_extracts_shown_strings():
+    text = extract_pdf_text(pdf_with_stream(b'BT /F1 12 Tf 72 720 Td (COMMERCIAL INVOICE) Tj ET'))
+
+    assert text.strip() == 'COMMERCIAL INVOICE'
+
+
+def test_decompression_is_bounded_by_max_chars():
+    bomb = pdf_with_stream(b'BT (BILL OF LADING) Tj ET\n' + b'0' * (64 * 1024 * 1024))
+
+    tracemalloc.start()
+    try:
+        text = extract_pdf_text(bomb, max_chars=1000)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert 'BILL OF LADING' in text
+    assert peak < 8 * 1024 * 1024
+
+
+def test_non_octal_digit_escapes_keep_the_digit():
+    text = extract_pdf_text(pdf_with_stream(br'BT (HS \8\9 \101) Tj ET', compress=False))
+
+    assert text.strip() == 'HS 89 A'
+
+
+def test_page_resources_and_font_descriptors_do_not_hide_the_content():
+    content = zlib.compress(b'BT /F1 12 Tf 72 720 Td (PACKING LIST) Tj ET')
+    font_program = b'\x00\x01\x00\x00 glyf (NOT TEXT) Tj'
+    pdf = assemble([
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /Contents 4 0 R '
+        b'/Resources << /ProcSet [/PDF /Text /ImageB /ImageC /ImageI] /Font << /F1 5 0 R >> >> >>',
+        b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(content) + content + b'\nendstream',
+        b'<< /Type /Font /Subtype /TrueType /BaseFont /Arial /FontDescriptor 6 0 R >>',
+        b'<< /Type /FontDescriptor /FontName /Arial /Flags 32 /FontFile2 7 0 R >>',
+        b'<< /Length %d /Length1 %d >>\nstream\n' % (len(font_program), len(font_program))
+        + font_program + b'\nendstream',
+    ])
+
+    assert extract_pdf_text(pdf).strip() == 'PACKING LIST'
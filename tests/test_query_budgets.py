@@ -0,0 +1,98 @@
+"""Query budgets for the list endpoints: the count must not grow with the number of rows."""
+import os
+
+import mongomock
+import pytest
+
+from app.config import Config
+from app.models.quote import Quote
+from app.models.user import User
+from app.utils.query_profiler import assert_max_queries
+
+ROWS = 20
+
+
+@pytest.fixture
+def forwarders(forwarder):
+    return [forwarder] + [
+        User(email=f'forwarder{i}@example.com', hashed_password='-', name=f'Forwarder {i}', role='forwarder').save()
+        for i in range(1, 5)
+    ]
+
+
+@pytest.fixture
+def booked_shipments(make_shipment, forwarder):
+    return [make_shipment(status='booked', quote_status='accepted', quote_amount=1800.0,
+                          forwarder_id=forwarder, quote_forwarder_id=forwarder) for _ in range(ROWS)]
+
+
+def test_shipment_list_budget(client, supplier, auth_headers, booked_shipments):
+    # The identity lookup and one page query
+    with assert_max_queries(2):
+        response = client.get(f'/api/shipments/list?limit={ROWS}', headers=auth_headers(supplier))
+
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == ROWS
+
+
+def test_quote_list_budget(client, supplier, auth_headers, booked_shipments, forwarders):
+    shipment = booked_shipments[0]
+    for i in range(ROWS):
+        Quote(shipment_id=shipment, forwarder_id=forwarders[i % len(forwarders)],
+              freight_amount_usd=1500.0, total_amount_usd=1800.0).save()
+
+    # Shipment, quotes, and every quoting forwarder in one $in
+    with assert_max_queries(3) as queries:
+        response = client.get(f'/api/quotes/shipments/{shipment.id}/quotes', headers=auth_headers(supplier))
+
+    assert response.status_code == 200
+    quotes = response.get_json()['data']
+    assert len(quotes) == ROWS
+    assert all(quote['forwarder_name'] for quote in quotes)
+    assert not queries.repeated(2)
+
+
+@pytest.fixture
+def correlated_lookups(monkeypatch):
+    """Rewrite ``$lookup`` stages of the form ``let`` + ``$expr $eq`` into localField/foreignField.
+
+    mongomock has no ``let``/``pipeline`` joins. The rewritten stage joins the same documents, and
+    the call still goes through the counting wrapper, so it is one aggregate for the budget.
+    """
+    aggregate = mongomock.collection.Collection.aggregate
+
+    def rewrite(stage):
+        lookup = stage.get('$lookup', {})
+        if 'let' not in lookup:
+            return stage
+        (variable, local), = lookup['let'].items()
+        match, *_projection = lookup['pipeline']
+        foreign, joined = match['$match']['$expr']['$eq']
+        assert joined == f'$${variable}'
+        return {'$lookup': {'from': lookup['from'], 'localField': local.lstrip('$'),
+                            'foreignField': foreign.lstrip('$'), 'as': lookup['as']}}
+
+    def translated(self, pipeline, *args, **kwargs):
+        return aggregate(self, [rewrite(stage) for stage in pipeline], *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.collection.Collection, 'aggregate', translated)
+
+
+def test_accepted_quotes_budget(client, supplier, forwarder, auth_headers, booked_shipments, correlated_lookups):
+    # The identity lookup and one aggregation that joins suppliers
+    with assert_max_queries(2):
+        response = client.get(f'/api/forwarder/accepted-quotes?limit={ROWS}', headers=auth_headers(forwarder))
+
+    assert response.status_code == 200
+    quotes = response.get_json()['data']
+    assert len(quotes) == ROWS
+    assert all(quote['supplier_details']['company_name'] == supplier.company_name for quote in quotes)
+
+
+def test_profiler_headers_follow_debug_by_default(client, supplier, auth_headers):
+    assert 'QUERY_PROFILER_HEADERS' not in os.environ
+    response = client.get('/api/shipments/list', headers=auth_headers(supplier))
+
+    assert response.status_code == 200
+    assert Config.QUERY_PROFILER_HEADERS == Config.DEBUG
+    assert ('X-DB-Queries' in response.headers) == Config.DEBUG
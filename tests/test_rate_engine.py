@@ -0,0 +1,91 @@
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.services.rate_engine import RateEngine, RateSeries, SECONDS_PER_DAY, rate_engine
+
+PREDICT_BODY = {'origin': 'INNSA', 'destination': 'NLRTM', 'carrier': 'MAERSK', 'containerType': '40HC',
+                'currentRateUSD': 1800}
+
+
+def trained_engine(samples=40):
+    engine = RateEngine()
+    today = time.time() / SECONDS_PER_DAY
+    days = today - np.arange(samples, dtype=float)
+    series = RateSeries.from_arrays(days, np.full(samples, 1800.0))
+    engine._series = {('INNSA', 'NLRTM', '40HC'): series, ('INNSA', 'NLRTM', '*'): series}
+    engine._trained_at = time.time()
+    return engine
+
+
+def test_predict_uses_lane_history():
+    prediction = trained_engine().predict('INNSA', 'NLRTM', '40HC', 1800)
+
+    assert prediction['source'] == 'historical'
+    assert prediction['trend'] == 'STABLE'
+    assert prediction['predictedRateUSD'] == 1800
+
+
+def test_predict_while_observing_is_consistent():
+    engine = trained_engine(samples=5)
+    errors = []
+    stop = threading.Event()
+    # Switch threads as often as possible so a fit sees any half-applied append
+    previous_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def observe():
+        moment = datetime.utcnow()
+        while not stop.is_set():
+            engine.observe('INNSA', 'NLRTM', '40HC', moment, 1800.0)
+
+    writer = threading.Thread(target=observe)
+    writer.start()
+    try:
+        deadline = time.time() + 1.0
+        while time.time() < deadline:
+            try:
+                engine.predict('INNSA', 'NLRTM', '40HC', 1800)
+            except Exception as e:
+                errors.append(e)
+                break
+    finally:
+        stop.set()
+        writer.join()
+        sys.setswitchinterval(previous_interval)
+
+    assert errors == []
+
+
+def test_predict_rate_endpoint_falls_back_when_training_fails(client, supplier, auth_headers, monkeypatch):
+    def broken_load():
+        raise RuntimeError("shipments collection unavailable")
+
+    monkeypatch.setattr(rate_engine, '_trained_at', None)
+    monkeypatch.setattr(rate_engine, '_load', broken_load)
+
+    response = client.post('/api/carriers/ai/rates/predict', headers=auth_headers(supplier), json=PREDICT_BODY)
+
+    assert response.status_code == 200
+    # Gemini is not configured under test, so the fallback answer comes back
+    assert response.get_json()['predictedRateUSD'] == 1800
+
+
+def test_first_prediction_does_not_wait_for_training():
+    engine = RateEngine()
+    release = threading.Event()
+
+    def slow_load():
+        release.wait(5)
+        return iter(())
+
+    engine._load = slow_load
+    try:
+        # No data yet, so the caller falls back to Gemini instead of waiting for Mongo
+        assert engine.predict('INNSA', 'NLRTM', '40HC', 1800) is None
+        assert engine.stats()['trained_at'] is None
+    finally:
+        release.set()
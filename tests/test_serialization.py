@@ -0,0 +1,57 @@
+import pytest
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.utils.serialization import OrjsonProvider
+
+
+@pytest.fixture
+def providers():
+    app = Flask(__name__)
+    return OrjsonProvider(app), DefaultJSONProvider(app)
+
+
+@pytest.mark.parametrize('value, stdlib, orjson_output', [
+    (1e-05, '1e-05', '0.00001'),
+    (1e16, '1e+16', '1e16'),
+    (float('nan'), 'NaN', 'null'),
+    ('₹', '"\\u20b9"', '"₹"'),
+    (2 ** 70, '1180591620717411303424', '1180591620717411303424'),
+])
+def test_documented_differences_from_stdlib_provider(providers, value, stdlib, orjson_output):
+    orjson_provider, default_provider = providers
+    assert default_provider.dumps(value) == stdlib
+    assert orjson_provider.dumps(value) == orjson_output
+
+
+def test_wide_integers_fall_back_to_stdlib_with_object_ids(providers):
+    orjson_provider, _ = providers
+    object_id = ObjectId()
+    assert orjson_provider.dumps({'b': 2 ** 70, 'a': object_id}) == f'{{"a": "{object_id}", "b": {2 ** 70}}}'
+
+
+def test_wide_integer_response_is_not_a_server_error(app):
+    with app.test_request_context():
+        response = app.json.response({'amount': 2 ** 70})
+    assert response.status_code == 200
+    assert response.get_json() == {'amount': 2 ** 70}
+
+
+def test_document_and_raw_row_serialize_alike(client, forwarder, auth_headers, make_shipment):
+    from app.models.shipment import Shipment
+    from app.models.tracking_event import TrackingEvent
+
+    shipment = make_shipment(status='booked', forwarder_id=forwarder, quote_forwarder_id=forwarder,
+                             container_qty=2, gross_weight_kg=12000.5, metadata={'po': 'PO-1'})
+    created = client.post(f'/api/tracking/shipments/{shipment.id}/events', headers=auth_headers(forwarder), json={
+        'shipment_id': str(shipment.id), 'status': 'gate_in', 'location': 'Nhava Sheva',
+        'description': 'Container gated in', 'documents': ['eir.pdf']
+    })
+    assert created.status_code == 200
+
+    loaded = Shipment.objects.get(id=shipment.id)
+    assert loaded.to_dict() == Shipment.raw_to_dict(Shipment.objects(id=shipment.id).as_pymongo().first())
+    assert loaded.to_dict()['latest_event']['status'] == 'gate_in'
+    event = TrackingEvent.objects.get(id=created.get_json()['id'])
+    assert event.to_dict() == TrackingEvent.raw_to_dict(TrackingEvent.objects(id=event.id).as_pymongo().first())
@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+from app.services.storage_service import StorageService
+
+
+def test_upload_retry_replaces_a_write_that_may_have_landed(tmp_path, monkeypatch):
+    service = StorageService()
+    service.backoff_seconds = 0
+    stored = set()
+    attempts = []
+
+    def request(method, url, headers=None, **kwargs):
+        attempts.append(dict(headers))
+        if url in stored and headers.get('x-upsert') != 'true':
+            return SimpleNamespace(status_code=409, headers={})
+        stored.add(url)
+        # The first write lands but its response is lost to a gateway error
+        return SimpleNamespace(status_code=504 if len(attempts) == 1 else 200, headers={})
+
+    monkeypatch.setattr(service, 'session', SimpleNamespace(request=request))
+    file_path = tmp_path / 'invoice.pdf'
+    file_path.write_bytes(b'%PDF-1.4')
+
+    url = service.upload_file(str(file_path), 'shipments/1/invoice.pdf', 'application/pdf')
+
+    assert url.endswith('/shipments/1/invoice.pdf')
+    assert [headers.get('x-upsert') for headers in attempts] == [None, 'true']
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+from app.models.shipment import LatestTrackingEvent, Shipment
+from app.models.tracking_event import TrackingEvent
+from app.utils.query_profiler import collect_queries
+
+
+def event(shipment, status, **fields):
+    return dict({'shipment_id': str(shipment.id), 'status': status, 'location': 'Nhava Sheva',
+                 'description': f'Container {status}'}, **fields)
+
+
+def test_bulk_mixed_aware_and_naive_datetimes_update_shipment(client, forwarder, auth_headers, make_shipment):
+    shipment = make_shipment(status='booked')
+
+    response = client.post('/api/tracking/events/bulk', headers=auth_headers(forwarder), json=[
+        event(shipment, 'gate_in', actual_datetime='2026-03-01T08:00:00Z'),
+        event(shipment, 'vessel_departed', actual_datetime='2026-03-01T06:00:00'),
+    ])
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['created'] == 2
+    assert body['shipments_updated'] == 1
+    shipment.reload()
+    # The event recorded last wins, whatever its actual_datetime says
+    assert shipment.status == 'vessel_departed'
+    assert shipment.latest_event.status == 'vessel_departed'
+
+
+def test_bulk_does_not_overwrite_newer_latest_event(client, forwarder, auth_headers, make_shipment):
+    newer = datetime.utcnow() + timedelta(minutes=5)
+    shipment = make_shipment(status='arrived', latest_event=LatestTrackingEvent(status='port_arrival', timestamp=newer))
+
+    response = client.post('/api/tracking/events/bulk', headers=auth_headers(forwarder), json=[
+        event(shipment, 'in_transit'),
+    ])
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['created'] == 1
+    assert body['shipments_updated'] == 0
+    assert TrackingEvent.objects(shipment_id=shipment.id).count() == 1
+    shipment = Shipment.objects.get(id=shipment.id)
+    assert shipment.status == 'arrived'
+    assert shipment.latest_event.status == 'port_arrival'
+
+
+def test_latest_event_returns_full_event_and_honours_etag(client, forwarder, supplier, auth_headers, make_shipment):
+    shipment = make_shipment(status='booked')
+    created = client.post(f'/api/tracking/shipments/{shipment.id}/events', headers=auth_headers(forwarder), json=dict(
+        event(shipment, 'customs_clearance'), remarks='Awaiting duty payment', documents=['bill_of_entry.pdf'],
+        estimated_datetime='2026-03-04T10:00:00Z'
+    ))
+    assert created.status_code == 200
+
+    with collect_queries() as queries:
+        response = client.get(f'/api/tracking/shipments/{shipment.id}/events/latest', headers=auth_headers(supplier))
+
+    assert response.status_code == 200
+    # The whole stored event, served from the snapshot alone
+    assert response.get_json() == TrackingEvent.objects.get(id=created.get_json()['id']).to_dict()
+    assert not any('tracking_events' in shape for shape in queries.shapes)
+    for field in ('created_by', 'remarks', 'estimated_datetime', 'documents', 'verified'):
+        assert field in response.get_json()
+
+    cached = client.get(f'/api/tracking/shipments/{shipment.id}/events/latest',
+                        headers=dict(auth_headers(supplier), **{'If-None-Match': response.headers['ETag']}))
+    assert cached.status_code == 304
+
+
+def test_latest_event_reads_the_event_for_snapshots_written_before_full_copies(client, forwarder, supplier,
+                                                                               auth_headers, make_shipment):
+    shipment = make_shipment(status='booked')
+    created = client.post(f'/api/tracking/shipments/{shipment.id}/events', headers=auth_headers(forwarder),
+                          json=event(shipment, 'gate_in', remarks='Gated in early'))
+    Shipment._get_collection().update_one({'_id': shipment.id}, {'$unset': {
+        f'latest_event.{field}': '' for field in ('created_by', 'remarks', 'documents', 'verified')
+    }})
+
+    response = client.get(f'/api/tracking/shipments/{shipment.id}/events/latest', headers=auth_headers(supplier))
+
+    assert response.status_code == 200
+    assert response.get_json() == TrackingEvent.objects.get(id=created.get_json()['id']).to_dict()
+
+
+def test_bulk_reports_wrongly_typed_fields_per_item(client, forwarder, auth_headers, make_shipment):
+    shipment = make_shipment(status='booked')
+
+    response = client.post('/api/tracking/events/bulk', headers=auth_headers(forwarder), json=[
+        event(shipment, 'gate_in', location=12),
+        event(shipment, 'gate_in', description={'text': 'Container gated in'}),
+        event(shipment, ['gate_in']),
+        event(shipment, 'gate_in'),
+    ])
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['created'], body['failed']) == (1, 3)
+    assert [[error['loc'] for error in result.get('errors', [])] for result in body['results']] == [
+        [['location']], [['description']], [['status']], []
+    ]